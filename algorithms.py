@@ -1,7 +1,13 @@
 import heapq
 import math
+from array import array
+from multiprocessing import Pool
+from config import Theme
 from utils import calculate_turn_dir, haversine_distance
 from models import Graph, Node
+from compact import CompactGraph, STATUS_JAMMED, STATUS_BLOCKED
+from workspace import search_workspace
+from maneuvers import build_maneuvers
 
 def reconstruct_path(previous_nodes: dict[str, str | None], start: str, end: str) -> list[str]:
     """
@@ -25,34 +31,63 @@ def reconstruct_path(previous_nodes: dict[str, str | None], start: str, end: str
         
     return path
 
-def a_star(graph: Graph, start_id: str, end_id: str) -> tuple[list[str], float]:
+def a_star(graph: Graph, start_id: str, end_id: str, stats: dict | None = None,
+           landmarks=None) -> tuple[list[str], float]:
     """
     A* algorithm with traffic awareness and Turn Costs.
     Penalty is added for sharp turns to encourage smoother paths.
+    If a stats dict is given, heap pushes/pops and settled nodes are counted into it.
+    The heuristic is the straight-line distance, or the ALT bound if landmarks (landmarks.Landmarks) are given.
     """
+    if isinstance(graph, CompactGraph):
+        return a_star_compact(graph, start_id, end_id, stats, landmarks)
+
+    if landmarks is not None:
+        heuristic = landmarks.potential(end_id)
+    else:
+        end_node = graph.nodes[end_id]
+        def heuristic(node_id):
+            node = graph.nodes[node_id]
+            return haversine_distance(node.lat, node.lon, end_node.lat, end_node.lon)
+
+    with search_workspace(graph) as workspace:
+        return _a_star_search(graph, start_id, end_id, stats, heuristic, workspace)
+
+def _a_star_search(graph: Graph, start_id: str, end_id: str, stats: dict | None, heuristic,
+                   workspace) -> tuple[list[str], float]:
+    """ a_star's main loop. Only touched nodes get g/parent entries (sparse dicts of the reused workspace). """
+    inf = float('infinity')
     # Priority Queue tuple: (f_score, node_id)
-    pq = [(0.0, start_id)]
+    pq = workspace.heap
+    pq.append((0.0, start_id))
+    pushes, pops, settled = 1, 0, 0
     
-    g_score = {node: float('infinity') for node in graph.nodes}
+    g_score = workspace.g_by_id
     g_score[start_id] = 0.0
     
-    came_from = {node: None for node in graph.nodes}
+    came_from = workspace.came_from_by_id
+    came_from[start_id] = None
+    # Point each node was entered from (last shape point of the edge, or the parent node)
+    approach = workspace.approach_by_id
     
     while pq:
         current_f, current_node_id = heapq.heappop(pq)
+        pops += 1
         
         if current_node_id == end_id:
+            if stats is not None:
+                stats.update(pushes=pushes, pops=pops, settled=settled + 1)
             return reconstruct_path(came_from, start_id, end_id), g_score[end_id]
             
         # Optimization: Lazy deletion
-        current_h = haversine_distance(graph.nodes[current_node_id].lat, graph.nodes[current_node_id].lon, 
-                                     graph.nodes[end_id].lat, graph.nodes[end_id].lon)
+        current_h = heuristic(current_node_id)
                                      
         if current_f > g_score[current_node_id] + current_h + 1e-9: # Epsilon for float comparisons
             continue
+        settled += 1
 
         u_node = graph.nodes[current_node_id]
-        parent_id = came_from.get(current_node_id)
+        entry_point = approach.get(current_node_id)
         
         for edge in graph.get_neighbors(current_node_id):
             neighbor_id = edge['to']
@@ -66,13 +101,14 @@ def a_star(graph: Graph, start_id: str, end_id: str) -> tuple[list[str], float]:
             
             # 2. Turn Penalty
             turn_penalty = 0
-            if parent_id:
-                p_node = graph.nodes[parent_id]
-                # Angle Calculation
+            geometry = edge.get('geometry')
+            if entry_point:
+                # Angle Calculation (polyline edges leave U towards their first shape point)
+                exit_lat, exit_lon = geometry[0] if geometry else (v_node.lat, v_node.lon)
                 # Vector P->U
-                v1x, v1y = u_node.lat - p_node.lat, u_node.lon - p_node.lon
+                v1x, v1y = u_node.lat - entry_point[0], u_node.lon - entry_point[1]
                 # Vector U->V
-                v2x, v2y = v_node.lat - u_node.lat, v_node.lon - u_node.lon
+                v2x, v2y = exit_lat - u_node.lat, exit_lon - u_node.lon
                 
                 # Dot product
                 len1 = math.hypot(v1x, v1y)
@@ -87,66 +123,546 @@ def a_star(graph: Graph, start_id: str, end_id: str) -> tuple[list[str], float]:
             
             tentative_g = g_score[current_node_id] + weight + turn_penalty
             
-            if tentative_g < g_score[neighbor_id]:
+            if tentative_g < g_score.get(neighbor_id, inf):
                 came_from[neighbor_id] = current_node_id
                 g_score[neighbor_id] = tentative_g
+                approach[neighbor_id] = geometry[-1] if geometry else (u_node.lat, u_node.lon)
                 
                 # Heuristic
-                h = haversine_distance(v_node.lat, v_node.lon, graph.nodes[end_id].lat, graph.nodes[end_id].lon)
+                h = heuristic(neighbor_id)
                 heapq.heappush(pq, (tentative_g + h, neighbor_id))
+                pushes += 1
                 
+    if stats is not None:
+        stats.update(pushes=pushes, pops=pops, settled=settled)
     return [], float('infinity')
 
-def generate_instructions(graph, path):
-    """ Generates turn-by-turn navigation instructions from a node path. """
-    if not path or len(path) < 2:
-        return ["You have reached your destination."]
-        
-    instructions = []
-    current_street = None
-    segment_dist = 0
-    
-    def get_street_name(u, v):
-        if u in graph.edges:
-            for e in graph.edges[u]:
-                if e['to'] == v:
-                    return e.get('name', 'Unknown Road')
-        return "Unknown Road"
-
-    # Initial street
-    start_street = get_street_name(path[0], path[1])
-    current_street = start_street
-    instructions.append(f"Head on {start_street}")
-    
-    for i in range(len(path) - 1):
-        u, v = path[i], path[i+1]
-        
-        # Get distance
-        dist = 0
-        if u in graph.edges:
-            for e in graph.edges[u]:
-                if e['to'] == v:
-                    dist = e['weight']
-                    break
-        
-        # Safety check for infinite distances (Crash prevention)
-        if math.isinf(dist) or math.isnan(dist) or dist > 1e9:
-             return ["Route blocked. Destination unreachable."]
-        
-        name = get_street_name(u, v)
-        
-        if name != current_street:
-            # New Instruction
-            dist_text = f"{int(segment_dist)}m"
-            instructions.append(f"Go {dist_text}, then turn onto {name}")
-            current_street = name
-            segment_dist = 0
-        
-        segment_dist += dist
-        
-    # Final segment safety check
-    if math.isinf(segment_dist) or math.isnan(segment_dist):
-         return ["Route blocked. Destination unreachable."]
+def a_star_compact(graph: CompactGraph, start_id: str, end_id: str, stats: dict | None = None,
+                   landmarks=None) -> tuple[list[str], float]:
+    """
+    Same search as a_star (traffic multipliers, turn penalty, polyline-aware angles),
+    run directly on the CSR arrays of a CompactGraph with integer node indices.
+    """
+    index = graph.index
+    if start_id not in index or end_id not in index:
+        return [], float('infinity')
+    start, end = index[start_id], index[end_id]
+    # Node indices of a CompactGraph are the node order of the Graph the landmarks were built on
+    landmark_bound = landmarks.index_potential(end) if landmarks is not None else None
+
+    with search_workspace(graph, len(graph.node_ids)) as workspace:
+        return _a_star_compact_search(graph, start, end, stats, landmark_bound, workspace)
+
+def _a_star_compact_search(graph: CompactGraph, start: int, end: int, stats: dict | None, landmark_bound,
+                           workspace) -> tuple[list[str], float]:
+    """
+    a_star_compact's main loop. The workspace arrays are shared by all queries on the graph:
+    an entry is only valid if its stamp is the current generation, so setup costs O(1), not O(N).
+    """
+    lats, lons = graph.lats, graph.lons
+    offsets, targets, weights, status = graph.offsets, graph.targets, graph.weights, graph.status
+    geom_offsets, geom_lats, geom_lons = graph.geom_offsets, graph.geom_lats, graph.geom_lons
+    end_lat, end_lon = lats[end], lons[end]
+    inf = float('infinity')
+
+    gen, stamp = workspace.generation, workspace.stamp
+    g_score, came_from = workspace.g_score, workspace.came_from
+    # Point each node was entered from (NaN = start node, no turn penalty)
+    approach_lat, approach_lon = workspace.approach_lat, workspace.approach_lon
+    stamp[start] = gen
+    g_score[start] = 0.0
+    came_from[start] = -1
+    approach_lat[start] = approach_lon[start] = math.nan
+
+    pq = workspace.heap
+    pq.append((0.0, start))
+    pushes, pops, settled = 1, 0, 0
+
+    while pq:
+        current_f, u = heapq.heappop(pq)
+        pops += 1
+
+        if u == end:
+            path = []
+            while u != -1:
+                path.append(graph.node_ids[u])
+                u = came_from[u]
+            path.reverse()
+            if stats is not None:
+                stats.update(pushes=pushes, pops=pops, settled=settled + 1)
+            return path, g_score[end]
+
+        u_lat, u_lon = lats[u], lons[u]
+        g_u = g_score[u]
+        # Lazy deletion
+        h = landmark_bound(u) if landmark_bound else haversine_distance(u_lat, u_lon, end_lat, end_lon)
+        if current_f > g_u + h + 1e-9:
+            continue
+        settled += 1
+
+        p_lat, p_lon = approach_lat[u], approach_lon[u]
+        has_parent = p_lat == p_lat   # False for NaN
+
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+
+            # 1. Base Weight (Traffic)
+            weight = weights[k]
+            code = status[k]
+            if code == STATUS_JAMMED: weight *= 5.0
+            elif code == STATUS_BLOCKED: weight = inf
+
+            # 2. Turn Penalty
+            g0, g1 = geom_offsets[k], geom_offsets[k + 1]
+            turn_penalty = 0
+            if has_parent:
+                if g1 > g0:
+                    exit_lat, exit_lon = geom_lats[g0], geom_lons[g0]
+                else:
+                    exit_lat, exit_lon = lats[v], lons[v]
+                v1x, v1y = u_lat - p_lat, u_lon - p_lon
+                v2x, v2y = exit_lat - u_lat, exit_lon - u_lon
+                len1 = math.hypot(v1x, v1y)
+                len2 = math.hypot(v2x, v2y)
+                if len1 > 0 and len2 > 0:
+                    dot = (v1x * v2x + v1y * v2y) / (len1 * len2)
+                    if dot < 0.5:
+                        turn_penalty = 20.0
+
+            tentative_g = g_u + weight + turn_penalty
+            if tentative_g < (g_score[v] if stamp[v] == gen else inf):
+                stamp[v] = gen
+                came_from[v] = u
+                g_score[v] = tentative_g
+                if g1 > g0:
+                    approach_lat[v], approach_lon[v] = geom_lats[g1 - 1], geom_lons[g1 - 1]
+                else:
+                    approach_lat[v], approach_lon[v] = u_lat, u_lon
+
+                h = landmark_bound(v) if landmark_bound else haversine_distance(lats[v], lons[v], end_lat, end_lon)
+                heapq.heappush(pq, (tentative_g + h, v))
+                pushes += 1
+
+    if stats is not None:
+        stats.update(pushes=pushes, pops=pops, settled=settled)
+    return [], inf
+
+def _edge_cost(edge) -> float:
+    """ Traffic-aware edge cost, as in a_star (jammed x5, blocked = inf). """
+    weight = edge['weight']
+    status = edge.get('status')
+    if status == 'jammed': weight *= 5.0
+    elif status == 'blocked': weight = float('inf')
+    return weight
+
+def _turn_penalty(entry_point, node: Node, exit_point) -> float:
+    """ a_star's turn penalty at node, for a path entering from entry_point and leaving towards exit_point. """
+    if entry_point is None or exit_point is None:
+        return 0.0
+    v1x, v1y = node.lat - entry_point[0], node.lon - entry_point[1]
+    v2x, v2y = exit_point[0] - node.lat, exit_point[1] - node.lon
+    len1 = math.hypot(v1x, v1y)
+    len2 = math.hypot(v2x, v2y)
+    if len1 > 0 and len2 > 0 and (v1x * v2x + v1y * v2y) / (len1 * len2) < 0.5:
+        return 20.0
+    return 0.0
+
+def a_star_bidirectional(graph: Graph, start_id: str, end_id: str, stats: dict | None = None,
+                         landmarks=None) -> tuple[list[str], float]:
+    """
+    Bidirectional A*: a forward search from start_id and a backward search (over graph.get_incoming)
+    from end_id, with the same traffic multipliers as a_star but no turn penalty, so its routes are
+    exact shortest paths of the traffic-aware edge costs (a_star's cost minus its turn penalties).
+    Both use the averaged potential p(v) = (h_end(v) - h_start(v)) / 2 (and -p backwards), which is
+    consistent, so the search can stop as soon as top_forward + top_backward >= best path found.
+    Each step expands the side with the smaller top key.
+    The bounds are straight-line distances, or the ALT bounds if landmarks (landmarks.Landmarks) are given.
+    """
+    inf = float('infinity')
+    if start_id not in graph.nodes or end_id not in graph.nodes:
+        return [], inf
+    if start_id == end_id:
+        if stats is not None:
+            stats.update(pushes=0, pops=0, settled=0)
+        return [start_id], 0.0
+
+    nodes = graph.nodes
+    s_node, t_node = nodes[start_id], nodes[end_id]
+    bounds = {}
+    if landmarks is not None:
+        to_end, from_start = landmarks.potential(end_id), landmarks.source_potential(start_id)
+
+    def h(node_id):
+        # (lower bound to end, from start) - of the remaining cost either way
+        value = bounds.get(node_id)
+        if value is None:
+            if landmarks is not None:
+                value = bounds[node_id] = (to_end(node_id), from_start(node_id))
+            else:
+                n = nodes[node_id]
+                value = bounds[node_id] = (haversine_distance(n.lat, n.lon, t_node.lat, t_node.lon),
+                                           haversine_distance(s_node.lat, s_node.lon, n.lat, n.lon))
+        return value
+
+    def p(node_id):
+        # Forward potential; the backward search uses -p
+        h_end, h_start = h(node_id)
+        return 0.5 * (h_end - h_start)
+
+    g_f, parent = {start_id: 0.0}, {start_id: None}
+    g_r, successor = {end_id: 0.0}, {end_id: None}     # Backward: cost to end and next node
+    pq_f, pq_r = [(p(start_id), start_id)], [(-p(end_id), end_id)]
+    pushes, pops, settled = 2, 0, 0
+
+    best, meeting = inf, None
+
+    while pq_f and pq_r:
+        if pq_f[0][0] + pq_r[0][0] >= best:
+            break
+
+        if pq_f[0][0] <= pq_r[0][0]:
+            key, u = heapq.heappop(pq_f)
+            pops += 1
+            g_u = g_f[u]
+            if key > g_u + p(u) + 1e-9: continue  # Lazy deletion
+            settled += 1
+
+            for edge in graph.get_neighbors(u):
+                v = edge['to']
+                tentative_g = g_u + _edge_cost(edge)
+                # Prune: no path through v can beat the best one found
+                if tentative_g < g_f.get(v, inf) and tentative_g + h(v)[0] < best:
+                    g_f[v] = tentative_g
+                    parent[v] = u
+                    heapq.heappush(pq_f, (tentative_g + p(v), v))
+                    pushes += 1
+                    if v in g_r and tentative_g + g_r[v] < best:
+                        best, meeting = tentative_g + g_r[v], v
+        else:
+            key, v = heapq.heappop(pq_r)
+            pops += 1
+            g_v = g_r[v]
+            if key > g_v - p(v) + 1e-9: continue  # Lazy deletion
+            settled += 1
+
+            for u, edge in graph.get_incoming(v):
+                tentative_g = g_v + _edge_cost(edge)
+                if tentative_g < g_r.get(u, inf) and tentative_g + h(u)[1] < best:
+                    g_r[u] = tentative_g
+                    successor[u] = v
+                    heapq.heappush(pq_r, (tentative_g - p(u), u))
+                    pushes += 1
+                    if u in g_f and tentative_g + g_f[u] < best:
+                        best, meeting = tentative_g + g_f[u], u
 
-    instructions.append(f"Go {int(segment_dist)}m to destination.")
-    return instructions
\ No newline at end of file
+    if stats is not None:
+        stats.update(pushes=pushes, pops=pops, settled=settled)
+    if meeting is None:
+        return [], inf
+
+    path = reconstruct_path(parent, start_id, meeting)
+    node_id = successor[meeting]
+    while node_id is not None:
+        path.append(node_id)
+        node_id = successor[node_id]
+    return path, best
+
+def a_star_edge_based(graph: Graph, start_id: str, end_id: str, stats: dict | None = None,
+                      landmarks=None) -> tuple[list[str], float]:
+    """
+    Edge-based A* (a search on the line graph): a label means "arrived over edge e", so every way of
+    entering a node keeps its own cost and the turn costs of graph.turn_table (turns.TurnTable, which
+    also holds the OSM turn restrictions) are exact. A node reached first over a bad turn no longer
+    hides a cheaper continuation. Relaxations only look turn costs up; traffic is applied as in a_star.
+    """
+    table = graph.turn_table
+    if table is None:
+        raise ValueError("No turn table attached to the graph (see turns.build_turn_table)")
+    inf = float('infinity')
+    if start_id not in graph.nodes or end_id not in graph.nodes:
+        return [], inf
+    if start_id == end_id:
+        return [start_id], 0.0
+
+    if landmarks is not None:
+        heuristic = landmarks.potential(end_id)
+    else:
+        end_node = graph.nodes[end_id]
+        def heuristic(node_id):
+            node = graph.nodes[node_id]
+            return haversine_distance(node.lat, node.lon, end_node.lat, end_node.lon)
+
+    starts, costs, heads = table.starts, table.costs, table.heads
+    g_score = {}   # edge id -> cost of the best path ending with that edge
+    came_from = {}  # edge id -> previous edge id (-1 at the start node)
+    pq = []
+    for edge in graph.get_neighbors(start_id):
+        e, cost = edge['id'], _edge_cost(edge)
+        if cost < g_score.get(e, inf):
+            g_score[e] = cost
+            came_from[e] = -1
+            heapq.heappush(pq, (cost + heuristic(edge['to']), e))
+    pushes, pops, settled = len(pq), 0, 0
+
+    while pq:
+        current_f, e = heapq.heappop(pq)
+        pops += 1
+        node_id = heads[e]
+        g_e = g_score[e]
+        if current_f > g_e + heuristic(node_id) + 1e-9:  # Lazy deletion
+            continue
+        settled += 1
+
+        if node_id == end_id:
+            if stats is not None:
+                stats.update(pushes=pushes, pops=pops, settled=settled)
+            path = [node_id]
+            while came_from[e] != -1:
+                e = came_from[e]
+                path.append(heads[e])
+            path.append(start_id)
+            return path[::-1], g_e
+
+        base = starts[e]
+        for j, edge in enumerate(graph.get_neighbors(node_id)):
+            tentative_g = g_e + costs[base + j] + _edge_cost(edge)
+            k = edge['id']
+            if tentative_g < g_score.get(k, inf):
+                g_score[k] = tentative_g
+                came_from[k] = e
+                heapq.heappush(pq, (tentative_g + heuristic(edge['to']), k))
+                pushes += 1
+
+    if stats is not None:
+        stats.update(pushes=pushes, pops=pops, settled=settled)
+    return [], inf
+
+def a_star_time(graph: Graph, start_id: str, end_id: str, stats: dict | None = None) -> tuple[list[str], float]:
+    """
+    A* minimising travel time (s) instead of distance, on the per-edge times of graph.travel_times
+    (traveltime.TravelTimes). The heuristic is the straight-line distance at the highest speed limit,
+    which never overestimates. No turn penalty: the route cost is exactly the ETA shown for it.
+    """
+    if graph.travel_times is None:
+        raise ValueError("No travel times attached to the graph (see traveltime.TravelTimes)")
+    inf = float('infinity')
+    if start_id not in graph.nodes or end_id not in graph.nodes:
+        return [], inf
+
+    times = graph.travel_times.times
+    end_node = graph.nodes[end_id]
+    def heuristic(node_id):
+        node = graph.nodes[node_id]
+        return haversine_distance(node.lat, node.lon, end_node.lat, end_node.lon) / MAX_SPEED
+
+    with search_workspace(graph) as workspace:
+        pq = workspace.heap
+        pq.append((heuristic(start_id), start_id))
+        g_score, came_from = workspace.g_by_id, workspace.came_from_by_id
+        g_score[start_id] = 0.0
+        came_from[start_id] = None
+        pushes, pops, settled = 1, 0, 0
+
+        while pq:
+            current_f, u = heapq.heappop(pq)
+            pops += 1
+            g_u = g_score[u]
+            if current_f > g_u + heuristic(u) + 1e-9:  # Lazy deletion
+                continue
+            settled += 1
+            if u == end_id:
+                if stats is not None:
+                    stats.update(pushes=pushes, pops=pops, settled=settled)
+                return reconstruct_path(came_from, start_id, end_id), g_u
+
+            for edge in graph.get_neighbors(u):
+                v = edge['to']
+                tentative_g = g_u + times[edge['id']]
+                if tentative_g < g_score.get(v, inf):
+                    g_score[v] = tentative_g
+                    came_from[v] = u
+                    heapq.heappush(pq, (tentative_g + heuristic(v), v))
+                    pushes += 1
+
+    if stats is not None:
+        stats.update(pushes=pushes, pops=pops, settled=settled)
+    return [], inf
+
+def ch_route(graph: Graph, start_id: str, end_id: str, stats: dict | None = None) -> tuple[list[str], float]:
+    """
+    Query through the contraction hierarchy attached to the graph (graph.hierarchy, see ch.py).
+    The hierarchy knows base weights only (no turn penalty). Traffic can only make edges more expensive,
+    so a route without jammed/blocked edges is still the shortest; otherwise a_star takes over.
+    """
+    if graph.hierarchy is None:
+        raise ValueError("No contraction hierarchy attached to the graph (see ch.load_or_build_hierarchy)")
+    path, dist = graph.hierarchy.query(start_id, end_id, stats)
+    for u, v in zip(path, path[1:]):
+        edge = graph.get_edge(u, v)
+        if edge.get('status') or edge['weight'] != edge['base_weight']:
+            return a_star(graph, start_id, end_id, stats)
+    return path, dist
+
+def alt_route(graph: Graph, start_id: str, end_id: str, stats: dict | None = None) -> tuple[list[str], float]:
+    """ a_star with the landmark (ALT) heuristic of the tables attached to the graph (graph.landmarks). """
+    if graph.landmarks is None:
+        raise ValueError("No landmarks attached to the graph (see landmarks.load_or_build_landmarks)")
+    return a_star(graph, start_id, end_id, stats, graph.landmarks)
+
+def bidirectional_route(graph: Graph, start_id: str, end_id: str, stats: dict | None = None) -> tuple[list[str], float]:
+    """ a_star_bidirectional, with the ALT bounds if landmarks are attached to the graph. """
+    return a_star_bidirectional(graph, start_id, end_id, stats, graph.landmarks)
+
+def edge_route(graph: Graph, start_id: str, end_id: str, stats: dict | None = None) -> tuple[list[str], float]:
+    """ a_star_edge_based on the graph's turn table (with the ALT bound if landmarks are attached too). """
+    return a_star_edge_based(graph, start_id, end_id, stats, graph.landmarks)
+
+# Point-to-point search used by the visualizer, by name
+ROUTING_ALGORITHMS = {
+    'astar': a_star,
+    'bidirectional': bidirectional_route,
+    'ch': ch_route,
+    'alt': alt_route,
+    'edge': edge_route,
+    'time': a_star_time,
+}
+
+def find_route(graph: Graph, start_id: str, end_id: str, algorithm: str = 'astar',
+               stats: dict | None = None) -> tuple[list[str], float]:
+    """
+    Runs the routing algorithm registered under `algorithm` in ROUTING_ALGORITHMS.
+    Results go through graph.route_cache when one is attached (not for stats queries, which measure the search).
+    """
+    if algorithm not in ROUTING_ALGORITHMS:
+        raise ValueError(f"Unknown routing algorithm '{algorithm}' (available: {', '.join(ROUTING_ALGORITHMS)})")
+    cache = graph.route_cache
+    if cache is None or stats is not None:
+        return ROUTING_ALGORITHMS[algorithm](graph, start_id, end_id, stats)
+    cached = cache.get(start_id, end_id, algorithm)
+    if cached is not None:
+        return cached
+    path, cost = ROUTING_ALGORITHMS[algorithm](graph, start_id, end_id, None)
+    cache.put(start_id, end_id, algorithm, path, cost)
+    return path, cost
+
+# Highest speed limit (m/s): distance / MAX_SPEED is a lower bound of any travel time
+MAX_SPEED = max(Theme.SPEED_LIMITS.values()) / 3.6
+
+def edge_travel_time(edge) -> float:
+    """ Seconds to drive an edge at its road type's speed limit (jam speed on jammed roads, inf if blocked). """
+    status = edge.get('status')
+    if status == 'blocked':
+        return float('infinity')
+    limit = Theme.SPEED_LIMITS['jammed'] if status == 'jammed' else Theme.SPEED_LIMITS.get(edge['type'], 30)
+    return edge['weight'] / (max(1, limit) / 3.6)
+
+# --- Many-to-many matrices ---
+
+class RouteMatrix:
+    """
+    Origin-destination matrix. distances (m) and times (s) are row-major arrays with one row per origin:
+    entry i * len(destinations) + j belongs to origins[i] -> destinations[j] (inf if unreachable).
+    """
+    def __init__(self, origins: list[str], destinations: list[str]):
+        self.origins = list(origins)
+        self.destinations = list(destinations)
+        size = len(self.origins) * len(self.destinations)
+        self.distances = array('d', [float('infinity')]) * size
+        self.times = array('d', [float('infinity')]) * size
+
+    def distance(self, i: int, j: int) -> float:
+        return self.distances[i * len(self.destinations) + j]
+
+    def time(self, i: int, j: int) -> float:
+        return self.times[i * len(self.destinations) + j]
+
+def one_to_many(graph: Graph, source_id: str, target_ids: list[str]) -> tuple[array, array]:
+    """
+    Dijkstra from source_id that stops as soon as every target is settled.
+    Routes minimise a_star's traffic-aware edge cost (without turn penalties);
+    returns the distance (m) and travel time (s) of each target's route, inf where unreachable.
+    """
+    inf = float('infinity')
+    distances = array('d', [inf]) * len(target_ids)
+    times = array('d', [inf]) * len(target_ids)
+    if source_id not in graph.nodes:
+        return distances, times
+
+    remaining = {}   # target -> its positions in target_ids (a node may be listed twice)
+    for j, target_id in enumerate(target_ids):
+        remaining.setdefault(target_id, []).append(j)
+
+    cost = {source_id: 0.0}
+    label = {source_id: (0.0, 0.0)}   # (distance, time) of the cheapest route found so far
+    pq = [(0.0, source_id)]
+    while pq and remaining:
+        c, u = heapq.heappop(pq)
+        if c > cost[u]: continue  # Lazy deletion
+        dist_u, time_u = label[u]
+        for j in remaining.pop(u, ()):
+            distances[j], times[j] = dist_u, time_u
+
+        for edge in graph.get_neighbors(u):
+            v = edge['to']
+            new_cost = c + _edge_cost(edge)
+            if new_cost < cost.get(v, inf):
+                cost[v] = new_cost
+                label[v] = (dist_u + edge['base_weight'], time_u + edge_travel_time(edge))
+                heapq.heappush(pq, (new_cost, v))
+    return distances, times
+
+_matrix_graph = None
+
+def _init_matrix_worker(graph: Graph):
+    global _matrix_graph
+    _matrix_graph = graph
+
+def _matrix_rows(task: tuple[list[str], list[str]]) -> list[tuple[array, array]]:
+    origins, destinations = task
+    return [one_to_many(_matrix_graph, origin, destinations) for origin in origins]
+
+def route_matrix(graph: Graph, origins: list[str], destinations: list[str], workers: int = 1,
+                 chunk_size: int = 16) -> RouteMatrix:
+    """
+    Distance/time matrix from every origin to every destination (one one_to_many search per origin),
+    with the current traffic state. With workers > 1 the origins are split into chunks across a process
+    pool; each worker receives the graph once.
+    """
+    matrix = RouteMatrix(origins, destinations)
+    chunks = [matrix.origins[i:i + chunk_size] for i in range(0, len(matrix.origins), chunk_size)]
+    tasks = [(chunk, matrix.destinations) for chunk in chunks]
+
+    if workers > 1 and len(chunks) > 1:
+        with Pool(min(workers, len(chunks)), initializer=_init_matrix_worker, initargs=(graph,)) as pool:
+            results = pool.map(_matrix_rows, tasks)
+    else:
+        _init_matrix_worker(graph)
+        try:
+            results = [_matrix_rows(task) for task in tasks]
+        finally:
+            _init_matrix_worker(None)
+
+    width = len(matrix.destinations)
+    i = 0
+    for rows in results:
+        for distances, times in rows:
+            matrix.distances[i * width:(i + 1) * width] = distances
+            matrix.times[i * width:(i + 1) * width] = times
+            i += 1
+    return matrix
+
+def expand_path(graph: Graph, path: list[str]) -> list[tuple[float, float]]:
+    """ Expands a node path into its full (lat, lon) polyline, including the shape points of contracted edges. """
+    points = []
+    for i, node_id in enumerate(path):
+        node = graph.nodes[node_id]
+        points.append((node.lat, node.lon))
+        if i + 1 < len(path):
+            e = graph.get_edge(node_id, path[i+1])
+            if e is not None:
+                points.extend(e.get('geometry', ()))
+    return points
+
+def generate_instructions(graph, path):
+    """ Generates turn-by-turn navigation instructions from a node path (maneuvers.build_maneuvers). """
+    return build_maneuvers(graph, path).instructions()
\ No newline at end of file
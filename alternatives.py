@@ -0,0 +1,133 @@
+import heapq
+from algorithms import _edge_cost, edge_travel_time
+from models import Graph
+
+# Alternative routes with the plateau method (Cambridge Vehicle Information Technology's
+# "choice routing"): one forward search from the start and one backward search from the end.
+# An edge lying in both shortest path trees belongs to a plateau; the route through a plateau
+# (start -> plateau along the forward tree, plateau -> end along the backward tree) is locally
+# optimal over the whole plateau. Long plateaus that are cheap enough and different enough from
+# the routes already chosen become the alternatives.
+
+MAX_STRETCH = 1.25        # Alternative cost <= MAX_STRETCH * optimal cost
+MIN_PLATEAU = 0.2         # Locally optimal stretch (plateau) >= MIN_PLATEAU * optimal cost
+MAX_SHARING = 0.7         # Length shared with any better route <= MAX_SHARING * own length
+
+class AlternativeRoute:
+    """ One candidate: node path, search cost (as a_star, without turn penalties), length (m), time (s). """
+    def __init__(self, path: list[str], cost: float, distance: float, time: float, plateau: float):
+        self.path = path
+        self.cost = cost
+        self.distance = distance
+        self.time = time
+        self.plateau = plateau      # Cost of the locally optimal part of the route
+        self.sharing = 0.0          # Largest share of the length common with a better-ranked route
+
+    def __repr__(self):
+        return f"AlternativeRoute({len(self.path)} nodes, {self.distance:.0f} m, {self.time:.0f} s)"
+
+def _search_tree(graph: Graph, root: str, limit_node: str, stretch: float, backward: bool):
+    """
+    Dijkstra from root (over incoming edges if backward), continued until the queue passes
+    stretch * the cost of limit_node, so every node within that cost is settled.
+    Returns the (dist, parent) dicts of the shortest path tree.
+    """
+    inf = float('infinity')
+    dist, parent = {root: 0.0}, {root: None}
+    bound = inf
+    pq = [(0.0, root)]
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]: continue  # Lazy deletion
+        if d > bound: break
+        if u == limit_node:
+            bound = d * stretch
+
+        neighbours = graph.get_incoming(u) if backward else ((edge['to'], edge) for edge in graph.get_neighbors(u))
+        for v, edge in neighbours:
+            nd = d + _edge_cost(edge)
+            if nd < dist.get(v, inf):
+                dist[v] = nd
+                parent[v] = u
+                heapq.heappush(pq, (nd, v))
+    return dist, parent
+
+def _route_stats(graph: Graph, path: list[str]) -> tuple[float, float, set]:
+    """ Length, travel time and the set of (u, v) edges of a node path. """
+    times = graph.travel_times.times if graph.travel_times is not None else None
+    distance = time = 0.0
+    edges = set()
+    for u, v in zip(path, path[1:]):
+        edge = graph.get_edge(u, v)
+        distance += edge['base_weight']
+        time += times[edge['id']] if times is not None else edge_travel_time(edge)
+        edges.add((u, v))
+    return distance, time, edges
+
+def alternative_routes(graph: Graph, start_id: str, end_id: str, max_routes: int = 3,
+                       max_stretch: float = MAX_STRETCH, min_plateau: float = MIN_PLATEAU,
+                       max_sharing: float = MAX_SHARING) -> list[AlternativeRoute]:
+    """
+    Up to max_routes meaningfully different routes, ranked by cost (the first one is the optimal route).
+    Costs are a_star's traffic-aware edge costs without turn penalties.
+    """
+    if start_id not in graph.nodes or end_id not in graph.nodes or start_id == end_id:
+        return []
+    dist_f, parent_f = _search_tree(graph, start_id, end_id, max_stretch, backward=False)
+    if end_id not in dist_f:
+        return []
+    optimum = dist_f[end_id]
+    dist_b, parent_b = _search_tree(graph, end_id, start_id, max_stretch, backward=True)
+
+    # Plateaus: walk the forward tree in distance order; an edge u->v that is also in the backward
+    # tree (v is u's parent there) extends u's plateau to v
+    plateau_of, plateaus = {}, []   # node -> plateau index; plateau = [first node, last node]
+    for v in sorted(dist_f, key=dist_f.__getitem__):
+        if v not in dist_b or dist_f[v] + dist_b[v] > max_stretch * optimum:
+            continue
+        u = parent_f[v]
+        if u is not None and parent_b.get(u) == v and u in plateau_of:
+            p = plateau_of[v] = plateau_of[u]
+            plateaus[p][1] = v
+        else:
+            plateau_of[v] = len(plateaus)
+            plateaus.append([v, v])
+
+    candidates = []
+    for first, last in plateaus:
+        length = dist_f[last] - dist_f[first]
+        if length >= min_plateau * optimum:
+            candidates.append((dist_f[last] + dist_b[last], -length, first, last))
+    candidates.sort()
+
+    routes, route_edges = [], []
+    for cost, neg_length, first, last in candidates:
+        # start -> last along the forward tree, then last -> end along the backward tree
+        path = []
+        node = last
+        while node is not None:
+            path.append(node)
+            node = parent_f[node]
+        path.reverse()
+        node = parent_b[last]
+        while node is not None:
+            path.append(node)
+            node = parent_b[node]
+        if len(set(path)) != len(path):
+            continue   # The two tree paths cross: not a simple route
+
+        distance, time, edges = _route_stats(graph, path)
+        sharing = 0.0
+        for other in route_edges:
+            shared = sum(graph.get_edge(u, v)['base_weight'] for u, v in edges & other)
+            sharing = max(sharing, shared / distance if distance > 0 else 1.0)
+        if sharing > max_sharing:
+            continue
+
+        route = AlternativeRoute(path, cost, distance, time, -neg_length)
+        route.sharing = sharing
+        routes.append(route)
+        route_edges.append(edges)
+        if len(routes) >= max_routes:
+            break
+    return routes
@@ -0,0 +1,1132 @@
+import argparse
+import heapq
+import os
+import random
+import tempfile
+import time
+from xml.sax.saxutils import quoteattr
+
+import copy
+import gc
+import sys
+import tracemalloc
+from array import array
+
+from algorithms import a_star, a_star_bidirectional, a_star_edge_based, a_star_time, route_matrix, find_route, _edge_cost
+from ch import build_hierarchy
+from landmarks import build_landmarks
+from simulation import TrafficSimulator
+from compact import CompactGraph
+from models import Graph, Node, POI
+from parser import load_map, load_osm_data_streaming, load_osm_data_parallel, contract_degree2_chains, keep_only_largest_component
+from snapshot import save_snapshot, load_snapshot
+from spatial import SpatialGrid
+from turns import build_turn_table
+from isochrone import isochrone, isochrones, coverage
+from traveltime import TravelTimes
+from alternatives import alternative_routes
+from replanning import DStarLite
+from routecache import RouteCache
+from maneuvers import build_maneuvers
+from poisearch import PoiIndex, pois_along_route
+from snapping import SnapGrid, snap_to_road, route_between
+from utils import haversine_distance
+from multistop import optimise_order, _nearest_insertion, _tour_cost, UNREACHABLE
+
+DEFAULT_MAP = "mapa_sava.osm"
+
+def write_synthetic_osm(path: str, rows: int, cols: int, seed: int = 42):
+    """
+    Writes a synthetic city extract: a rows x cols street grid with shape points between
+    intersections, mixed road types, one-way streets, untagged building outlines and a few
+    turn restrictions.
+    """
+    rng = random.Random(seed)
+    base_lat, base_lon = 45.70, 15.90
+    step = 0.0009           # ~100 m between intersections
+    road_types = ['residential'] * 6 + ['tertiary', 'secondary', 'primary', 'service']
+
+    next_id = 1
+    def new_id():
+        nonlocal next_id
+        next_id += 1
+        return next_id
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6" generator="routemaster-benchmark">\n')
+
+        # Intersections plus two shape points towards the east and north neighbours
+        grid = {}
+        east, north = {}, {}
+        for r in range(rows):
+            for c in range(cols):
+                lat = base_lat + r * step + rng.uniform(-1e-5, 1e-5)
+                lon = base_lon + c * step + rng.uniform(-1e-5, 1e-5)
+                grid[(r, c)] = (new_id(), lat, lon)
+        for (r, c), (nid, lat, lon) in grid.items():
+            f.write(f' <node id="{nid}" lat="{lat:.7f}" lon="{lon:.7f}"/>\n')
+            if c + 1 < cols:
+                east[(r, c)] = [new_id(), new_id()]
+                for k, sid in enumerate(east[(r, c)], start=1):
+                    f.write(f' <node id="{sid}" lat="{lat + rng.uniform(-2e-5, 2e-5):.7f}" lon="{lon + step * k / 3:.7f}"/>\n')
+            if r + 1 < rows:
+                north[(r, c)] = [new_id(), new_id()]
+                for k, sid in enumerate(north[(r, c)], start=1):
+                    f.write(f' <node id="{sid}" lat="{lat + step * k / 3:.7f}" lon="{lon + rng.uniform(-2e-5, 2e-5):.7f}"/>\n')
+
+        # Building outlines (never part of the road network)
+        buildings = []
+        for _ in range(rows * cols // 2):
+            r, c = rng.randrange(rows), rng.randrange(cols)
+            _, lat, lon = grid[(r, c)]
+            corners = []
+            for dlat, dlon in ((2e-4, 2e-4), (2e-4, 4e-4), (4e-4, 4e-4), (4e-4, 2e-4)):
+                corners.append(new_id())
+                f.write(f' <node id="{corners[-1]}" lat="{lat + dlat:.7f}" lon="{lon + dlon:.7f}"/>\n')
+            buildings.append(corners)
+
+        # POIs
+        for _ in range(max(1, rows * cols // 20)):
+            r, c = rng.randrange(rows), rng.randrange(cols)
+            _, lat, lon = grid[(r, c)]
+            kind = rng.choice(['school', 'shop', 'park'])
+            tag = '<tag k="shop" v="yes"/>' if kind == 'shop' else f'<tag k="amenity" v="{kind}"/>'
+            f.write(f' <node id="{new_id()}" lat="{lat + 1e-4:.7f}" lon="{lon + 1e-4:.7f}">{tag}'
+                    f'<tag k="name" v="POI {next_id}"/></node>\n')
+
+        def write_way(refs, road_type, name, oneway):
+            way_id = new_id()
+            f.write(f' <way id="{way_id}">')
+            f.write(''.join(f'<nd ref="{ref}"/>' for ref in refs))
+            f.write(f'<tag k="highway" v="{road_type}"/><tag k="name" v={quoteattr(name)}/>')
+            if oneway: f.write('<tag k="oneway" v="yes"/>')
+            f.write('</way>\n')
+            return way_id
+
+        # East-west streets, one way per row (blocks of 8 intersections)
+        row_ways, column_ways = {}, {}   # intersection -> way through it
+        for r in range(rows):
+            road_type = rng.choice(road_types)
+            for c0 in range(0, cols - 1, 8):
+                refs = []
+                for c in range(c0, min(c0 + 8, cols - 1)):
+                    refs.append(grid[(r, c)][0])
+                    refs.extend(east[(r, c)])
+                refs.append(grid[(r, min(c0 + 8, cols - 1))][0])
+                way_id = write_way(refs, road_type, f"Row Street {r}", r % 5 == 0)
+                for c in range(c0, min(c0 + 8, cols - 1) + 1):
+                    row_ways.setdefault((r, c), way_id)
+
+        # North-south streets
+        for c in range(cols):
+            road_type = rng.choice(road_types)
+            for r0 in range(0, rows - 1, 8):
+                refs = []
+                for r in range(r0, min(r0 + 8, rows - 1)):
+                    refs.append(grid[(r, c)][0])
+                    refs.extend(north[(r, c)])
+                refs.append(grid[(min(r0 + 8, rows - 1), c)][0])
+                way_id = write_way(refs, road_type, f"Column Avenue {c}", False)
+                for r in range(r0, min(r0 + 8, rows - 1) + 1):
+                    column_ways.setdefault((r, c), way_id)
+
+        for corners in buildings:
+            f.write(f' <way id="{new_id()}">')
+            f.write(''.join(f'<nd ref="{ref}"/>' for ref in corners + corners[:1]))
+            f.write('<tag k="building" v="yes"/></way>\n')
+
+        # Turn restrictions: no turning from the street into the avenue at some intersections
+        for _ in range(rows * cols // 25):
+            r, c = rng.randrange(rows), rng.randrange(cols)
+            f.write(f' <relation id="{new_id()}"><member type="way" ref="{row_ways[(r, c)]}" role="from"/>'
+                    f'<member type="node" ref="{grid[(r, c)][0]}" role="via"/>'
+                    f'<member type="way" ref="{column_ways[(r, c)]}" role="to"/>'
+                    f'<tag k="type" v="restriction"/><tag k="restriction" v="no_left_turn"/></relation>\n')
+
+        f.write('</osm>\n')
+
+def _snapshot_bytes(graph, source_path: str) -> bytes:
+    """ Canonical binary form of a graph (the snapshot format), used to compare loader outputs. """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'graph.snap')
+        save_snapshot(graph, path, source_path)
+        with open(path, 'rb') as f:
+            return f.read()
+
+def _best_time(fn, repeat: int):
+    """ Runs fn `repeat` times, returns (best wall time, last result). """
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_parallel(args):
+    """ Scaling of load_osm_data_parallel with the number of worker processes. """
+    max_workers = args.max_workers or os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, 16, max_workers} & set(range(1, max_workers + 1)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = os.path.join(tmp, 'synthetic.osm')
+        write_synthetic_osm(synthetic, args.size, args.size)
+        maps = [(args.map, args.map), (f"synthetic {args.size}x{args.size}", synthetic)]
+
+        results = []
+        for label, path in maps:
+            if not os.path.exists(path):
+                print(f"Skipping {label}: file not found.")
+                continue
+
+            serial_time, serial = _best_time(lambda: load_osm_data_streaming(path), args.repeat)
+            reference = _snapshot_bytes(serial, path)
+
+            rows = [("serial", serial_time, True)]
+            for workers in worker_counts:
+                elapsed, graph = _best_time(lambda: load_osm_data_parallel(path, workers), args.repeat)
+                rows.append((f"{workers} workers", elapsed, _snapshot_bytes(graph, path) == reference))
+            results.append((label, os.path.getsize(path), rows))
+
+    print("\n=== Parallel way processing ===")
+    for label, size, rows in results:
+        print(f"\n{label} ({size / 1e6:.1f} MB)")
+        serial_time = rows[0][1]
+        for name, elapsed, identical in rows:
+            print(f"  {name:<12} {elapsed:7.2f}s   speedup x{serial_time / elapsed:4.2f}   identical: {identical}")
+
+def bench_coldstart(args):
+    """ Startup cost: parsing the map (plus contraction and grid) vs. loading its snapshot as a Graph or a CompactGraph. """
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = os.path.join(tmp, 'synthetic.osm')
+        write_synthetic_osm(synthetic, args.size, args.size)
+        maps = [(args.map, args.map), (f"synthetic {args.size}x{args.size}", synthetic)]
+
+        results = []
+        for label, path in maps:
+            if not os.path.exists(path):
+                print(f"Skipping {label}: file not found.")
+                continue
+
+            def parse():
+                graph = load_map(path)
+                contract_degree2_chains(graph)
+                return graph, SpatialGrid(graph)
+
+            snapshot_path = os.path.join(tmp, 'graph.snap')
+            parse_time, (graph, grid) = _best_time(parse, args.repeat)
+            save_snapshot(graph, snapshot_path, path, grid)
+            rows = [("parse", parse_time)]
+            for name, compact in (("snapshot Graph", False), ("snapshot compact", True)):
+                elapsed, _ = _best_time(lambda: load_snapshot(snapshot_path, path, compact), args.repeat)
+                rows.append((name, elapsed))
+            results.append((label, len(graph.nodes), len(graph.edge_list), os.path.getsize(snapshot_path), rows))
+            del graph, grid
+
+    print("\n=== Cold start ===")
+    for label, nodes, edges, size, rows in results:
+        print(f"\n{label}: {nodes} nodes, {edges} edges, snapshot {size / 1024:.0f} KB")
+        parse_time = rows[0][1]
+        for name, elapsed in rows:
+            print(f"  {name:<17} {1000 * elapsed:9.1f} ms   speedup x{parse_time / elapsed:6.1f}")
+
+def _random_pairs(graph, count: int, seed: int = 7) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    node_ids = list(graph.nodes)
+    return [tuple(rng.sample(node_ids, 2)) for _ in range(count)]
+
+def _load_maps(args, tmp: str) -> list[tuple[str, object]]:
+    """ Loads the real extract (if present) and a synthetic size x size grid city. """
+    maps = []
+    if os.path.exists(args.map):
+        maps.append((args.map, load_osm_data_streaming(args.map)))
+    synthetic = os.path.join(tmp, 'synthetic.osm')
+    write_synthetic_osm(synthetic, args.size, args.size)
+    maps.append((f"synthetic {args.size}x{args.size}", load_osm_data_streaming(synthetic)))
+    return maps
+
+def bench_contraction(args):
+    """ A* heap operations and latency with and without degree-2 chain contraction. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Degree-2 chain contraction ===")
+    for label, graph in maps:
+        simplified = copy.deepcopy(graph)
+        contract_degree2_chains(simplified)
+
+        # Query between intersections, which exist in both graphs
+        pairs = _random_pairs(simplified, args.queries)
+        print(f"\n{label}: {len(graph.nodes)} -> {len(simplified.nodes)} nodes")
+        for name, g in (("original", graph), ("contracted", simplified)):
+            heap_ops, elapsed = 0, 0.0
+            for s, t in pairs:
+                stats = {}
+                start = time.perf_counter()
+                a_star(g, s, t, stats)
+                elapsed += time.perf_counter() - start
+                heap_ops += stats['pushes'] + stats['pops']
+            print(f"  {name:<11} heap ops/query {heap_ops / len(pairs):10.0f}   "
+                  f"latency {1000 * elapsed / len(pairs):8.2f} ms")
+
+def bench_bidirectional(args):
+    """ Settled nodes and latency: unidirectional A* vs. bidirectional A*, with straight-line and ALT bounds. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Unidirectional vs. bidirectional A* ===")
+    for label, graph in maps:
+        # Random pairs are only meaningful inside one strongly connected component
+        keep_only_largest_component(graph)
+        pairs = _random_pairs(graph, args.queries)
+
+        landmarks = build_landmarks(graph)
+
+        print(f"\n{label}: {len(graph.nodes)} nodes")
+        costs = {}
+        for name, search in (("A*", a_star), ("bidirectional", a_star_bidirectional),
+                             ("A* ALT", lambda g, s, t, st: a_star(g, s, t, st, landmarks)),
+                             ("bidir. ALT", lambda g, s, t, st: a_star_bidirectional(g, s, t, st, landmarks))):
+            settled, elapsed = 0, 0.0
+            costs[name] = []
+            for s, t in pairs:
+                stats = {}
+                start = time.perf_counter()
+                path, _ = search(graph, s, t, stats)
+                elapsed += time.perf_counter() - start
+                settled += stats['settled']
+                # Compared without turn penalties: a_star adds them, the bidirectional search does not
+                costs[name].append(sum(_edge_cost(graph.get_edge(u, v)) for u, v in zip(path, path[1:]))
+                                   if path else float('infinity'))
+            print(f"  {name:<14} settled/query {settled / len(pairs):9.0f}   "
+                  f"latency {1000 * elapsed / len(pairs):8.2f} ms")
+        # The bidirectional routes are exact for the penalty-free cost, so they are never longer
+        deltas = [(a - b) / a for a, b in zip(costs["A*"], costs["bidirectional"]) if 0 < a < float('inf')]
+        if deltas:
+            print(f"  penalty-free route cost, bidirectional vs. A*: mean {-100 * sum(deltas) / len(deltas):+.3f}%, "
+                  f"worst {-100 * min(deltas):+.3f}%")
+        mismatched = sum(1 for a, b in zip(costs["bidirectional"], costs["bidir. ALT"]) if abs(a - b) > 1e-6 * max(1.0, a))
+        print(f"  bidirectional with ALT bounds: same route cost on {len(pairs) - mismatched} of {len(pairs)} queries")
+
+def bench_ch(args):
+    """ Contraction hierarchy preprocessing cost and query latency vs. A*. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Contraction Hierarchies ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        start = time.perf_counter()
+        hierarchy = build_hierarchy(graph)
+        build_time = time.perf_counter() - start
+        edge_count = sum(len(edges) for edges in graph.edges.values())
+        pairs = _random_pairs(graph, args.queries)
+
+        print(f"\n{label}: {len(graph.nodes)} nodes, {edge_count} edges, "
+              f"{hierarchy.shortcut_count} shortcuts, preprocessing {build_time:.1f}s")
+        for name, search in (("A*", a_star), ("CH", lambda g, s, t, stats: hierarchy.query(s, t, stats))):
+            settled, elapsed = 0, 0.0
+            for s, t in pairs:
+                stats = {}
+                start = time.perf_counter()
+                search(graph, s, t, stats)
+                elapsed += time.perf_counter() - start
+                settled += stats['settled']
+            print(f"  {name:<4} settled/query {settled / len(pairs):9.0f}   latency {1000 * elapsed / len(pairs):8.2f} ms")
+
+def bench_alt(args):
+    """ Nodes expanded and latency: A* with the straight-line bound vs. the ALT landmark bound. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== ALT landmarks vs. straight-line heuristic ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        start = time.perf_counter()
+        landmarks = build_landmarks(graph, args.landmarks)
+        build_time = time.perf_counter() - start
+
+        # Optional random jams: they inflate weights, which neither bound knows about
+        rng = random.Random(11)
+        simulator = TrafficSimulator(graph)
+        node_ids = list(graph.nodes)
+        for _ in range(int(args.jams * len(node_ids))):
+            u = rng.choice(node_ids)
+            if graph.edges[u]:
+                simulator.apply_jam(u, rng.choice(graph.edges[u])['to'])
+
+        pairs = _random_pairs(graph, args.queries)
+        print(f"\n{label}: {len(graph.nodes)} nodes, {len(landmarks.landmarks)} landmarks "
+              f"(preprocessing {build_time:.2f}s), {len(simulator.affected_edges)} jammed roads")
+        for name, lm in (("haversine", None), ("ALT", landmarks)):
+            settled, elapsed = 0, 0.0
+            for s, t in pairs:
+                stats = {}
+                start = time.perf_counter()
+                a_star(graph, s, t, stats, lm)
+                elapsed += time.perf_counter() - start
+                settled += stats['settled']
+            print(f"  {name:<10} expanded/query {settled / len(pairs):9.0f}   latency {1000 * elapsed / len(pairs):8.2f} ms")
+
+def bench_edge(args):
+    """ Node-based A* (turn penalty from the search tree) vs. edge-based A* on precomputed turn tables. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Node-based vs. edge-based A* ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        start = time.perf_counter()
+        graph.turn_table = build_turn_table(graph)
+        build_time = time.perf_counter() - start
+
+        pairs = _random_pairs(graph, args.queries)
+        print(f"\n{label}: {len(graph.nodes)} nodes, {graph.turn_table.turn_count} turns "
+              f"({len(graph.restrictions)} restrictions), table built in {build_time:.2f}s")
+        costs = {}
+        for name, search in (("node-based", a_star), ("edge-based", a_star_edge_based)):
+            settled, elapsed = 0, 0.0
+            costs[name] = []
+            for s, t in pairs:
+                stats = {}
+                start = time.perf_counter()
+                _, cost = search(graph, s, t, stats)
+                elapsed += time.perf_counter() - start
+                settled += stats['settled']
+                costs[name].append(cost)
+            print(f"  {name:<11} settled/query {settled / len(pairs):9.0f}   "
+                  f"latency {1000 * elapsed / len(pairs):8.2f} ms")
+        # Node-based costs ignore restrictions and can miss cheaper turns, so they differ both ways
+        changed = sum(1 for a, b in zip(costs["node-based"], costs["edge-based"]) if abs(a - b) > 1e-6)
+        cheaper = sum(1 for a, b in zip(costs["node-based"], costs["edge-based"]) if b < a - 1e-6)
+        print(f"  route cost differs on {changed} of {len(pairs)} queries ({cheaper} cheaper edge-based)")
+
+def _nearby_pairs(graph, count: int, hops: int, seed: int = 7) -> list[tuple[str, str]]:
+    """ Pairs whose target is a random walk of `hops` edges away from the source (like a live reroute). """
+    rng = random.Random(seed)
+    node_ids = list(graph.nodes)
+    pairs = []
+    while len(pairs) < count:
+        s = t = rng.choice(node_ids)
+        for _ in range(hops):
+            edges = graph.get_neighbors(t)
+            if not edges: break
+            t = rng.choice(edges)['to']
+        if t != s:
+            pairs.append((s, t))
+    return pairs
+
+def bench_workspace(args):
+    """ Per-query latency and allocations of A* on short and long queries. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== A* per-query setup (search workspace) ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        print(f"\n{label}: {len(graph.nodes)} nodes")
+        query_sets = (("short", _nearby_pairs(graph, args.queries, args.hops)),
+                      ("long", _random_pairs(graph, args.queries)))
+        for graph_name, g in (("Graph", graph), ("CompactGraph", CompactGraph.from_graph(graph))):
+            for kind, pairs in query_sets:
+                a_star(g, *pairs[0])   # Warm-up (first query sets the workspace up)
+                start = time.perf_counter()
+                for s, t in pairs:
+                    a_star(g, s, t)
+                latency = (time.perf_counter() - start) / len(pairs)
+
+                # Peak memory allocated during a query, measured in a separate (slower) pass
+                allocated = 0
+                tracemalloc.start()
+                for s, t in pairs:
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    a_star(g, s, t)
+                    allocated += tracemalloc.get_traced_memory()[1] - before
+                tracemalloc.stop()
+                print(f"  {graph_name:<12} {kind:<5} latency {1000 * latency:8.3f} ms   "
+                      f"allocated/query {allocated / len(pairs) / 1024:9.1f} KB")
+
+def bench_matrix(args):
+    """ Origin-destination matrix: one A* per pair vs. one-to-many searches, serial and in a process pool. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Many-to-many matrix ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        rng = random.Random(5)
+        origins = rng.sample(list(graph.nodes), min(args.origins, len(graph.nodes)))
+        destinations = rng.sample(list(graph.nodes), min(args.origins, len(graph.nodes)))
+        print(f"\n{label}: {len(graph.nodes)} nodes, {len(origins)} x {len(destinations)} matrix")
+
+        # A* per pair is far too slow for the full matrix: time one row and extrapolate
+        start = time.perf_counter()
+        for t in destinations:
+            a_star(graph, origins[0], t)
+        row_time = time.perf_counter() - start
+        print(f"  {'A* per pair':<20} {row_time * len(origins):8.2f}s (extrapolated from one row)")
+
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            matrix = route_matrix(graph, origins, destinations, workers=workers)
+            elapsed = time.perf_counter() - start
+            reachable = sum(1 for d in matrix.distances if d < float('inf'))
+            print(f"  {f'one-to-many x{workers}':<20} {elapsed:8.2f}s   {reachable} reachable pairs")
+
+def bench_isochrone(args):
+    """ Bounded isochrone searches vs. a full search, and many origins one by one vs. in one coverage pass. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Isochrones ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        rng = random.Random(9)
+        origins = rng.sample(list(graph.nodes), min(args.origins, len(graph.nodes)))
+        print(f"\n{label}: {len(graph.nodes)} nodes, budget {args.minutes} min, {len(origins)} origins")
+
+        for name, budget in (("unbounded", float('infinity')), ("bounded", args.minutes * 60)):
+            start = time.perf_counter()
+            reached = sum(len(isochrone(graph, origin, budget).times) for origin in origins[:10])
+            elapsed = (time.perf_counter() - start) / 10
+            print(f"  {name:<10} {1000 * elapsed:8.2f} ms/origin   {reached / 10:8.0f} nodes reached")
+
+        start = time.perf_counter()
+        results = isochrones(graph, origins, args.minutes * 60)
+        each_time = time.perf_counter() - start
+        start = time.perf_counter()
+        covered = coverage(graph, origins, args.minutes * 60)
+        coverage_time = time.perf_counter() - start
+        union = len({n for iso in results for n in iso.times})
+        print(f"  per-origin isochrones {each_time:7.2f}s   coverage pass {coverage_time:7.2f}s   "
+              f"covered {len(covered)} nodes ({union} in the union of the isochrones)")
+
+def bench_time(args):
+    """ Shortest (A*) vs. fastest (time A*) routes: ETA, latency and the cost of keeping edge times current. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Distance vs. travel-time routing ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        start = time.perf_counter()
+        graph.travel_times = TravelTimes(graph)
+        build_time = time.perf_counter() - start
+
+        rng = random.Random(11)
+        simulator = TrafficSimulator(graph)
+        simulator.add_listener(graph.travel_times.edge_changed)
+        node_ids = list(graph.nodes)
+        jams = 0
+        start = time.perf_counter()
+        for _ in range(int(args.jams * len(node_ids))):
+            u = rng.choice(node_ids)
+            if graph.edges[u]:
+                simulator.apply_jam(u, rng.choice(graph.edges[u])['to'])
+                jams += 1
+        update_time = (time.perf_counter() - start) / max(1, jams)
+
+        pairs = _random_pairs(graph, args.queries)
+        print(f"\n{label}: {len(graph.nodes)} nodes, edge times built in {1000 * build_time:.1f} ms, "
+              f"{jams} jams applied ({1e6 * update_time:.1f} us each incl. time updates)")
+        for name, search in (("shortest", a_star), ("fastest", a_star_time)):
+            eta, elapsed, found = 0.0, 0.0, 0
+            for s, t in pairs:
+                start = time.perf_counter()
+                path, _ = search(graph, s, t)
+                elapsed += time.perf_counter() - start
+                if path:
+                    eta += graph.travel_times.path_time(graph, path)
+                    found += 1
+            print(f"  {name:<9} mean ETA {eta / max(1, found):8.1f} s   latency {1000 * elapsed / len(pairs):8.2f} ms")
+
+def _penalty_alternatives(graph, s, t, k: int, penalty: float = 1.5) -> list[list[str]]:
+    """ Baseline: k A* runs, each with the edges of the routes found so far made `penalty` times costlier. """
+    routes, touched = [], {}
+    try:
+        for _ in range(k):
+            path, _ = a_star(graph, s, t)
+            if not path: break
+            if path not in routes:
+                routes.append(path)
+            for u, v in zip(path, path[1:]):
+                edge = graph.get_edge(u, v)
+                touched.setdefault(id(edge), (edge, edge['weight']))
+                edge['weight'] *= penalty
+    finally:
+        for edge, weight in touched.values():
+            edge['weight'] = weight
+    return routes
+
+def bench_alternatives(args):
+    """ Plateau alternatives (two tree searches) vs. the penalty method (one A* per route). """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Alternative routes ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        pairs = _random_pairs(graph, args.queries)
+        print(f"\n{label}: {len(graph.nodes)} nodes, {len(pairs)} queries, up to {args.routes} routes each")
+
+        start = time.perf_counter()
+        found = sum(len(alternative_routes(graph, s, t, max_routes=args.routes)) for s, t in pairs)
+        elapsed = time.perf_counter() - start
+        print(f"  {'plateau':<8} {1000 * elapsed / len(pairs):8.2f} ms/query   {found / len(pairs):.2f} routes/query")
+
+        start = time.perf_counter()
+        found = sum(len(_penalty_alternatives(graph, s, t, args.routes)) for s, t in pairs)
+        elapsed = time.perf_counter() - start
+        print(f"  {'penalty':<8} {1000 * elapsed / len(pairs):8.2f} ms/query   {found / len(pairs):.2f} routes/query")
+
+def bench_replan(args):
+    """ Live rerouting: a fresh A* after every traffic edit vs. repairing one D* Lite search. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Incremental replanning ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        rng = random.Random(13)
+        # A long trip: the pair with the longest route among a few random ones
+        trips = [(s, t, a_star(graph, s, t)[0]) for s, t in _random_pairs(graph, 10)]
+        s, t, path = max(trips, key=lambda trip: len(trip[2]))
+        if not path:
+            continue
+        simulator = TrafficSimulator(graph)
+        planner = DStarLite(graph, s, t)
+        simulator.add_listener(planner.edge_changed)
+
+        start = time.perf_counter()
+        planner.route()
+        initial_time = time.perf_counter() - start
+        initial_expanded = planner.expanded
+        print(f"\n{label}: {len(graph.nodes)} nodes, route of {len(path)} nodes, "
+              f"initial D* Lite search {1000 * initial_time:.1f} ms ({initial_expanded} expansions)")
+
+        # The car advances a few nodes between edits; every edit jams (or blocks) a road just ahead of it
+        astar_time = replan_time = 0.0
+        position, edits = 0, 0
+        while edits < args.edits and position < len(path) - 3:
+            position += rng.randint(0, 2)
+            ahead = min(position + rng.randint(1, 5), len(path) - 2)
+            if rng.random() < 0.3:
+                simulator.block_road(path[ahead], path[ahead + 1])
+            else:
+                simulator.apply_jam(path[ahead], path[ahead + 1])
+            edits += 1
+
+            start = time.perf_counter()
+            a_star(graph, path[position], t)
+            astar_time += time.perf_counter() - start
+            start = time.perf_counter()
+            planner.move_to(path[position])
+            new_path, _ = planner.route()
+            replan_time += time.perf_counter() - start
+            if not new_path:
+                break
+            path = path[:position] + new_path
+        edits = max(1, edits)
+        print(f"  {'A* from scratch':<16} {1000 * astar_time / edits:8.2f} ms/edit")
+        print(f"  {'D* Lite repair':<16} {1000 * replan_time / edits:8.2f} ms/edit   "
+              f"{(planner.expanded - initial_expanded) / edits:.0f} expansions/edit ({edits} edits)")
+
+def bench_cache(args):
+    """ Repeated origin/destination queries with traffic edits in between, with and without the route cache. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Route cache ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        pairs = _random_pairs(graph, args.pairs)
+        node_ids = list(graph.nodes)
+        print(f"\n{label}: {len(graph.nodes)} nodes, {args.queries} queries over {len(pairs)} pairs, "
+              f"a jam every {args.edit_every} queries")
+
+        for cached in (False, True):
+            simulator = TrafficSimulator(graph)
+            graph.route_cache = RouteCache(graph) if cached else None
+            if cached:
+                graph.route_cache.attach(simulator)
+            rng = random.Random(17)
+            start = time.perf_counter()
+            for i in range(args.queries):
+                if i % args.edit_every == args.edit_every - 1:
+                    u = rng.choice(node_ids)
+                    if graph.edges[u]:
+                        simulator.apply_jam(u, rng.choice(graph.edges[u])['to'])
+                s, t = rng.choice(pairs)
+                find_route(graph, s, t)
+            elapsed = time.perf_counter() - start
+            simulator.reset_all()
+            line = f"  {'cached' if cached else 'uncached':<9} {1000 * elapsed / args.queries:8.3f} ms/query"
+            if cached:
+                c = graph.route_cache.counters()
+                line += (f"   hit rate {100 * c['hit_rate']:.0f}%   {c['invalidations']} invalidations, "
+                         f"{c['evictions']} evictions")
+            print(line)
+        graph.route_cache = None
+
+def _rescan_next_turn(graph, path: list[str], segment: int) -> tuple[str, float]:
+    """ Baseline HUD lookup: walk the rest of the path until the street name changes. """
+    name = graph.get_edge(path[segment], path[segment + 1]).get('name')
+    distance = 0.0
+    for u, v in zip(path[segment + 1:], path[segment + 2:]):
+        edge = graph.get_edge(u, v)
+        if edge.get('name') != name:
+            return edge.get('name'), distance
+        distance += edge['weight']
+    return "Destination", distance
+
+def bench_instructions(args):
+    """ Maneuver list build time, and per-frame next-maneuver lookup: path rescan vs. binary search. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Turn-by-turn maneuvers ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        routes = [path for path, _ in (a_star(graph, s, t) for s, t in _random_pairs(graph, args.routes)) if len(path) > 2]
+        if not routes:
+            continue
+        nodes = sum(len(path) for path in routes)
+
+        start = time.perf_counter()
+        lists = [build_maneuvers(graph, path) for path in routes]
+        build_time = time.perf_counter() - start
+        maneuvers = sum(len(m.maneuvers) for m in lists)
+        print(f"\n{label}: {len(routes)} routes, {nodes / len(routes):.0f} nodes and "
+              f"{maneuvers / len(routes):.1f} maneuvers each, built in {1e6 * build_time / nodes:.2f} us/node")
+
+        # One HUD update per animation frame, 10 frames per path segment
+        frames = [(path, m, segment, step / 10) for path, m in zip(routes, lists)
+                  for segment in range(len(path) - 1) for step in range(10)]
+        start = time.perf_counter()
+        for path, _, segment, _ in frames:
+            _rescan_next_turn(graph, path, segment)
+        rescan_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _, m, segment, fraction in frames:
+            m.hud_text(segment, fraction)
+        lookup_time = time.perf_counter() - start
+        print(f"  {'rescan':<14} {1e6 * rescan_time / len(frames):8.2f} us/frame")
+        print(f"  {'binary search':<14} {1e6 * lookup_time / len(frames):8.2f} us/frame")
+
+def bench_stops(args):
+    """ Multi-stop ordering on random stop sets: bulk matrix vs. A* per pair, and tour quality per stage. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Multi-stop route optimisation ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        print(f"\n{label}: {len(graph.nodes)} nodes")
+        rng = random.Random(23)
+        for count in args.stops:
+            if count > len(graph.nodes):
+                continue
+            stops = rng.sample(list(graph.nodes), count)
+
+            start = time.perf_counter()
+            matrix = route_matrix(graph, stops, stops)
+            matrix_time = time.perf_counter() - start
+            # A* per pair: time one row and extrapolate
+            start = time.perf_counter()
+            for t in stops[1:]:
+                a_star(graph, stops[0], t)
+            pairs_time = (time.perf_counter() - start) * count
+
+            cost = [[min(matrix.time(i, j), UNREACHABLE) for j in range(count)] for i in range(count)]
+            start = time.perf_counter()
+            order = optimise_order(cost, time_budget=args.budget)
+            order_time = time.perf_counter() - start
+            given = _tour_cost(cost, list(range(count)), False)
+            inserted = _tour_cost(cost, _nearest_insertion(cost, False), False)
+            improved = _tour_cost(cost, order, False)
+            print(f"  {count:3} stops: matrix {1000 * matrix_time:8.1f} ms (A* per pair ~{1000 * pairs_time:8.1f} ms), "
+                  f"order {1000 * order_time:7.1f} ms   tour {given / 60:6.1f} min as given, "
+                  f"{inserted / 60:6.1f} nearest insertion, {improved / 60:6.1f} after 2-opt/Or-opt")
+
+def _parallel_road_detour() -> float:
+    """
+    Regression case: route A-B-C (1000 m per edge), shop on a parallel one-way road A->P (1100 m), P->C (1101 m).
+    Leaving at A and rejoining at C skips the whole route, so the detour is 1100 + 1101 - 2000 = 201.
+    """
+    graph = Graph()
+    for node_id, lat, lon in (("A", 45.0, 15.0), ("B", 45.0, 15.0127), ("C", 45.0, 15.0254), ("P", 45.005, 15.0127)):
+        graph.add_node(node_id, lat, lon)
+    for u, v, weight in (("A", "B", 1000), ("B", "A", 1000), ("B", "C", 1000), ("C", "B", 1000),
+                         ("A", "P", 1100), ("P", "C", 1101)):
+        graph.add_edge(u, v, weight)
+    graph.pois.append(POI(45.005, 15.0127, 'shop', "S"))
+    matches = pois_along_route(graph, ["A", "B", "C"], 'shop')
+    if len(matches) != 1 or abs(matches[0].detour - 201) > 1e-6 or (matches[0].leave_index, matches[0].rejoin_index) != (0, 2):
+        raise RuntimeError(f"pois_along_route regression: expected a detour of 201 via A and C, got {matches}")
+    return matches[0].detour
+
+def _reference_detours(graph: Graph, path: list[str], node_ids) -> dict[str, float]:
+    """
+    Brute-force detours for pois_along_route: per POI node, one Dijkstra into it and one out of it
+    (until every route node is settled), then the cheapest leaving point i and rejoining point j.
+    """
+    along = [0.0]
+    for u, v in zip(path, path[1:]):
+        along.append(along[-1] + _edge_cost(graph.get_edge(u, v)))
+    total = along[-1]
+    detours = {}
+    for node_id in node_ids:
+        legs = []
+        for backward in (True, False):
+            dist = {node_id: 0.0}
+            remaining = set(path)
+            pq = [(0.0, node_id)]
+            while pq and remaining:
+                d, u = heapq.heappop(pq)
+                if d > dist[u]: continue
+                remaining.discard(u)
+                neighbours = graph.get_incoming(u) if backward else ((edge['to'], edge) for edge in graph.get_neighbors(u))
+                for v, edge in neighbours:
+                    nd = d + _edge_cost(edge)
+                    if nd < dist.get(v, float('infinity')):
+                        dist[v] = nd
+                        heapq.heappush(pq, (nd, v))
+            legs.append(dist)
+        into, out_of = legs
+        out = min(along[i] + into.get(p, float('infinity')) for i, p in enumerate(path))
+        back = min(out_of.get(p, float('infinity')) + total - along[j] for j, p in enumerate(path))
+        detours[node_id] = max(0.0, out + back - total)
+    return detours
+
+def bench_pois(args):
+    """ POIs of one type ranked by detour from a route: two multi-source searches vs. two A* per POI, checked against brute force. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== POIs along the route ===")
+    print(f"parallel-road check: detour {_parallel_road_detour():.0f} (expected 201)")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        start = time.perf_counter()
+        graph.poi_index = PoiIndex(graph, SpatialGrid(graph))
+        index_time = time.perf_counter() - start
+        poi_type = (graph.poi_index.types() or [None])[0]
+        if poi_type is None:
+            continue
+        candidates = graph.poi_index.by_type[poi_type]
+        routes = [path for path, _ in (a_star(graph, s, t) for s, t in _random_pairs(graph, args.routes)) if path]
+        print(f"\n{label}: {len(graph.pois)} POIs snapped in {1000 * index_time:.1f} ms (incl. grid), "
+              f"{len(candidates)} '{poi_type}' nodes, {len(routes)} routes")
+
+        start = time.perf_counter()
+        for path in routes:
+            pois_along_route(graph, path, poi_type, max_detour=float('infinity'))
+        search_time = (time.perf_counter() - start) / len(routes)
+
+        # Baseline: via-POI route start -> POI -> end for every candidate (on a few routes; it is slow)
+        sample = routes[:3]
+        start = time.perf_counter()
+        for path in sample:
+            for node_id in candidates:
+                a_star(graph, path[0], node_id)
+                a_star(graph, node_id, path[-1])
+        via_time = (time.perf_counter() - start) / len(sample)
+        print(f"  {'multi-source':<14} {1000 * search_time:8.1f} ms/route")
+        print(f"  {'A* via POI':<14} {1000 * via_time:8.1f} ms/route")
+
+        # Rankings against the brute-force detours, with the visualizer's default detour limit and without one
+        mismatched = 0
+        for path in sample:
+            reference = _reference_detours(graph, path, candidates)
+            for max_detour in (3000.0, float('infinity')):
+                expected = sorted(reference[node_id] for node_id, pois in candidates.items() for _ in pois
+                                  if reference[node_id] <= max_detour)
+                got = [m.detour for m in pois_along_route(graph, path, poi_type, k=len(graph.pois), max_detour=max_detour)]
+                if len(got) != len(expected) or any(abs(a - b) > 1e-6 for a, b in zip(got, expected)):
+                    mismatched += 1
+        print(f"  ranking check: {mismatched} of {2 * len(sample)} rankings differ from brute force (expected 0)")
+        graph.poi_index = None
+
+def bench_snap(args):
+    """ Snapping clicks to roads (spatial grid + edge projection) vs. scanning every node, and mid-edge routing. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Snapping points to roads ===")
+    for label, graph in maps:
+        keep_only_largest_component(graph)
+        contract_degree2_chains(graph)
+        grid = SpatialGrid(graph)
+        start = time.perf_counter()
+        snap_grid = SnapGrid(graph)
+        build_time = time.perf_counter() - start
+        # Query points: random nodes moved up to ~100 m in each direction
+        rng = random.Random(7)
+        node_ids = list(graph.nodes)
+        points = []
+        for _ in range(args.points):
+            node = graph.nodes[rng.choice(node_ids)]
+            points.append((node.lat + rng.uniform(-0.001, 0.001), node.lon + rng.uniform(-0.001, 0.001)))
+        print(f"\n{label}: {len(graph.nodes)} nodes, {len(points)} points, "
+              f"{snap_grid.rows}x{snap_grid.cols} snapping grid built in {1000 * build_time:.0f} ms")
+
+        start = time.perf_counter()
+        for lat, lon in points:
+            snap_to_road(graph, grid, lat, lon)
+        grid_time = (time.perf_counter() - start) / len(points)
+        start = time.perf_counter()
+        snaps = [snap_to_road(graph, snap_grid, lat, lon) for lat, lon in points]
+        snap_time = (time.perf_counter() - start) / len(points)
+
+        sample = points[:20]   # The node scan is O(N) per point
+        start = time.perf_counter()
+        nearest = [min(graph.nodes.values(), key=lambda n: haversine_distance(lat, lon, n.lat, n.lon)).id
+                   for lat, lon in sample]
+        scan_time = (time.perf_counter() - start) / len(sample)
+        print(f"  {'SnapGrid':<14} {1000 * snap_time:8.3f} ms/point")
+        print(f"  {'SpatialGrid':<14} {1000 * grid_time:8.3f} ms/point")
+        print(f"  {'node scan':<14} {1000 * scan_time:8.3f} ms/point")
+
+        # Routes between the snapped points vs. between the nearest nodes of the same points
+        snapped = [s for s in snaps if s is not None]
+        pairs = list(zip(snapped[0::2], snapped[1::2]))[:args.routes]
+        start = time.perf_counter()
+        for a, b in pairs:
+            route_between(graph, a, b)
+        mid_time = (time.perf_counter() - start) / len(pairs)
+        start = time.perf_counter()
+        for a, b in pairs:
+            a_star(graph, a.nearest_node(), b.nearest_node())
+        node_time = (time.perf_counter() - start) / len(pairs)
+        print(f"  {'mid-edge route':<14} {1000 * mid_time:8.1f} ms/route")
+        print(f"  {'node route':<14} {1000 * node_time:8.1f} ms/route")
+
+def _deep_sizeof(obj, seen: set | None = None) -> int:
+    """ Approximate memory footprint of an object graph (containers, Nodes, arrays, strings). """
+    seen = set() if seen is None else seen
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen: continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif isinstance(o, Node):
+            stack.append(o.__dict__)
+    return total
+
+def _graph_memory(graph) -> int:
+    """ Memory of the routing structures only (POIs and street index are shared by both models). """
+    if isinstance(graph, CompactGraph):
+        parts = [graph.node_ids, graph.index, graph.road_types, graph.names]
+        parts += [v for v in vars(graph).values() if isinstance(v, array)]
+    else:
+        parts = [graph.nodes, graph.edges]
+    seen = set()
+    return sum(_deep_sizeof(p, seen) for p in parts)
+
+def bench_compact(args):
+    """ Memory and A* latency: dict-of-dicts Graph vs. CSR CompactGraph. """
+    with tempfile.TemporaryDirectory() as tmp:
+        maps = _load_maps(args, tmp)
+
+    print("\n=== Dict graph vs. CompactGraph (CSR) ===")
+    for label, graph in maps:
+        compact = CompactGraph.from_graph(graph)
+        edge_count = len(compact.targets)
+        pairs = _random_pairs(graph, args.queries)
+
+        print(f"\n{label}: {len(graph.nodes)} nodes, {edge_count} edges")
+        for name, g in (("dict Graph", graph), ("CompactGraph", compact)):
+            memory = _graph_memory(g)
+            elapsed = 0.0
+            for s, t in pairs:
+                start = time.perf_counter()
+                a_star(g, s, t)
+                elapsed += time.perf_counter() - start
+            print(f"  {name:<13} memory {memory / 1e6:8.2f} MB ({memory / max(1, edge_count):6.0f} B/edge)   "
+                  f"A* {1000 * elapsed / len(pairs):8.2f} ms/query")
+
+def _load_traced(path: str, intern: bool) -> tuple[int, object, SpatialGrid]:
+    """ Loads path (graph + spatial grid) under tracemalloc, returns (retained bytes, graph, grid). """
+    Graph.intern_strings = intern
+    try:
+        gc.collect()
+        tracemalloc.start()
+        graph = load_osm_data_streaming(path)
+        grid = SpatialGrid(graph)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    finally:
+        Graph.intern_strings = True
+    return retained, graph, grid
+
+def bench_memory(args):
+    """ Memory of the loaded graph with and without interned node IDs / road names / road types. """
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = os.path.join(tmp, 'synthetic.osm')
+        write_synthetic_osm(synthetic, args.size, args.size)
+        maps = [(args.map, args.map), (f"synthetic {args.size}x{args.size}", synthetic)]
+
+        results = []
+        for label, path in maps:
+            if not os.path.exists(path):
+                print(f"Skipping {label}: file not found.")
+                continue
+            rows = []
+            for name, intern in (("plain strings", False), ("interned", True)):
+                retained, graph, grid = _load_traced(path, intern)
+                seen = set()
+                parts = [_deep_sizeof(p, seen) for p in (graph.nodes, graph.edges, graph.street_index, grid.grid)]
+                edge_count = sum(len(edges) for edges in graph.edges.values())
+                rows.append((name, retained, parts, edge_count))
+                del graph, grid
+            results.append((label, rows))
+
+    print("\n=== String interning ===")
+    for label, rows in results:
+        print(f"\n{label}: {rows[0][3]} edges")
+        base = rows[0][1]
+        for name, retained, (nodes, edges, streets, grid), edge_count in rows:
+            print(f"  {name:<14} retained {retained / 1e6:7.2f} MB ({retained / max(1, edge_count):5.0f} B/edge, "
+                  f"{100 * (base - retained) / base:5.1f}% saved)   nodes {nodes / 1e6:6.2f} MB  "
+                  f"edges {edges / 1e6:6.2f} MB  street index {streets / 1e6:5.2f} MB  grid {grid / 1e6:5.2f} MB")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="RouteMaster benchmarks")
+    arg_parser.add_argument('--map', default=DEFAULT_MAP, help="OSM extract to benchmark on")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (best time is reported)")
+    sub = arg_parser.add_subparsers(dest='benchmark', required=True)
+
+    p = sub.add_parser('parallel', help="Parallel way processing vs. serial loader")
+    p.add_argument('--size', type=int, default=200, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--max-workers', type=int, default=None)
+    p.set_defaults(func=bench_parallel)
+
+    p = sub.add_parser('coldstart', help="Map parse time vs. snapshot load time (dict Graph and CompactGraph)")
+    p.add_argument('--size', type=int, default=150, help="Synthetic grid size (size x size intersections)")
+    p.set_defaults(func=bench_coldstart)
+
+    p = sub.add_parser('contraction', help="A* on the original vs. the chain-contracted graph")
+    p.add_argument('--size', type=int, default=150, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=50)
+    p.set_defaults(func=bench_contraction)
+
+    p = sub.add_parser('compact', help="Memory and A* timing of the dict Graph vs. CompactGraph")
+    p.add_argument('--size', type=int, default=150, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=30)
+    p.set_defaults(func=bench_compact)
+
+    p = sub.add_parser('bidirectional', help="Settled nodes and latency of unidirectional vs. bidirectional A*")
+    p.add_argument('--size', type=int, default=150, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=50)
+    p.set_defaults(func=bench_bidirectional)
+
+    p = sub.add_parser('ch', help="Contraction hierarchy preprocessing and query latency vs. A*")
+    p.add_argument('--size', type=int, default=60, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=100)
+    p.set_defaults(func=bench_ch)
+
+    p = sub.add_parser('alt', help="A* node expansions and latency with ALT landmarks vs. the straight-line bound")
+    p.add_argument('--size', type=int, default=100, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=100)
+    p.add_argument('--landmarks', type=int, default=8)
+    p.add_argument('--jams', type=float, default=0.0, help="Jammed roads per node (e.g. 0.05)")
+    p.set_defaults(func=bench_alt)
+
+    p = sub.add_parser('edge', help="Node-based A* vs. edge-based A* with precomputed turn costs and restrictions")
+    p.add_argument('--size', type=int, default=100, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=100)
+    p.set_defaults(func=bench_edge)
+
+    p = sub.add_parser('workspace', help="A* latency and allocations per query, short vs. long routes")
+    p.add_argument('--size', type=int, default=100, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=100)
+    p.add_argument('--hops', type=int, default=10, help="Edges between source and target of short queries")
+    p.set_defaults(func=bench_workspace)
+
+    p = sub.add_parser('matrix', help="Many-to-many distance/time matrix vs. one A* per pair")
+    p.add_argument('--size', type=int, default=60, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--origins', type=int, default=200, help="Origins (and destinations) in the matrix")
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    p.set_defaults(func=bench_matrix)
+
+    p = sub.add_parser('isochrone', help="Bounded isochrone searches and batched multi-origin coverage")
+    p.add_argument('--size', type=int, default=100, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--origins', type=int, default=200)
+    p.add_argument('--minutes', type=float, default=2.0, help="Travel time budget")
+    p.set_defaults(func=bench_isochrone)
+
+    p = sub.add_parser('time', help="Shortest vs. fastest routes with precomputed per-edge travel times")
+    p.add_argument('--size', type=int, default=60, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=100)
+    p.add_argument('--jams', type=float, default=0.05, help="Jammed roads per node")
+    p.set_defaults(func=bench_time)
+
+    p = sub.add_parser('alternatives', help="Plateau alternative routes vs. repeated A* with edge penalties")
+    p.add_argument('--size', type=int, default=60, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--queries', type=int, default=50)
+    p.add_argument('--routes', type=int, default=3, help="Routes per query (including the optimal one)")
+    p.set_defaults(func=bench_alternatives)
+
+    p = sub.add_parser('replan', help="Live rerouting after traffic edits: A* from scratch vs. incremental D* Lite")
+    p.add_argument('--size', type=int, default=60, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--edits', type=int, default=30, help="Traffic edits along the trip")
+    p.set_defaults(func=bench_replan)
+
+    p = sub.add_parser('cache', help="Repeated route queries under traffic edits with and without the LRU route cache")
+    p.add_argument('--size', type=int, default=60, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--pairs', type=int, default=50, help="Distinct origin/destination pairs")
+    p.add_argument('--queries', type=int, default=500)
+    p.add_argument('--edit-every', type=int, default=10, help="Queries between traffic edits")
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser('instructions', help="Maneuver list build time and HUD next-maneuver lookups")
+    p.add_argument('--size', type=int, default=100, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--routes', type=int, default=20)
+    p.set_defaults(func=bench_instructions)
+
+    p = sub.add_parser('stops', help="Multi-stop ordering: stop-to-stop matrix and tour heuristics on random stop sets")
+    p.add_argument('--size', type=int, default=60, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--stops', type=int, nargs='+', default=[10, 25, 50], help="Stop set sizes")
+    p.add_argument('--budget', type=float, default=1.0, help="Local search time budget (s)")
+    p.set_defaults(func=bench_stops)
+
+    p = sub.add_parser('pois', help="POIs ranked by detour from a route: multi-source searches vs. A* via each POI")
+    p.add_argument('--size', type=int, default=60, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--routes', type=int, default=10)
+    p.set_defaults(func=bench_pois)
+
+    p = sub.add_parser('snap', help="Snapping points to roads vs. a nearest-node scan, and routes between snapped points")
+    p.add_argument('--size', type=int, default=150, help="Synthetic grid size (size x size intersections)")
+    p.add_argument('--points', type=int, default=1000)
+    p.add_argument('--routes', type=int, default=20)
+    p.set_defaults(func=bench_snap)
+
+    p = sub.add_parser('memory', help="Graph memory with and without string interning")
+    p.add_argument('--size', type=int, default=150, help="Synthetic grid size (size x size intersections)")
+    p.set_defaults(func=bench_memory)
+
+    args = arg_parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
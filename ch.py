@@ -0,0 +1,333 @@
+import heapq
+import os
+import time
+from array import array
+from models import Graph
+from snapshot import write_sections, open_sections, close_sections, _string_table, _read_string_table
+
+# Contraction Hierarchies (Geisberger et al. 2008) over the base edge weights of a Graph.
+# Preprocessing contracts nodes one by one in order of importance and adds shortcut edges
+# (u -> w via v) wherever the path u -> v -> w is the only shortest one (checked by witness searches).
+# A query is a bidirectional Dijkstra that only climbs the hierarchy (towards higher ranked nodes).
+# Shortcuts remember their middle node, so paths unpack to ordinary node-ID paths.
+
+CH_MAGIC = b'RMCH\x00\x00\x00\x01'
+CH_VERSION = 1
+
+# Witness searches give up after this many settled nodes (the shortcut is then added anyway, which is safe).
+# Estimating a node's priority only needs a rough shortcut count, so it uses a smaller limit.
+WITNESS_SETTLE_LIMIT = 60
+PRIORITY_SETTLE_LIMIT = 15
+
+_INF = float('infinity')
+
+class ContractionHierarchy:
+    """
+    Preprocessed hierarchy of one graph. Node i is graph node node_ids[i], contracted as rank[i]-th.
+    Upward edges (to higher ranked nodes) are stored twice, as CSR arrays:
+        up_*:   out-edges i -> up_targets[k] of node i      (forward search)
+        down_*: in-edges down_sources[k] -> i of node i     (backward search)
+    *_middle is the contracted node a shortcut skips, or -1 for an original road edge.
+    """
+    def __init__(self):
+        self.node_ids: list[str] = []
+        self.index: dict[str, int] = {}
+        self.rank = array('l')
+
+        self.up_offsets = array('l', [0])
+        self.up_targets = array('l')
+        self.up_weights = array('d')
+        self.up_middle = array('l')
+
+        self.down_offsets = array('l', [0])
+        self.down_sources = array('l')
+        self.down_weights = array('d')
+        self.down_middle = array('l')
+
+    @property
+    def shortcut_count(self) -> int:
+        return sum(1 for m in self.up_middle if m >= 0) + sum(1 for m in self.down_middle if m >= 0)
+
+    def matches(self, graph: Graph) -> bool:
+        """ True if the hierarchy was built for a graph with exactly these nodes. """
+        return len(self.node_ids) == len(graph.nodes) and all(a == b for a, b in zip(self.node_ids, graph.nodes))
+
+    # --- Query ---
+
+    def query(self, start_id: str, end_id: str, stats: dict | None = None) -> tuple[list[str], float]:
+        """ Shortest path by base weight. Returns (node-ID path, distance), or ([], inf) if unreachable. """
+        inf = float('infinity')
+        if start_id not in self.index or end_id not in self.index:
+            return [], inf
+        s, t = self.index[start_id], self.index[end_id]
+
+        dist_f, dist_b = {s: 0.0}, {t: 0.0}
+        parent_f, parent_b = {s: -1}, {t: -1}
+        pq_f, pq_b = [(0.0, s)], [(0.0, t)]
+        best, meeting = (0.0, s) if s == t else (inf, -1)
+        settled = 0
+
+        searches = ((pq_f, dist_f, parent_f, dist_b, self.up_offsets, self.up_targets, self.up_weights),
+                    (pq_b, dist_b, parent_b, dist_f, self.down_offsets, self.down_sources, self.down_weights))
+        while pq_f or pq_b:
+            for pq, dist, parent, other, offsets, heads, weights in searches:
+                # A direction is finished once its queue cannot improve on the best meeting point
+                if not pq or pq[0][0] >= best:
+                    pq.clear()
+                    continue
+                d, u = heapq.heappop(pq)
+                if d > dist[u]: continue  # Lazy deletion
+                settled += 1
+
+                if u in other and d + other[u] < best:
+                    best, meeting = d + other[u], u
+
+                for k in range(offsets[u], offsets[u + 1]):
+                    v = heads[k]
+                    nd = d + weights[k]
+                    if nd < dist.get(v, inf):
+                        dist[v] = nd
+                        parent[v] = u
+                        heapq.heappush(pq, (nd, v))
+
+        if stats is not None:
+            stats.update(settled=settled)
+        if meeting < 0:
+            return [], inf
+
+        # Hierarchy path s .. meeting .. t, then unpack every shortcut
+        up_path = []
+        u = meeting
+        while u != -1:
+            up_path.append(u)
+            u = parent_f[u]
+        up_path.reverse()
+        u = parent_b[meeting]
+        while u != -1:
+            up_path.append(u)
+            u = parent_b[u]
+
+        path = [up_path[0]]
+        for a, b in zip(up_path, up_path[1:]):
+            self._unpack(a, b, path)
+        return [self.node_ids[i] for i in path], best
+
+    def _middle(self, a: int, b: int) -> int:
+        """ Middle node of the hierarchy edge a -> b (stored at its lower ranked end). """
+        if self.rank[a] < self.rank[b]:
+            for k in range(self.up_offsets[a], self.up_offsets[a + 1]):
+                if self.up_targets[k] == b:
+                    return self.up_middle[k]
+        else:
+            for k in range(self.down_offsets[b], self.down_offsets[b + 1]):
+                if self.down_sources[k] == a:
+                    return self.down_middle[k]
+        raise KeyError(f"No hierarchy edge {self.node_ids[a]} -> {self.node_ids[b]}")
+
+    def _unpack(self, a: int, b: int, path: list[int]):
+        """ Appends the original nodes of hierarchy edge a -> b (without a) to path. """
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            middle = self._middle(a, b)
+            if middle < 0:
+                path.append(b)
+            else:
+                # a -> middle first, so push it last
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+    # --- Serialization ---
+
+    def save(self, path: str, source_path: str):
+        """ Writes the hierarchy next to the map; it is bound to source_path like a graph snapshot. """
+        write_sections(path, {
+            'node_ids': ('B', _string_table(self.node_ids)),
+            'rank': self.rank,
+            'up_offsets': self.up_offsets, 'up_targets': self.up_targets,
+            'up_weights': self.up_weights, 'up_middle': self.up_middle,
+            'down_offsets': self.down_offsets, 'down_sources': self.down_sources,
+            'down_weights': self.down_weights, 'down_middle': self.down_middle,
+        }, source_path, CH_MAGIC, CH_VERSION)
+
+    @classmethod
+    def load(cls, path: str, source_path: str) -> 'ContractionHierarchy | None':
+        """ Reads a saved hierarchy, or None if it is missing or stale. """
+        if not os.path.exists(path) or not os.path.exists(source_path):
+            return None
+        try:
+            opened = open_sections(path, source_path, CH_MAGIC, CH_VERSION)
+        except (OSError, ValueError):
+            return None
+        if opened is None:
+            return None
+        mm, s = opened
+
+        ch = cls()
+        try:
+            ch.node_ids = _read_string_table(s['node_ids'])
+            for name in ('rank', 'up_offsets', 'up_targets', 'up_weights', 'up_middle',
+                         'down_offsets', 'down_sources', 'down_weights', 'down_middle'):
+                setattr(ch, name, array(s[name].format, s[name]))
+        finally:
+            close_sections(mm, s)
+        ch.index = {nid: i for i, nid in enumerate(ch.node_ids)}
+        return ch
+
+# --- Preprocessing ---
+
+def _witness_distances(out_adj: list[dict], source: int, skip: int, targets: set, limit: float,
+                       settle_limit: int) -> dict:
+    """ Bounded Dijkstra from source that avoids node `skip`. Stops at `limit` or once all targets are settled. """
+    dist = {source: 0.0}
+    pq = [(0.0, source)]
+    remaining = len(targets)
+    settled = 0
+    heappush, heappop = heapq.heappush, heapq.heappop
+    while pq and remaining and settled < settle_limit:
+        d, u = heappop(pq)
+        if d > dist[u]: continue
+        settled += 1
+        if u in targets:
+            remaining -= 1
+        for v, w in out_adj[u].items():
+            nd = d + w
+            # Paths longer than the longest path via `skip` cannot be witnesses
+            if v == skip or nd > limit: continue
+            if nd < dist.get(v, _INF):
+                dist[v] = nd
+                heappush(pq, (nd, v))
+    return dist
+
+def _shortcuts(out_adj: list[dict], in_adj: list[dict], v: int,
+               settle_limit: int = WITNESS_SETTLE_LIMIT) -> list[tuple[int, int, float]]:
+    """ Shortcuts (u, w, weight) that contracting v would require. """
+    shortcuts = []
+    out_edges = out_adj[v]
+    if not out_edges: return shortcuts
+    for u, w_uv in in_adj[v].items():
+        targets = {w for w in out_edges if w != u}
+        if not targets: continue
+        limit = w_uv + max(out_edges[w] for w in targets)
+        dist = _witness_distances(out_adj, u, v, targets, limit, settle_limit)
+        for w in targets:
+            via = w_uv + out_edges[w]
+            if dist.get(w, _INF) > via:
+                shortcuts.append((u, w, via))
+    return shortcuts
+
+def build_hierarchy(graph: Graph) -> ContractionHierarchy:
+    """
+    Contracts every node of the graph (base weights, traffic ignored).
+    Order: edge difference + contracted neighbours, with lazy priority updates.
+    """
+    start_time = time.perf_counter()
+    ch = ContractionHierarchy()
+    ch.node_ids = list(graph.nodes)
+    ch.index = {nid: i for i, nid in enumerate(ch.node_ids)}
+    n = len(ch.node_ids)
+
+    # Remaining (uncontracted) graph; parallel edges keep their cheapest weight
+    out_adj = [{} for _ in range(n)]
+    in_adj = [{} for _ in range(n)]
+    middle = {}  # (u, w) -> contracted node of a shortcut
+    for u_id in ch.node_ids:
+        u = ch.index[u_id]
+        for edge in graph.edges.get(u_id, []):
+            v = ch.index[edge['to']]
+            if v == u: continue
+            weight = edge['base_weight']
+            if weight < out_adj[u].get(v, float('infinity')):
+                out_adj[u][v] = weight
+                in_adj[v][u] = weight
+
+    contracted_neighbours = [0] * n
+    level = [0] * n   # Hierarchy depth below each node; keeps the contraction spread out evenly
+
+    def priority(v):
+        edge_difference = len(_shortcuts(out_adj, in_adj, v, PRIORITY_SETTLE_LIMIT)) - len(in_adj[v]) - len(out_adj[v])
+        return 2 * edge_difference + contracted_neighbours[v] + level[v]
+
+    current = [priority(v) for v in range(n)]
+    pq = [(p, v) for v, p in enumerate(current)]
+    heapq.heapify(pq)
+
+    rank = array('l', [0]) * n
+    contracted = bytearray(n)
+    up = [None] * n     # v -> [(w, weight, middle)] to higher ranked nodes
+    down = [None] * n   # v -> [(u, weight, middle)] from higher ranked nodes
+    shortcut_count = 0
+    order = 0
+    while pq:
+        p, v = heapq.heappop(pq)
+        if contracted[v] or p != current[v]: continue  # Outdated queue entry
+        # Lazy update: re-queue if v became less attractive than the next candidate
+        p = priority(v)
+        if pq and p > pq[0][0]:
+            current[v] = p
+            heapq.heappush(pq, (p, v))
+            continue
+
+        for u, w, weight in _shortcuts(out_adj, in_adj, v):
+            if weight < out_adj[u].get(w, float('infinity')):
+                out_adj[u][w] = weight
+                in_adj[w][u] = weight
+                middle[(u, w)] = v
+                shortcut_count += 1
+
+        contracted[v] = 1
+        rank[v] = order
+        order += 1
+        up[v] = [(w, weight, middle.get((v, w), -1)) for w, weight in out_adj[v].items()]
+        down[v] = [(u, weight, middle.get((u, v), -1)) for u, weight in in_adj[v].items()]
+
+        neighbours = set(out_adj[v]) | set(in_adj[v])
+        for w in out_adj[v]:
+            del in_adj[w][v]
+        for u in in_adj[v]:
+            del out_adj[u][v]
+        out_adj[v], in_adj[v] = {}, {}
+
+        # Only the neighbours' priorities change
+        for x in neighbours:
+            contracted_neighbours[x] += 1
+            level[x] = max(level[x], level[v] + 1)
+            current[x] = priority(x)
+            heapq.heappush(pq, (current[x], x))
+
+    ch.rank = rank
+    for v in range(n):
+        for w, weight, mid in up[v]:
+            ch.up_targets.append(w)
+            ch.up_weights.append(weight)
+            ch.up_middle.append(mid)
+        ch.up_offsets.append(len(ch.up_targets))
+        for u, weight, mid in down[v]:
+            ch.down_sources.append(u)
+            ch.down_weights.append(weight)
+            ch.down_middle.append(mid)
+        ch.down_offsets.append(len(ch.down_sources))
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Contraction hierarchy built: {n} nodes, {shortcut_count} shortcuts in {elapsed:.2f}s.")
+    return ch
+
+def load_or_build_hierarchy(graph: Graph, source_path: str, ch_path: str | None = None,
+                            simplify: bool = False) -> ContractionHierarchy:
+    """
+    Returns the hierarchy for graph (loaded from source_path's .ch file if it is up to date and
+    matches the graph, otherwise built and saved). Simplified graphs use their own file.
+    """
+    ch_path = ch_path or source_path + ('.simplified.ch' if simplify else '.ch')
+
+    ch = ContractionHierarchy.load(ch_path, source_path)
+    if ch is not None and ch.matches(graph):
+        print(f"Loaded contraction hierarchy {ch_path}.")
+        return ch
+
+    ch = build_hierarchy(graph)
+    try:
+        ch.save(ch_path, source_path)
+    except OSError as e:
+        print(f"Could not write contraction hierarchy: {e}")
+    return ch
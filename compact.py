@@ -0,0 +1,253 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+from models import Graph, Node, StringTable, ROAD_TYPES
+
+# Edge status codes (the dict-based Graph stores them as edge['status'] strings)
+STATUS_NONE, STATUS_JAMMED, STATUS_BLOCKED = 0, 1, 2
+STATUS_NAMES = (None, 'jammed', 'blocked')
+STATUS_CODES = {None: STATUS_NONE, 'jammed': STATUS_JAMMED, 'blocked': STATUS_BLOCKED}
+
+class CompactGraph:
+    """
+    Array-backed (CSR) version of Graph.
+    Nodes are dense integer indices; the out-edges of node i are the edge indices
+    offsets[i] .. offsets[i+1]-1. Edge attributes live in parallel typed arrays,
+    road types and names are small integer codes into shared tables.
+
+    The `nodes` / `edges` / `get_neighbors` members mimic the dict-based Graph
+    (returning lightweight views), so algorithms, spatial, simulation and visualizer
+    run on it unchanged. Hot paths (see algorithms.a_star_compact) use the arrays directly.
+    """
+    def __init__(self):
+        self.node_ids: list[str] = []           # index -> OSM node id
+        self.index: dict[str, int] = {}         # OSM node id -> index
+        self.lats = array('d')
+        self.lons = array('d')
+
+        self.offsets = array('l', [0])          # CSR row pointers (len N+1)
+        self.targets = array('l')               # edge -> target node index
+        self.weights = array('d')               # current weight (traffic applied)
+        self.base_weights = array('d')
+        self.status = array('B')                # STATUS_* per edge
+        self.type_codes = array('B')            # edge -> index into road_types
+        self.name_codes = array('l')            # edge -> index into names
+
+        # Shape points of polyline edges (CSR per edge)
+        self.geom_offsets = array('l', [0])
+        self.geom_lats = array('d')
+        self.geom_lons = array('d')
+
+        self.road_types: list[str] = []
+        self.names: list[str] = []
+
+        # Reverse CSR (incoming edges per node), built on first use
+        self.rev_offsets: array | None = None
+        self.rev_edges: array | None = None     # incoming edge indices, grouped by target node
+        self.rev_sources: array | None = None   # source node index of each rev_edges entry
+
+        self.pois = []
+        self.street_index = {}
+        self.restrictions = []
+        self.hierarchy = None
+        self.landmarks = None
+        self.turn_table = None
+        self.travel_times = None
+        self.route_cache = None
+        self.poi_index = None
+
+        self.nodes = _NodeView(self)
+        self.edges = _AdjacencyView(self)
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> 'CompactGraph':
+        """ Builds the compact representation of a dict-based Graph (traffic state included). """
+        cg = cls()
+        types, names = StringTable(ROAD_TYPES), StringTable()
+
+        for node_id, node in graph.nodes.items():
+            cg.index[node_id] = len(cg.node_ids)
+            cg.node_ids.append(node_id)
+            cg.lats.append(node.lat)
+            cg.lons.append(node.lon)
+
+        for node_id in cg.node_ids:
+            for edge in graph.edges.get(node_id, []):
+                cg.targets.append(cg.index[edge['to']])
+                cg.weights.append(edge['weight'])
+                cg.base_weights.append(edge['base_weight'])
+                cg.status.append(STATUS_CODES.get(edge.get('status'), STATUS_NONE))
+                cg.type_codes.append(types.code(edge['type']))
+                cg.name_codes.append(names.code(edge['name']))
+                for lat, lon in edge.get('geometry', ()):
+                    cg.geom_lats.append(lat)
+                    cg.geom_lons.append(lon)
+                cg.geom_offsets.append(len(cg.geom_lats))
+            cg.offsets.append(len(cg.targets))
+
+        cg.road_types, cg.names = types.strings, names.strings
+        cg.pois = graph.pois
+        cg.street_index = graph.street_index
+        cg.restrictions = graph.restrictions
+        return cg
+
+    def get_neighbors(self, node_id: str) -> list:
+        return self.edges.get(node_id, [])
+
+    def build_reverse(self):
+        """ Builds the reverse CSR arrays (counting sort of the edges by target node). """
+        n = len(self.node_ids)
+        rev_offsets = array('l', [0]) * (n + 1)
+        for v in self.targets:
+            rev_offsets[v + 1] += 1
+        for i in range(n):
+            rev_offsets[i + 1] += rev_offsets[i]
+
+        fill = array('l', rev_offsets)
+        rev_edges = array('l', [0]) * len(self.targets)
+        rev_sources = array('l', [0]) * len(self.targets)
+        for u in range(n):
+            for k in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.targets[k]
+                rev_edges[fill[v]] = k
+                rev_sources[fill[v]] = u
+                fill[v] += 1
+        self.rev_offsets, self.rev_edges, self.rev_sources = rev_offsets, rev_edges, rev_sources
+
+    def get_incoming(self, node_id: str) -> list:
+        """ (u id, EdgeView) for every edge u->node_id. """
+        if self.rev_offsets is None:
+            self.build_reverse()
+        v = self.index.get(node_id)
+        if v is None: return []
+        return [(self.node_ids[self.rev_sources[j]], EdgeView(self, self.rev_edges[j]))
+                for j in range(self.rev_offsets[v], self.rev_offsets[v + 1])]
+
+    def find_edge(self, u: int, v: int) -> int:
+        """ Edge index of u->v (node indices), or -1. Scans the CSR row of u (a handful of edges). """
+        targets = self.targets
+        for k in range(self.offsets[u], self.offsets[u + 1]):
+            if targets[k] == v:
+                return k
+        return -1
+
+    def get_edge(self, u: str, v: str) -> 'EdgeView | None':
+        i, j = self.index.get(u), self.index.get(v)
+        if i is None or j is None: return None
+        k = self.find_edge(i, j)
+        return EdgeView(self, k) if k >= 0 else None
+
+    def edge_source(self, edge: 'EdgeView') -> str:
+        """ Node an edge leaves from (the CSR row containing it). """
+        return self.node_ids[bisect_right(self.offsets, edge.k) - 1]
+
+    def get_reverse_edge(self, edge: 'EdgeView') -> 'EdgeView | None':
+        u = bisect_right(self.offsets, edge.k) - 1
+        k = self.find_edge(self.targets[edge.k], u)
+        return EdgeView(self, k) if k >= 0 else None
+
+    def edge_geometry(self, k: int) -> list[tuple[float, float]]:
+        g0, g1 = self.geom_offsets[k], self.geom_offsets[k + 1]
+        return list(zip(self.geom_lats[g0:g1], self.geom_lons[g0:g1]))
+
+class _NodeView(Mapping):
+    """ graph.nodes for CompactGraph: node id -> Node (created on access). """
+    __slots__ = ('_g',)
+
+    def __init__(self, graph: CompactGraph):
+        self._g = graph
+
+    def __getitem__(self, node_id: str) -> Node:
+        i = self._g.index[node_id]
+        return Node(node_id, self._g.lats[i], self._g.lons[i])
+
+    def __contains__(self, node_id) -> bool:
+        return node_id in self._g.index
+
+    def __iter__(self):
+        return iter(self._g.node_ids)
+
+    def __len__(self) -> int:
+        return len(self._g.node_ids)
+
+class _AdjacencyView(Mapping):
+    """ graph.edges for CompactGraph: node id -> list of EdgeView. """
+    __slots__ = ('_g',)
+
+    def __init__(self, graph: CompactGraph):
+        self._g = graph
+
+    def __getitem__(self, node_id: str) -> list:
+        g = self._g
+        i = g.index[node_id]
+        return [EdgeView(g, k) for k in range(g.offsets[i], g.offsets[i + 1])]
+
+    def __contains__(self, node_id) -> bool:
+        return node_id in self._g.index
+
+    def __iter__(self):
+        return iter(self._g.node_ids)
+
+    def __len__(self) -> int:
+        return len(self._g.node_ids)
+
+class EdgeView:
+    """
+    Dict-like handle on edge k of a CompactGraph, with the keys of a Graph edge dict
+    ('to', 'id', 'weight', 'base_weight', 'type', 'name', optional 'status' and 'geometry').
+    'weight' and 'status' are writable so TrafficSimulator works unchanged.
+    """
+    __slots__ = ('_g', 'k')
+
+    def __init__(self, graph: CompactGraph, k: int):
+        self._g = graph
+        self.k = k
+
+    def __getitem__(self, key: str):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default=None):
+        g, k = self._g, self.k
+        if key == 'to': return g.node_ids[g.targets[k]]
+        if key == 'id': return k
+        if key == 'weight': return g.weights[k]
+        if key == 'base_weight': return g.base_weights[k]
+        if key == 'type': return g.road_types[g.type_codes[k]]
+        if key == 'name': return g.names[g.name_codes[k]]
+        if key == 'status': return STATUS_NAMES[g.status[k]] or default
+        if key == 'geometry':
+            return g.edge_geometry(k) if g.geom_offsets[k + 1] > g.geom_offsets[k] else default
+        return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __setitem__(self, key: str, value):
+        if key == 'weight':
+            self._g.weights[self.k] = value
+        elif key == 'status':
+            self._g.status[self.k] = STATUS_CODES[value]
+        else:
+            raise KeyError(f"Edge attribute '{key}' is read-only in CompactGraph")
+
+    def pop(self, key: str, default=None):
+        value = self.get(key, default)
+        if key == 'status':
+            self._g.status[self.k] = STATUS_NONE
+        elif key in ('to', 'id', 'weight', 'base_weight', 'type', 'name', 'geometry'):
+            raise KeyError(f"Edge attribute '{key}' cannot be removed in CompactGraph")
+        return value
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, EdgeView) and other._g is self._g and other.k == self.k
+
+    def __hash__(self) -> int:
+        return hash((id(self._g), self.k))
+
+    def __repr__(self):
+        return f"EdgeView({self.k}: {self.get('to')}, {self.get('weight'):.1f}m, {self.get('type')})"
+
+_MISSING = object()
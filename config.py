@@ -46,3 +46,10 @@ class Theme:
         'pulse': "#ffffff",
         'road_outline': "#222222"
     }
+
+    # Alternative routes, drawn beneath the main route (one style per rank)
+    ALTERNATIVE_STYLES = [
+        {'color': '#00aaff', 'dash': (10, 4)},
+        {'color': '#ff66cc', 'dash': (4, 4)},
+        {'color': '#ffcc00', 'dash': (2, 6)},
+    ]
@@ -0,0 +1,149 @@
+import heapq
+from multiprocessing import Pool
+from algorithms import edge_travel_time
+from models import Graph
+from spatial import SpatialGrid
+from utils import haversine_distance
+
+# Isochrones: everything reachable from an origin within a travel-time budget.
+# Travel times come from algorithms.edge_travel_time (speed limits, jams, blocked roads), the
+# same model as the route time on the dashboard. The searches are bounded: nothing beyond the
+# budget is pushed, so the cost follows the size of the reachable area, not of the map.
+
+class Isochrone:
+    """
+    Reachable area of one origin.
+    times: node id -> travel time (s) for every node reached within the budget.
+    edges: (u, v, fraction) for every edge leaving a reached node; fraction is the share of the edge
+           that can be driven within the budget (1.0 = the whole edge).
+    boundary: (lat, lon) polygon around the reachable area (convex hull, counter-clockwise).
+    """
+    def __init__(self, origin: str, budget: float):
+        self.origin = origin
+        self.budget = budget
+        self.times: dict[str, float] = {}
+        self.edges: list[tuple[str, str, float]] = []
+        self.boundary: list[tuple[float, float]] = []
+
+def _convex_hull(points: list[tuple[float, float]]) -> list[tuple[float, float]]:
+    """ Andrew's monotone chain. Returns the hull counter-clockwise, without repeating the first point. """
+    points = sorted(set(points))
+    if len(points) < 3:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+def _point_along(points: list[tuple[float, float]], fraction: float) -> tuple[float, float]:
+    """ The point at `fraction` of the length of a (lat, lon) polyline. """
+    lengths = [haversine_distance(a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:])]
+    remaining = fraction * sum(lengths)
+    for (a, b), length in zip(zip(points, points[1:]), lengths):
+        if remaining <= length and length > 0:
+            t = remaining / length
+            return a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])
+        remaining -= length
+    return points[-1]
+
+def _bounded_search(graph: Graph, origins: list[str], budget: float) -> dict[str, tuple[float, int]]:
+    """ Multi-source Dijkstra on travel time that never goes past the budget: node -> (time, nearest origin position). """
+    best: dict[str, tuple[float, int]] = {}
+    pq = []
+    for i, origin in enumerate(origins):
+        if origin in graph.nodes and origin not in best:
+            best[origin] = (0.0, i)
+            pq.append((0.0, i, origin))
+    heapq.heapify(pq)
+
+    while pq:
+        t, i, u = heapq.heappop(pq)
+        if t > best[u][0]: continue  # Lazy deletion
+        for edge in graph.get_neighbors(u):
+            v = edge['to']
+            t_v = t + edge_travel_time(edge)
+            if t_v <= budget and t_v < best.get(v, (float('infinity'),))[0]:
+                best[v] = (t_v, i)
+                heapq.heappush(pq, (t_v, i, v))
+    return best
+
+def isochrone(graph: Graph, origin: str, budget: float) -> Isochrone:
+    """ Nodes, (partial) edges and boundary polygon reachable from origin within budget seconds. """
+    result = Isochrone(origin, budget)
+    result.times = {node_id: t for node_id, (t, _) in _bounded_search(graph, [origin], budget).items()}
+
+    outline = []
+    for u, t_u in result.times.items():
+        u_node = graph.nodes[u]
+        outline.append((u_node.lat, u_node.lon))
+        for edge in graph.get_neighbors(u):
+            edge_time = edge_travel_time(edge)
+            if edge_time == float('infinity'): continue
+            fraction = 1.0 if edge_time == 0 else min(1.0, (budget - t_u) / edge_time)
+            if fraction <= 0: continue
+            result.edges.append((u, edge['to'], fraction))
+            if fraction < 1.0:
+                # The area ends part-way along this edge
+                v_node = graph.nodes[edge['to']]
+                points = [(u_node.lat, u_node.lon), *edge.get('geometry', ()), (v_node.lat, v_node.lon)]
+                outline.append(_point_along(points, fraction))
+    result.boundary = _convex_hull(outline)
+    return result
+
+def nearest_node(graph: Graph, grid: SpatialGrid | None, lat: float, lon: float) -> str | None:
+    """ Closest graph node to a coordinate: endpoints of the edges in the grid cells around it, else all nodes. """
+    candidates = {n for edge in grid.query(lat, lon) for n in edge} if grid is not None else set()
+    candidates = [n for n in candidates if n in graph.nodes] or list(graph.nodes)
+    if not candidates:
+        return None
+    return min(candidates, key=lambda n: haversine_distance(lat, lon, graph.nodes[n].lat, graph.nodes[n].lon))
+
+def isochrone_from_point(graph: Graph, grid: SpatialGrid | None, lat: float, lon: float,
+                         budget: float) -> Isochrone | None:
+    """ isochrone from the node closest to (lat, lon), or None on an empty graph. """
+    origin = nearest_node(graph, grid, lat, lon)
+    return isochrone(graph, origin, budget) if origin is not None else None
+
+# --- Batched origins ---
+
+def coverage(graph: Graph, origins: list[str], budget: float) -> dict[str, tuple[float, int]]:
+    """
+    Coverage of many origins in one bounded search: node -> (travel time from the nearest origin,
+    position of that origin in origins) for every node within budget of at least one origin.
+    """
+    return _bounded_search(graph, origins, budget)
+
+_worker_graph = None
+
+def _init_isochrone_worker(graph: Graph):
+    global _worker_graph
+    _worker_graph = graph
+
+def _isochrone_batch(task: tuple[list[str], float]) -> list[Isochrone]:
+    origins, budget = task
+    return [isochrone(_worker_graph, origin, budget) for origin in origins]
+
+def isochrones(graph: Graph, origins: list[str], budget: float, workers: int = 1,
+               chunk_size: int = 16) -> list[Isochrone]:
+    """ One isochrone per origin (in order). With workers > 1 chunks of origins run in a process pool. """
+    tasks = [(origins[i:i + chunk_size], budget) for i in range(0, len(origins), chunk_size)]
+    if workers > 1 and len(tasks) > 1:
+        with Pool(min(workers, len(tasks)), initializer=_init_isochrone_worker, initargs=(graph,)) as pool:
+            batches = pool.map(_isochrone_batch, tasks)
+    else:
+        _init_isochrone_worker(graph)
+        try:
+            batches = [_isochrone_batch(task) for task in tasks]
+        finally:
+            _init_isochrone_worker(None)
+    return [result for batch in batches for result in batch]
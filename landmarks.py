@@ -0,0 +1,207 @@
+import heapq
+import os
+import time
+from array import array
+from models import Graph
+from snapshot import write_sections, open_sections, close_sections, _string_table, _read_string_table
+
+# ALT (A*, Landmarks, Triangle inequality; Goldberg & Harrelson 2005).
+# For a few landmark nodes L the exact base-weight distances d(L, v) and d(v, L) to/from every node
+# are precomputed. By the triangle inequality
+#     d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L)
+# and the largest of these bounds is a consistent A* potential. Traffic only raises edge costs,
+# so the bounds stay valid with jams and blocked roads.
+
+LANDMARKS_MAGIC = b'RMALT\x00\x00\x01'
+LANDMARKS_VERSION = 1
+
+DEFAULT_LANDMARK_COUNT = 8
+
+_INF = float('infinity')
+
+class Landmarks:
+    """
+    Landmark distance tables of one graph. Node i is graph node node_ids[i].
+    dist_from[k][i] = d(landmark k, node i), dist_to[k][i] = d(node i, landmark k) (inf if unreachable).
+    """
+    def __init__(self):
+        self.node_ids: list[str] = []
+        self.index: dict[str, int] = {}
+        self.landmarks = array('l')
+        self.dist_from: list[array] = []
+        self.dist_to: list[array] = []
+
+    def matches(self, graph: Graph) -> bool:
+        """ True if the tables were built for a graph with exactly these nodes. """
+        return len(self.node_ids) == len(graph.nodes) and all(a == b for a, b in zip(self.node_ids, graph.nodes))
+
+    def index_potential(self, target: int):
+        """ Lower bound function of the distance node index -> target (max over all landmark bounds). """
+        # Landmarks that cannot reach / be reached from the target give no bound
+        from_terms = [(d[target], d) for d in self.dist_from if d[target] < _INF]
+        to_terms = [(d, d[target]) for d in self.dist_to if d[target] < _INF]
+
+        def potential(i: int) -> float:
+            best = 0.0
+            for d_target, d in from_terms:
+                bound = d_target - d[i]
+                if bound > best: best = bound
+            for d, d_target in to_terms:
+                bound = d[i] - d_target
+                if bound > best: best = bound
+            return best
+        return potential
+
+    def potential(self, target_id: str):
+        """ Same as index_potential, keyed by node ID. """
+        index = self.index
+        potential = self.index_potential(index[target_id])
+        return lambda node_id: potential(index[node_id])
+
+    def source_potential(self, source_id: str):
+        """
+        Lower bound function of the distance source -> node ID (for searches running backwards):
+        d(s, v) >= d(L, v) - d(L, s) and d(s, v) >= d(s, L) - d(v, L).
+        """
+        index = self.index
+        source = index[source_id]
+        from_terms = [(d, d[source]) for d in self.dist_from if d[source] < _INF]
+        to_terms = [(d[source], d) for d in self.dist_to if d[source] < _INF]
+
+        def potential(node_id: str) -> float:
+            i = index[node_id]
+            best = 0.0
+            for d, d_source in from_terms:
+                bound = d[i] - d_source
+                if bound > best: best = bound
+            for d_source, d in to_terms:
+                bound = d_source - d[i]
+                if bound > best: best = bound
+            return best
+        return potential
+
+    # --- Serialization ---
+
+    def save(self, path: str, source_path: str):
+        """ Writes the tables next to the map; they are bound to source_path like a graph snapshot. """
+        dist_from, dist_to = array('d'), array('d')
+        for d in self.dist_from: dist_from.extend(d)
+        for d in self.dist_to: dist_to.extend(d)
+        write_sections(path, {
+            'node_ids': ('B', _string_table(self.node_ids)),
+            'landmarks': self.landmarks,
+            'dist_from': dist_from,
+            'dist_to': dist_to,
+        }, source_path, LANDMARKS_MAGIC, LANDMARKS_VERSION)
+
+    @classmethod
+    def load(cls, path: str, source_path: str) -> 'Landmarks | None':
+        """ Reads saved tables, or None if they are missing or stale. """
+        if not os.path.exists(path) or not os.path.exists(source_path):
+            return None
+        try:
+            opened = open_sections(path, source_path, LANDMARKS_MAGIC, LANDMARKS_VERSION)
+        except (OSError, ValueError):
+            return None
+        if opened is None:
+            return None
+        mm, s = opened
+
+        lm = cls()
+        try:
+            lm.node_ids = _read_string_table(s['node_ids'])
+            lm.landmarks = array('l', s['landmarks'])
+            n = len(lm.node_ids)
+            for k in range(len(lm.landmarks)):
+                lm.dist_from.append(array('d', s['dist_from'][k * n:(k + 1) * n]))
+                lm.dist_to.append(array('d', s['dist_to'][k * n:(k + 1) * n]))
+        finally:
+            close_sections(mm, s)
+        lm.index = {nid: i for i, nid in enumerate(lm.node_ids)}
+        return lm
+
+# --- Preprocessing ---
+
+def _dijkstra(adjacency: list[list[tuple[int, float]]], source: int) -> array:
+    """ Distances from source over an integer adjacency list (inf where unreachable). """
+    dist = array('d', [_INF]) * len(adjacency)
+    dist[source] = 0.0
+    pq = [(0.0, source)]
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]: continue
+        for v, w in adjacency[u]:
+            nd = d + w
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(pq, (nd, v))
+    return dist
+
+def build_landmarks(graph: Graph, count: int = DEFAULT_LANDMARK_COUNT) -> Landmarks:
+    """
+    Selects `count` landmarks with the farthest strategy (each new landmark is the node farthest
+    from all landmarks chosen so far) and computes their distance tables on base weights.
+    """
+    start_time = time.perf_counter()
+    lm = Landmarks()
+    lm.node_ids = list(graph.nodes)
+    lm.index = {nid: i for i, nid in enumerate(lm.node_ids)}
+    n = len(lm.node_ids)
+    if n == 0:
+        return lm
+
+    forward = [[] for _ in range(n)]
+    backward = [[] for _ in range(n)]
+    for u_id in lm.node_ids:
+        u = lm.index[u_id]
+        for edge in graph.edges.get(u_id, []):
+            v = lm.index[edge['to']]
+            forward[u].append((v, edge['base_weight']))
+            backward[v].append((u, edge['base_weight']))
+
+    def farthest(dist) -> int:
+        # Unreachable nodes (inf) come first: a landmark in another component covers it
+        return max(range(n), key=dist.__getitem__)
+
+    # The first landmark is the node farthest from an arbitrary node, the rest maximise
+    # the distance to the nearest landmark chosen so far
+    candidate = farthest(_dijkstra(forward, 0))
+    nearest = array('d', [_INF]) * n
+    while len(lm.landmarks) < min(count, n):
+        lm.landmarks.append(candidate)
+        dist_from = _dijkstra(forward, candidate)
+        lm.dist_from.append(dist_from)
+        lm.dist_to.append(_dijkstra(backward, candidate))
+
+        for i in range(n):
+            if dist_from[i] < nearest[i]:
+                nearest[i] = dist_from[i]
+        for k in lm.landmarks:
+            nearest[k] = -1.0   # Never pick a landmark twice
+        candidate = farthest(nearest)
+        if nearest[candidate] <= 0:
+            break
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Selected {len(lm.landmarks)} landmarks for {n} nodes in {elapsed:.2f}s.")
+    return lm
+
+def load_or_build_landmarks(graph: Graph, source_path: str, landmarks_path: str | None = None,
+                            simplify: bool = False, count: int = DEFAULT_LANDMARK_COUNT) -> Landmarks:
+    """
+    Returns the landmark tables for graph (loaded from source_path's .landmarks file if it is up to date
+    and matches the graph, otherwise built and saved). Simplified graphs use their own file.
+    """
+    landmarks_path = landmarks_path or source_path + ('.simplified.landmarks' if simplify else '.landmarks')
+
+    lm = Landmarks.load(landmarks_path, source_path)
+    if lm is not None and lm.matches(graph) and len(lm.landmarks) == min(count, len(graph.nodes)):
+        print(f"Loaded landmarks {landmarks_path}.")
+        return lm
+
+    lm = build_landmarks(graph, count)
+    try:
+        lm.save(landmarks_path, source_path)
+    except OSError as e:
+        print(f"Could not write landmarks: {e}")
+    return lm
@@ -1,18 +1,49 @@
-from parser import load_osm_data
+import sys
+from parser import load_map
+from ch import load_or_build_hierarchy
+from landmarks import load_or_build_landmarks
+from turns import build_turn_table
+from snapshot import load_graph_cached
 from visualizer import MapVisualizer
 
 OSM_FILE = "mapa_trg.osm"
+# Merge shape points into polyline edges so routing only visits intersections
+SIMPLIFY_TOPOLOGY = True
+# Route on the array-backed CSR graph (less memory, faster A*) instead of the dict-based Graph
+COMPACT_GRAPH = False
+# Point-to-point search, see algorithms.ROUTING_ALGORITHMS ("astar", "bidirectional", "ch", "alt", "edge"
+# or "time" for the fastest instead of the shortest route). "bidirectional" has no turn penalties
+# (exact shortest routes of the traffic-aware edge costs); it uses the ALT landmarks like "alt"
+ROUTING_ALGORITHM = "astar"
+# Route and live reroute with an incremental D* Lite planner that repairs its previous search after
+# jams/blocks instead of starting over (no turn penalties; replaces ROUTING_ALGORITHM for these queries)
+INCREMENTAL_REPLANNING = False
 
 def main():
+    # Map file (.osm XML or .osm.pbf) can be passed on the command line
+    osm_file = sys.argv[1] if len(sys.argv) > 1 else OSM_FILE
+
     print("Loading map data...")
-    graph = load_osm_data(OSM_FILE)
+    # Reuses the binary snapshot next to the map file while it is up to date
+    # (a CompactGraph is built straight from its arrays)
+    graph, grid = load_graph_cached(osm_file, load_map, simplify=SIMPLIFY_TOPOLOGY, compact=COMPACT_GRAPH)
     
     if not graph or len(graph.nodes) < 2:
         print("Failed to load graph data.")
         return
 
+    if ROUTING_ALGORITHM == "ch":
+        # Built once per map (can take a while on large maps), then loaded from <map>.ch
+        graph.hierarchy = load_or_build_hierarchy(graph, osm_file, simplify=SIMPLIFY_TOPOLOGY)
+    elif ROUTING_ALGORITHM in ("alt", "bidirectional"):
+        # Landmark distance tables, reused from <map>.landmarks across restarts
+        graph.landmarks = load_or_build_landmarks(graph, osm_file, simplify=SIMPLIFY_TOPOLOGY)
+    elif ROUTING_ALGORITHM == "edge":
+        # Exact turn costs and OSM turn restrictions, tabulated once at startup
+        graph.turn_table = build_turn_table(graph)
+
     print("Launching visualizer...")
-    viz = MapVisualizer(graph)
+    viz = MapVisualizer(graph, grid=grid, routing_algorithm=ROUTING_ALGORITHM, replanning=INCREMENTAL_REPLANNING)
     
     # Draw initial map state
     viz.draw_map()
@@ -21,4 +52,4 @@ def main():
     viz.show()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,134 @@
+from array import array
+from bisect import bisect_right
+from models import Graph
+from utils import turn_angle
+
+# Turn-by-turn maneuvers of a route, built in one pass over the path (one edge lookup per step).
+# Cumulative distances are kept per path node and per maneuver, so the navigation HUD finds the
+# next maneuver for the car's position with a binary search instead of re-walking the route.
+
+STRAIGHT_ANGLE = 20     # Heading changes below this (degrees) are "straight"
+TURN_ANGLE = 60         # Staying on the same street is only announced at turns at least this sharp
+UTURN_ANGLE = 150       # Heading changes above this are U-turns
+
+ACTIONS = {'left': "Turn left", 'right': "Turn right", 'straight': "Continue straight", 'uturn': "Make a U-turn"}
+
+class Maneuver:
+    """ Decision point of a route: path node index, distance (m) and time (s) from the start, heading change, street ahead. """
+    def __init__(self, index: int, distance: float, time: float, angle: float, direction: str, street: str):
+        self.index = index
+        self.distance = distance
+        self.time = time
+        self.angle = angle              # Degrees, positive = left (utils.turn_angle)
+        self.direction = direction      # 'left', 'right', 'straight', 'uturn' or 'arrive'
+        self.street = street
+
+    def __repr__(self):
+        return f"Maneuver({self.direction} onto {self.street!r} at {self.distance:.0f} m)"
+
+class ManeuverList:
+    """
+    Maneuvers of one route (path), ending with the arrival.
+    node_distance[i] / node_time[i]: distance (m) and time (s) from the start to path node i.
+    distances: maneuver distances, sorted (bisect key).
+    """
+    def __init__(self, path: list[str]):
+        self.path = path
+        self.node_distance = array('d', [0.0])
+        self.node_time = array('d', [0.0])
+        self.maneuvers: list[Maneuver] = []
+        self.distances = array('d')
+        self.first_street = None
+        self.timed = False              # node_time holds real times (graph.travel_times was set)
+        self.last_blocked = -1          # Index of the last blocked segment (-1 = none)
+
+    def position(self, segment: int, fraction: float) -> float:
+        """ Distance from the start of a point `fraction` along path segment `segment`. """
+        d0 = self.node_distance[segment]
+        return d0 + (self.node_distance[segment + 1] - d0) * fraction
+
+    def next_maneuver(self, distance: float) -> Maneuver | None:
+        """ First maneuver strictly ahead of a distance from the start (O(log n)). """
+        i = bisect_right(self.distances, distance)
+        return self.maneuvers[i] if i < len(self.maneuvers) else None
+
+    def _time_text(self, seconds: float) -> str:
+        if not self.timed: return ""
+        return f" ({int(seconds // 60)} min {int(seconds % 60)} s)" if seconds >= 60 else f" ({int(seconds)} s)"
+
+    def instructions(self) -> list[str]:
+        """ Text instructions of the whole route (the export / generate_instructions format). """
+        if not self.maneuvers:
+            return ["You have reached your destination."]
+        if self.last_blocked >= 0:
+            return ["Route blocked. Destination unreachable."]
+        lines = [f"Head on {self.first_street}"]
+        distance = time = 0.0
+        for m in self.maneuvers:
+            leg = f"Go {int(m.distance - distance)}m{self._time_text(m.time - time)}"
+            if m.direction == 'arrive':
+                lines.append(f"{leg} to destination.")
+            else:
+                lines.append(f"{leg}, then {ACTIONS[m.direction].lower()} onto {m.street}")
+            distance, time = m.distance, m.time
+        return lines
+
+    def hud_text(self, segment: int, fraction: float) -> str:
+        """ Next instruction for a car `fraction` along path segment `segment`. """
+        if segment <= self.last_blocked:
+            return "Route blocked ahead."
+        distance = self.position(segment, fraction)
+        m = self.next_maneuver(distance)
+        if m is None:
+            return "Navigating..."
+        if m.direction == 'arrive':
+            return f"Go {int(m.distance - distance)}m to destination"
+        return f"In {int(m.distance - distance)}m: {ACTIONS[m.direction]} onto {m.street}"
+
+def build_maneuvers(graph: Graph, path: list[str]) -> ManeuverList:
+    """ Maneuver list of a node path in one pass. Distances are road lengths (base weights), unaffected by traffic. """
+    result = ManeuverList(path)
+    if not path or len(path) < 2:
+        return result
+    times = graph.travel_times.times if graph.travel_times is not None else None
+    result.timed = times is not None
+
+    distance = time = 0.0
+    prev_edge = None
+    for i in range(len(path) - 1):
+        u, v = path[i], path[i + 1]
+        edge = graph.get_edge(u, v)
+        street = edge.get('name', 'Unknown Road') if edge is not None else "Unknown Road"
+
+        if prev_edge is None:
+            result.first_street = street
+        else:
+            # Heading change at u: from the last point before u to the first point after it
+            node, prev_node, next_node = graph.nodes[u], graph.nodes[path[i - 1]], graph.nodes[v]
+            before = prev_edge.get('geometry')
+            after = edge.get('geometry') if edge is not None else None
+            p_lat, p_lon = before[-1] if before else (prev_node.lat, prev_node.lon)
+            n_lat, n_lon = after[0] if after else (next_node.lat, next_node.lon)
+            angle = turn_angle(p_lat, p_lon, node.lat, node.lon, n_lat, n_lon)
+
+            if street != prev_street or abs(angle) >= TURN_ANGLE:
+                # (Not calculate_turn_dir: its fixed cross-product threshold calls short shape-point pieces straight)
+                if abs(angle) < STRAIGHT_ANGLE: direction = 'straight'
+                elif abs(angle) > UTURN_ANGLE: direction = 'uturn'
+                else: direction = 'left' if angle > 0 else 'right'
+                result.maneuvers.append(Maneuver(i, distance, time, angle, direction, street))
+                result.distances.append(distance)
+
+        if edge is None or edge['weight'] == float('infinity'):
+            result.last_blocked = i
+        if edge is not None:
+            distance += edge['base_weight']
+            if times is not None:
+                time += times[edge['id']]
+        result.node_distance.append(distance)
+        result.node_time.append(time)
+        prev_edge, prev_street = edge if edge is not None else {}, street
+
+    result.maneuvers.append(Maneuver(len(path) - 1, distance, time, 0.0, 'arrive', ""))
+    result.distances.append(distance)
+    return result
@@ -16,27 +16,162 @@ class POI:
         self.type = type_name # 'school', 'shop', 'park'...
         self.name = name
 
+class TurnRestriction:
+    """ OSM turn restriction at via node: 'no' forbids from -> via -> to, 'only' forbids every other exit. """
+    def __init__(self, from_id: str, via_id: str, to_id: str, kind: str):
+        self.from_id = from_id  # Node before via on the "from" way
+        self.via_id = via_id
+        self.to_id = to_id      # Node after via on the "to" way
+        self.kind = kind        # 'no' or 'only'
+
+    def __repr__(self):
+        return f"TurnRestriction({self.kind}: {self.from_id} -> {self.via_id} -> {self.to_id})"
+
 from collections import defaultdict
 
+# Road type enum: the OSM highway values the parser keeps, plus the fallback type.
+# The position in this tuple is the road type code (see StringTable / CompactGraph.type_codes).
+ROAD_TYPES = (
+    'motorway', 'trunk', 'primary', 'secondary', 'tertiary',
+    'unclassified', 'residential', 'living_street', 'service',
+    'motorway_link', 'trunk_link', 'primary_link',
+    'secondary_link', 'tertiary_link', 'unknown'
+)
+
+class StringTable:
+    """ Interning table: one shared str object per distinct value, with dense integer codes in insertion order. """
+    def __init__(self, strings=()):
+        self.strings: list[str] = []     # code -> string
+        self.codes: dict[str, int] = {}  # string -> code
+        for value in strings:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def intern(self, value: str) -> str:
+        return self.strings[self.code(value)]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
 class Graph:
+    # Share one str object per node ID / road name / road type across the whole graph.
+    # Only switched off to measure the savings (benchmark.py memory).
+    intern_strings = True
+
     def __init__(self):
         self.nodes: dict[str, Node] = {}  # id -> Node objekt
         self.edges: dict[str, list[dict]] = {} 
         self.pois: list[POI] = []   # List of POI objects 
         self.street_index: dict[str, list[str]] = defaultdict(list) # name -> list of edge_ids 
+        self.restrictions: list[TurnRestriction] = []  # From OSM restriction relations
+
+        # Edge index: every edge dict gets a stable 'id' (position in edge_list)
+        self.edge_list: list[dict] = []                     # id -> edge
+        self.edge_endpoints: list[tuple[str, str]] = []     # id -> (u, v)
+        self.edge_lookup: dict[tuple[str, str], dict] = {}  # (u, v) -> first edge u->v
+        self._incoming: dict[str, list[tuple[str, dict]]] | None = None  # v -> [(u, edge u->v)], built lazily
+
+        # Contraction hierarchy for routing (ch.ContractionHierarchy), attached when ROUTING_ALGORITHM is "ch"
+        self.hierarchy = None
+        # ALT landmark tables (landmarks.Landmarks), attached when ROUTING_ALGORITHM is "alt"
+        self.landmarks = None
+        # Turn cost tables for edge-based routing (turns.TurnTable), attached when ROUTING_ALGORITHM is "edge"
+        self.turn_table = None
+        # Seconds per edge id (traveltime.TravelTimes), shared by time routing, ETA and instructions
+        self.travel_times = None
+        # LRU cache of find_route results (routecache.RouteCache), invalidated by traffic changes
+        self.route_cache = None
+        # POIs snapped to road nodes and grouped by type (poisearch.PoiIndex), built at load time
+        self.poi_index = None
+
+        # Interned strings. Node IDs need no extra table: Node.id (the key of self.nodes) is the canonical copy.
+        self.name_table = StringTable()           # road names, street index keys, POI names/types
+        self.type_table = StringTable(ROAD_TYPES)  # road types
+
+    def intern_id(self, node_id: str) -> str:
+        """ Canonical copy of a node ID (the one used as key of self.nodes). """
+        if not self.intern_strings: return node_id
+        node = self.nodes.get(node_id)
+        return node.id if node is not None else node_id
+
+    def intern_name(self, name: str) -> str:
+        return self.name_table.intern(name) if self.intern_strings else name
+
+    def intern_type(self, road_type: str) -> str:
+        return self.type_table.intern(road_type) if self.intern_strings else road_type
 
     def add_node(self, id: str, lat: float, lon: float):
         self.nodes[id] = Node(id, lat, lon)
         self.edges[id] = []
 
-    def add_edge(self, u: str, v: str, weight: float, road_type: str="unknown", name: str="Unknown Road"):
+    def add_street(self, name: str, node_id: str):
+        """ Registers node_id under the (lower-cased) street name in the search index. """
+        self.street_index[self.intern_name(name.lower())].append(self.intern_id(node_id))
+
+    def add_edge(self, u: str, v: str, weight: float, road_type: str="unknown", name: str="Unknown Road",
+                 geometry: list[tuple[float, float]] | None = None):
         # Add directed edge. For bidirectional roads, this is called twice.
+        # geometry: optional (lat, lon) shape points between u and v (see contract_degree2_chains)
         if u in self.nodes and v in self.nodes:
-            self.edges[u].append({'to': v, 
-                                  'weight': weight, 
-                                  'base_weight': weight,
-                                  'type': road_type,
-                                  'name': name})
+            edge = {'to': v, 
+                    'weight': weight, 
+                    'base_weight': weight,
+                    'type': road_type,
+                    'name': name}
+            if geometry:
+                edge['geometry'] = geometry
+            self.edges[u].append(edge)
+            self.index_edge(u, edge)
+
+    def index_edge(self, u: str, edge: dict):
+        """ Registers an edge (already in self.edges[u]) in the edge index, assigns its id and interns its strings. """
+        u, edge['to'] = self.intern_id(u), self.intern_id(edge['to'])
+        edge['type'] = self.intern_type(edge['type'])
+        edge['name'] = self.intern_name(edge['name'])
+        key = (u, edge['to'])
+        edge['id'] = len(self.edge_list)
+        self.edge_list.append(edge)
+        self.edge_endpoints.append(key)
+        # Parallel edges: the first one wins, like the old linear scans
+        self.edge_lookup.setdefault(key, edge)
+        self._incoming = None
+
+    def rebuild_edge_index(self):
+        """ Re-numbers all edges from the adjacency lists. Called after nodes/edges are pruned or replaced. """
+        self.edge_list = []
+        self.edge_endpoints = []
+        self.edge_lookup = {}
+        for u, edges in self.edges.items():
+            for edge in edges:
+                self.index_edge(u, edge)
+
+    def get_edge(self, u: str, v: str) -> dict | None:
+        """ O(1) lookup of the directed edge u->v. """
+        return self.edge_lookup.get((u, v))
+
+    def edge_source(self, edge: dict) -> str:
+        """ Node an edge leaves from (edge dicts only store their target). """
+        return self.edge_endpoints[edge['id']][0]
+
+    def get_reverse_edge(self, edge: dict) -> dict | None:
+        """ O(1) lookup of the opposite direction of an edge (None on one-way roads). """
+        u, v = self.edge_endpoints[edge['id']]
+        return self.edge_lookup.get((v, u))
         
     def get_neighbors(self, node_id: str) -> list[dict]:
-        return self.edges.get(node_id, [])
\ No newline at end of file
+        return self.edges.get(node_id, [])
+
+    def get_incoming(self, node_id: str) -> list[tuple[str, dict]]:
+        """ Reverse adjacency: (u, edge) for every edge u->node_id. Built on first use from the edge index. """
+        if self._incoming is None:
+            incoming = {}
+            for (u, v), edge in zip(self.edge_endpoints, self.edge_list):
+                incoming.setdefault(v, []).append((u, edge))
+            self._incoming = incoming
+        return self._incoming.get(node_id, [])
\ No newline at end of file
@@ -0,0 +1,156 @@
+import time
+from algorithms import route_matrix, find_route, generate_instructions
+from models import Graph
+
+# Multi-stop routes: the order to visit 10-50 stops in.
+# Stop-to-stop costs come from one route_matrix (one one_to_many search per stop instead of an
+# A* per pair). The order starts with nearest insertion and is then improved with 2-opt (reverse a
+# stretch of the tour) and Or-opt (move a run of 1-3 stops elsewhere) until no move helps or the
+# time budget runs out. Costs may be asymmetric (one-way streets): every move is priced in the
+# direction the stops are actually driven.
+
+UNREACHABLE = 1e12      # Cost used for unreachable stop pairs, so tour arithmetic never sees inf - inf
+EPSILON = 1e-9
+
+class MultiStopRoute:
+    """
+    Optimised visit order. order: positions in the input stop list (order[0] == 0, the start);
+    stops: the stop node IDs in that order. cost is in the optimised metric; distance (m) and time (s)
+    are the matrix values of the tour. path/instructions: the stitched route ([] if a leg is unreachable).
+    """
+    def __init__(self, order: list[int], stops: list[str], cost: float, distance: float, time: float):
+        self.order = order
+        self.stops = stops
+        self.cost = cost
+        self.distance = distance
+        self.time = time
+        self.path: list[str] = []
+        self.instructions: list[str] = []
+
+    def __repr__(self):
+        return f"MultiStopRoute({len(self.stops)} stops, {self.distance:.0f} m, {self.time:.0f} s)"
+
+def _tour_cost(cost: list[list[float]], tour: list[int], round_trip: bool) -> float:
+    total = sum(cost[a][b] for a, b in zip(tour, tour[1:]))
+    return total + cost[tour[-1]][tour[0]] if round_trip and len(tour) > 1 else total
+
+def _nearest_insertion(cost: list[list[float]], round_trip: bool) -> list[int]:
+    """ Repeatedly takes the stop closest to the tour and inserts it where it adds the least. Stop 0 stays first. """
+    n = len(cost)
+    tour = [0]
+    # Distance of every unvisited stop to the tour (either direction)
+    nearest = {k: min(cost[0][k], cost[k][0]) for k in range(1, n)}
+    while nearest:
+        k = min(nearest, key=nearest.__getitem__)
+        del nearest[k]
+
+        best_pos, best_delta = len(tour), cost[tour[-1]][k] + (cost[k][tour[0]] - cost[tour[-1]][tour[0]] if round_trip else 0)
+        for p in range(len(tour) - 1):
+            a, b = tour[p], tour[p + 1]
+            delta = cost[a][k] + cost[k][b] - cost[a][b]
+            if delta < best_delta:
+                best_pos, best_delta = p + 1, delta
+        tour.insert(best_pos, k)
+
+        for j in nearest:
+            nearest[j] = min(nearest[j], cost[k][j], cost[j][k])
+    return tour
+
+def _two_opt(cost: list[list[float]], seq: list[int], last: int, deadline: float) -> bool:
+    """
+    One improving 2-opt move on seq (reversing seq[i..j], 1 <= i < j <= last), first improvement.
+    Prefix sums of the forward and backward leg costs price a reversal in O(1) despite asymmetric costs.
+    """
+    m = len(seq)
+    fwd, bwd = [0.0], [0.0]
+    for a, b in zip(seq, seq[1:]):
+        fwd.append(fwd[-1] + cost[a][b])
+        bwd.append(bwd[-1] + cost[b][a])
+    for i in range(1, last):
+        if time.perf_counter() > deadline:
+            return False
+        prev = seq[i - 1]
+        for j in range(i + 1, last + 1):
+            after = seq[j + 1] if j + 1 < m else None
+            old = cost[prev][seq[i]] + fwd[j] - fwd[i] + (cost[seq[j]][after] if after is not None else 0.0)
+            new = cost[prev][seq[j]] + bwd[j] - bwd[i] + (cost[seq[i]][after] if after is not None else 0.0)
+            if new < old - EPSILON:
+                seq[i:j + 1] = reversed(seq[i:j + 1])
+                return True
+    return False
+
+def _or_opt(cost: list[list[float]], seq: list[int], last: int, deadline: float) -> bool:
+    """ One improving Or-opt move: a run of 1-3 stops from seq[1..last] moved (unreversed) to another gap. """
+    m = len(seq)
+    for length in (1, 2, 3):
+        for i in range(1, last - length + 2):
+            if time.perf_counter() > deadline:
+                return False
+            j = i + length - 1                      # Run is seq[i..j]
+            first, run_last = seq[i], seq[j]
+            prev, after = seq[i - 1], (seq[j + 1] if j + 1 < m else None)
+            if after is None:
+                gain = cost[prev][first]
+            else:
+                gain = cost[prev][first] + cost[run_last][after] - cost[prev][after]
+            # Gaps (a, b) = (seq[p], seq[p + 1]) outside the run; b is None past the end of an open tour
+            for p in range(0, last + 1):
+                if i - 1 <= p <= j: continue
+                a, b = seq[p], (seq[p + 1] if p + 1 < m else None)
+                add = cost[a][first] + (cost[run_last][b] - cost[a][b] if b is not None else 0.0)
+                if add < gain - EPSILON:
+                    run = seq[i:j + 1]
+                    del seq[i:j + 1]
+                    insert_at = p + 1 if p < i else p + 1 - length
+                    seq[insert_at:insert_at] = run
+                    return True
+    return False
+
+def optimise_order(cost: list[list[float]], round_trip: bool = False, time_budget: float = 1.0) -> list[int]:
+    """
+    Visit order for a square cost matrix (stop 0 first): nearest insertion, then 2-opt / Or-opt
+    until neither improves or time_budget seconds have passed.
+    """
+    deadline = time.perf_counter() + time_budget
+    tour = _nearest_insertion(cost, round_trip)
+    if len(tour) < 3:
+        return tour
+    # Local search on the driven sequence: a round trip ends back at stop 0, which never moves
+    seq = tour + [0] if round_trip else tour
+    last = len(tour) - 1
+    while time.perf_counter() < deadline:
+        if not (_two_opt(cost, seq, last, deadline) or _or_opt(cost, seq, last, deadline)):
+            break
+    return seq[:len(tour)]
+
+def plan_stops(graph: Graph, stops: list[str], metric: str = 'time', round_trip: bool = False,
+               time_budget: float = 1.0, algorithm: str = 'astar', workers: int = 1) -> MultiStopRoute:
+    """
+    Best found order to visit all stops starting at stops[0] (and returning to it if round_trip),
+    minimising total 'time' or 'distance'. The legs are then routed with find_route(algorithm) and
+    stitched into one path with turn-by-turn instructions.
+    """
+    matrix = route_matrix(graph, stops, stops, workers=workers)
+    n = len(stops)
+    values = matrix.times if metric == 'time' else matrix.distances
+    cost = [[min(values[i * n + j], UNREACHABLE) for j in range(n)] for i in range(n)]
+
+    order = optimise_order(cost, round_trip, time_budget) if n > 1 else list(range(n))
+    legs = list(zip(order, order[1:])) + ([(order[-1], order[0])] if round_trip and n > 1 else [])
+    result = MultiStopRoute(order, [stops[i] for i in order],
+                            sum(cost[i][j] for i, j in legs),
+                            sum(matrix.distance(i, j) for i, j in legs),
+                            sum(matrix.time(i, j) for i, j in legs))
+
+    # Stitch the legs (consecutive duplicate stops need no leg)
+    path = [stops[order[0]]] if stops else []
+    for i, j in legs:
+        if stops[i] == stops[j]: continue
+        leg, _ = find_route(graph, stops[i], stops[j], algorithm)
+        if not leg:
+            path = []
+            break
+        path.extend(leg[1:])
+    result.path = path
+    result.instructions = generate_instructions(graph, path) if path else ["Route blocked. Destination unreachable."]
+    return result
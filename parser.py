@@ -1,37 +1,205 @@
 import xml.etree.ElementTree as ET
-from models import Graph, POI
+import os
+from array import array
+import time
+from multiprocessing import Pool
+from models import Graph, POI, TurnRestriction, ROAD_TYPES
+from pbf import is_pbf_file, iter_blobs, check_header_block, decode_primitive_block
 from utils import haversine_distance
 from collections import deque
 
+ALLOWED_HIGHWAYS = set(ROAD_TYPES) - {'unknown'}
+
+def _get_poi_type(tags: dict) -> str | None:
+    """ Returns the POI category for a node's tags, or None if it is not a POI. """
+    if 'amenity' in tags: return tags['amenity']
+    elif 'shop' in tags: return 'shop'
+    elif 'leisure' in tags: return tags['leisure']
+    return None
+
+def _is_drivable(tags: dict) -> bool:
+    return 'highway' in tags and tags['highway'] in ALLOWED_HIGHWAYS
+
+def _add_poi(graph: Graph, lat, lon, tags: dict):
+    """ Registers a POI on the graph if the node's tags describe one. """
+    poi_type = _get_poi_type(tags)
+    if poi_type:
+        name = tags.get('name', 'Unknown')
+        graph.pois.append(POI(lat, lon, graph.intern_name(poi_type), graph.intern_name(name)))
+
+def _add_node(graph: Graph, node_id: str, lat, lon, tags: dict):
+    """ Adds a parsed <node> to the graph and registers it as a POI if tagged as one. """
+    graph.add_node(node_id, lat, lon)
+    _add_poi(graph, lat, lon, tags)
+
+def _add_way(graph: Graph, nd_refs: list[str], tags: dict) -> bool:
+    """ Adds the road segments of a parsed <way> to the graph (if it is a drivable highway). Returns True if it was. """
+    if not _is_drivable(tags):
+        return False
+
+    road_type = tags['highway']
+    name = tags.get('name', 'Unknown Road')
+    is_oneway = tags.get('oneway') == 'yes'
+
+    for i in range(len(nd_refs) - 1):
+        u, v = nd_refs[i], nd_refs[i+1]
+        if u not in graph.nodes or v not in graph.nodes: continue
+        
+        u_node, v_node = graph.nodes[u], graph.nodes[v]
+        dist = haversine_distance(u_node.lat, u_node.lon, v_node.lat, v_node.lon)
+        
+        graph.add_edge(u, v, dist, road_type, name)
+        
+        # Update Search Index
+        if name and name != "Unknown Road":
+            # Store tuple (u, v) or just u? Storing u is enough to find the node.
+            # Actually storing u_id is better to jump to node.
+            graph.add_street(name, u)
+
+        if not is_oneway:
+            graph.add_edge(v, u, dist, road_type, name)
+    return True
+
+def _restriction_kind(tags: dict) -> str | None:
+    """ 'no' / 'only' for a turn restriction relation (restriction=no_left_turn, only_straight_on, ...), else None. """
+    if tags.get('type') != 'restriction':
+        return None
+    value = tags.get('restriction') or tags.get('restriction:motorcar') or ''
+    kind = value.split('_', 1)[0]
+    return kind if kind in ('no', 'only') else None
+
+def _way_neighbours(nd_refs: list[str], node_id: str) -> list[str]:
+    """ Nodes next to node_id along a way (two if the way passes through it). """
+    neighbours = []
+    for i, ref in enumerate(nd_refs):
+        if ref == node_id:
+            if i > 0: neighbours.append(nd_refs[i - 1])
+            if i + 1 < len(nd_refs): neighbours.append(nd_refs[i + 1])
+    return neighbours
+
+def _add_restriction(graph: Graph, way_refs: dict[str, list[str]], members: list[tuple[str, str, str]], tags: dict):
+    """
+    Compiles a parsed restriction <relation> (from way, via node, to way) into TurnRestrictions on
+    the graph, one per pair of road segments touching the via node. way_refs holds the node refs of
+    the drivable ways seen so far. Via-way restrictions and incomplete relations are skipped.
+    """
+    kind = _restriction_kind(tags)
+    if kind is None:
+        return
+
+    roles = {}
+    for member_type, ref, role in members:
+        roles.setdefault(role, []).append((member_type, ref))
+    from_members, via_members, to_members = roles.get('from', []), roles.get('via', []), roles.get('to', [])
+    if len(from_members) != 1 or len(via_members) != 1 or len(to_members) != 1:
+        return
+    (from_type, from_way), (via_type, via), (to_type, to_way) = from_members[0], via_members[0], to_members[0]
+    if from_type != 'way' or via_type != 'node' or to_type != 'way' or via not in graph.nodes:
+        return
+    if from_way not in way_refs or to_way not in way_refs:
+        return
+
+    for p in _way_neighbours(way_refs[from_way], via):
+        for q in _way_neighbours(way_refs[to_way], via):
+            # On a single way (no_u_turn) only the way back is meant, not going straight through
+            if from_way == to_way and p != q: continue
+            if p in graph.nodes and q in graph.nodes:
+                graph.restrictions.append(TurnRestriction(graph.intern_id(p), graph.intern_id(via),
+                                                          graph.intern_id(q), kind))
+
+def _strongly_connected_components(graph: Graph) -> tuple[list[str], array, int]:
+    """
+    Iterative Tarjan SCC over integer node indices (no recursion, flat int arrays).
+    Returns (node_ids, component id per node index, number of components). Runs in O(N + E).
+    """
+    node_ids = list(graph.nodes)
+    index_of = {node_id: i for i, node_id in enumerate(node_ids)}
+    n = len(node_ids)
+
+    # CSR adjacency over indices
+    adj_start = array('l', [0]) * (n + 1)
+    targets = array('l')
+    for i, node_id in enumerate(node_ids):
+        for edge in graph.edges.get(node_id, []):
+            j = index_of.get(edge['to'])
+            if j is not None:
+                targets.append(j)
+        adj_start[i + 1] = len(targets)
+    del index_of
+
+    order = array('l', [-1]) * n       # DFS discovery index
+    low = array('l', [0]) * n
+    component = array('l', [-1]) * n
+    on_stack = bytearray(n)
+    stack = array('l')                 # Tarjan stack
+    call_stack = []                    # Explicit DFS stack: [node, next edge position]
+    counter = 0
+    component_count = 0
+
+    for root in range(n):
+        if order[root] != -1: continue
+
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        call_stack.append([root, adj_start[root]])
+
+        while call_stack:
+            frame = call_stack[-1]
+            v, pos = frame
+            end = adj_start[v + 1]
+
+            while pos < end:
+                w = targets[pos]
+                pos += 1
+                if order[w] == -1:
+                    # Descend into w, resume v at pos afterwards
+                    frame[1] = pos
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    call_stack.append([w, adj_start[w]])
+                    break
+                elif on_stack[w] and order[w] < low[v]:
+                    low[v] = order[w]
+            else:
+                # All edges of v done
+                call_stack.pop()
+                if low[v] == order[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        component[w] = component_count
+                        if w == v: break
+                    component_count += 1
+                if call_stack:
+                    parent = call_stack[-1][0]
+                    if low[v] < low[parent]:
+                        low[parent] = low[v]
+
+    return node_ids, component, component_count
+
 def keep_only_largest_component(graph: Graph):
     """
-    Retains only the largest connected component of the road network to prevent routing errors.
+    Retains only the largest strongly connected component of the road network,
+    so every remaining node can both reach and be reached from every other one.
     """
     
     # 1. Find all components
-    visited = set()
-    largest_component = set()
+    node_ids, component, component_count = _strongly_connected_components(graph)
     
-    for node_id in graph.nodes:
-        if node_id not in visited:
-            current_component = set()
-            # Use list as stack for DFS
-            stack = [node_id]
-            visited.add(node_id)
-            current_component.add(node_id)
-            
-            while stack:
-                curr = stack.pop()
-                for edge in graph.get_neighbors(curr):
-                    neighbor = edge['to']
-                    if neighbor in graph.nodes and neighbor not in visited:
-                        visited.add(neighbor)
-                        current_component.add(neighbor)
-                        stack.append(neighbor)
-            
-            if len(current_component) > len(largest_component):
-                largest_component = current_component
+    sizes = array('l', [0]) * component_count
+    for c in component:
+        sizes[c] += 1
+    
+    largest = max(range(component_count), key=sizes.__getitem__) if component_count else -1
+    largest_component = {node_ids[i] for i, c in enumerate(component) if c == largest}
+    singletons = sizes.count(1)
 
+    print(f"Strongly connected components: {component_count} ({singletons} single nodes), "
+          f"largest has {len(largest_component)} nodes.")
     print(f"Retained {len(largest_component)} out of {len(graph.nodes)} nodes.")
     
     # 2. Delete nodes not in the main component
@@ -53,6 +221,133 @@ def keep_only_largest_component(graph: Graph):
             ]
             graph.edges[n] = cleaned_edges
 
+    graph.restrictions = [r for r in graph.restrictions
+                          if r.from_id in largest_component and r.via_id in largest_component
+                          and r.to_id in largest_component]
+    graph.rebuild_edge_index()
+
+
+def _shape_point_kind(graph: Graph, node_id: str, incoming: dict) -> str | None:
+    """
+    Classifies a node as a contractible shape point:
+    'twoway' - exactly two neighbours, connected in both directions,
+    'oneway' - exactly one incoming and one outgoing edge to two different neighbours.
+    All touching edges must share road type and name. Returns None for intersections/dead ends.
+    """
+    out_edges = graph.edges[node_id]
+    in_edges = incoming[node_id]
+    if len(out_edges) != len(in_edges) or len(out_edges) not in (1, 2):
+        return None
+
+    attrs = {(e['type'], e['name']) for e in out_edges} | {(e['type'], e['name']) for _, e in in_edges}
+    if len(attrs) != 1:
+        return None
+
+    targets = [e['to'] for e in out_edges]
+    sources = [u for u, _ in in_edges]
+    if node_id in targets or len(set(targets)) != len(targets):
+        return None
+
+    if len(out_edges) == 2:
+        return 'twoway' if set(targets) == set(sources) else None
+    return 'oneway' if targets[0] != sources[0] else None
+
+def contract_degree2_chains(graph: Graph):
+    """
+    Topology simplification: merges chains of shape points (degree-2 nodes with the same
+    road type, name and one-way status) into single edges between intersections.
+    The removed points are kept on the edge as 'geometry' ((lat, lon) list, in travel direction)
+    so rendering and animation can expand them back. Chains that would create a loop or a
+    second edge between the same two intersections are left untouched.
+    """
+    node_count = len(graph.nodes)
+    edge_count = sum(len(edges) for edges in graph.edges.values())
+
+    incoming = {node_id: [] for node_id in graph.nodes}
+    for u, edges in graph.edges.items():
+        for edge in edges:
+            incoming[edge['to']].append((u, edge))
+
+    shape_points = {}
+    for node_id in graph.nodes:
+        kind = _shape_point_kind(graph, node_id, incoming)
+        if kind: shape_points[node_id] = kind
+
+    connected = {(u, edge['to']) for u, edges in graph.edges.items() for edge in edges}
+    removed = {}   # shape point -> head node of its chain (for street_index)
+    chain_ends = {}  # shape point -> (a, b) intersections its chain now connects directly
+
+    for a in graph.nodes:
+        if a in shape_points: continue
+
+        for pos, first_edge in enumerate(graph.edges[a]):
+            s = first_edge['to']
+            if s not in shape_points or s in removed: continue
+
+            # Walk the chain until the next intersection
+            interior = [s]
+            weight = first_edge['weight']
+            prev, cur = a, s
+            while cur in shape_points:
+                next_edge = next(e for e in graph.edges[cur] if e['to'] != prev)
+                weight += next_edge['weight']
+                prev, cur = cur, next_edge['to']
+                if cur in shape_points:
+                    if cur == s: break   # Ring made only of shape points
+                    interior.append(cur)
+            b = cur
+
+            is_twoway = shape_points[s] == 'twoway'
+            if b == a or b in shape_points or (a, b) in connected or (is_twoway and (b, a) in connected):
+                continue
+
+            geometry = [(graph.nodes[n].lat, graph.nodes[n].lon) for n in interior]
+            graph.edges[a][pos] = {'to': b, 'weight': weight, 'base_weight': weight,
+                                   'type': first_edge['type'], 'name': first_edge['name'],
+                                   'geometry': geometry}
+            connected.add((a, b))
+
+            if is_twoway:
+                # Replace b's edge into the chain with the mirrored polyline edge
+                last = interior[-1]
+                back_pos = next(i for i, e in enumerate(graph.edges[b]) if e['to'] == last)
+                back_edge = graph.edges[b][back_pos]
+                graph.edges[b][back_pos] = {'to': a, 'weight': weight, 'base_weight': weight,
+                                            'type': back_edge['type'], 'name': back_edge['name'],
+                                            'geometry': geometry[::-1]}
+                connected.add((b, a))
+
+            for n in interior:
+                removed[n] = a
+                chain_ends[n] = (a, b)
+
+    for n in removed:
+        del graph.nodes[n]
+        del graph.edges[n]
+
+    # Search entries pointing at removed shape points jump to the start of their chain instead
+    for key, node_ids in graph.street_index.items():
+        graph.street_index[key] = [removed.get(n, n) for n in node_ids]
+
+    # Turn restrictions name the neighbours of their via node; a removed neighbour is replaced by the
+    # far end of its chain (the polyline edge now reaches the via node from there)
+    def chain_neighbour(n, via):
+        if n not in chain_ends: return n
+        a, b = chain_ends[n]
+        return a if b == via else b
+    graph.restrictions = [TurnRestriction(chain_neighbour(r.from_id, r.via_id), r.via_id,
+                                          chain_neighbour(r.to_id, r.via_id), r.kind)
+                          for r in graph.restrictions if r.via_id not in removed]
+
+    graph.rebuild_edge_index()
+
+    new_edge_count = sum(len(edges) for edges in graph.edges.values())
+    print(f"Contracted {len(removed)} shape points: {node_count} -> {len(graph.nodes)} nodes, "
+          f"{edge_count} -> {new_edge_count} edges.")
+
+def _members(relation) -> list[tuple[str, str, str]]:
+    """ (type, ref, role) of every <member> of a parsed <relation>. """
+    return [(m.get('type'), m.get('ref'), m.get('role')) for m in relation.findall('member')]
 
 def load_osm_data(filepath):
     print(f"Parsing: {filepath}...")
@@ -66,54 +361,314 @@ def load_osm_data(filepath):
     graph = Graph()
     
     for node in root.findall('node'):
-        graph.add_node(node.get('id'), node.get('lat'), node.get('lon'))
-        
-        # Check for POI tags
         tags = {tag.get('k'): tag.get('v') for tag in node.findall('tag')}
-        poi_type = None
-        if 'amenity' in tags: poi_type = tags['amenity']
-        elif 'shop' in tags: poi_type = 'shop'
-        elif 'leisure' in tags: poi_type = tags['leisure']
-        
-        if poi_type:
-            name = tags.get('name', 'Unknown')
-            graph.pois.append(POI(node.get('lat'), node.get('lon'), poi_type, name))
-
-    allowed_highways = {
-        'motorway', 'trunk', 'primary', 'secondary', 'tertiary', 
-        'unclassified', 'residential', 'living_street', 'service',
-        'motorway_link', 'trunk_link', 'primary_link', 
-        'secondary_link', 'tertiary_link'
-    }
+        _add_node(graph, node.get('id'), node.get('lat'), node.get('lon'), tags)
 
+    way_refs = {}
     for way in root.findall('way'):
         tags = {tag.get('k'): tag.get('v') for tag in way.findall('tag')}
-        
-        if 'highway' in tags and tags['highway'] in allowed_highways:
-            nd_refs = [nd.get('ref') for nd in way.findall('nd')]
-            road_type = tags['highway']
-            name = tags.get('name', 'Unknown Road')
-            is_oneway = tags.get('oneway') == 'yes'
-
-            for i in range(len(nd_refs) - 1):
-                u, v = nd_refs[i], nd_refs[i+1]
-                if u not in graph.nodes or v not in graph.nodes: continue
-                
-                u_node, v_node = graph.nodes[u], graph.nodes[v]
-                dist = haversine_distance(u_node.lat, u_node.lon, v_node.lat, v_node.lon)
-                
-                graph.add_edge(u, v, dist, road_type, name)
-                
-                # Update Search Index
-                if name and name != "Unknown Road":
-                    # Store tuple (u, v) or just u? Storing u is enough to find the node.
-                    # Actually storing u_id is better to jump to node.
-                    graph.street_index[name.lower()].append(u)
-
-                if not is_oneway:
-                    graph.add_edge(v, u, dist, road_type, name)
+        nd_refs = [nd.get('ref') for nd in way.findall('nd')]
+        if _add_way(graph, nd_refs, tags):
+            way_refs[way.get('id')] = nd_refs
+
+    for relation in root.findall('relation'):
+        tags = {tag.get('k'): tag.get('v') for tag in relation.findall('tag')}
+        _add_restriction(graph, way_refs, _members(relation), tags)
 
     if len(graph.nodes) > 0:
         keep_only_largest_component(graph)
         
-    return graph
\ No newline at end of file
+    return graph
+
+def _iter_osm_elements(filepath):
+    """
+    Yields every top-level <node>/<way>/<relation> element as soon as it is closed.
+    The element is cleared (and detached from the root) once the caller is done with it.
+    """
+    context = ET.iterparse(filepath, events=('start', 'end'))
+    _, root = next(context)
+
+    for event, elem in context:
+        # <tag>/<nd> children are read by their parent, keep them until then
+        if event != 'end' or elem.tag not in ('node', 'way', 'relation'): continue
+
+        yield elem
+
+        # Drop the processed element and its reference from the root
+        elem.clear()
+        root.clear()
+
+def load_osm_data_streaming(filepath):
+    """
+    Streaming variant of load_osm_data built on ET.iterparse.
+    Each <node>/<way>/<relation> is processed as soon as it is closed and then cleared,
+    so the XML tree is never held in memory - peak usage follows the size of the Graph.
+    Assumes the standard OSM ordering (all nodes before the ways that reference them).
+    """
+    print(f"Streaming: {filepath}...")
+    graph = Graph()
+    way_refs = {}   # Drivable way -> node refs, for turn restrictions (relations come after the ways)
+    element_count = 0
+    start_time = time.perf_counter()
+
+    try:
+        for elem in _iter_osm_elements(filepath):
+            tags = {tag.get('k'): tag.get('v') for tag in elem.findall('tag')}
+            if elem.tag == 'node':
+                _add_node(graph, elem.get('id'), elem.get('lat'), elem.get('lon'), tags)
+            elif elem.tag == 'way':
+                nd_refs = [nd.get('ref') for nd in elem.findall('nd')]
+                if _add_way(graph, nd_refs, tags):
+                    way_refs[elem.get('id')] = nd_refs
+            elif elem.tag == 'relation':
+                _add_restriction(graph, way_refs, _members(elem), tags)
+            element_count += 1
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+    del way_refs
+
+    elapsed = time.perf_counter() - start_time
+    rate = element_count / elapsed if elapsed > 0 else 0.0
+    print(f"Streamed {element_count} elements in {elapsed:.2f}s ({rate:,.0f} elements/sec).")
+
+    if len(graph.nodes) > 0:
+        keep_only_largest_component(graph)
+
+    return graph
+
+def load_osm_data_two_pass(filepath):
+    """
+    Streaming loader that only materializes nodes used by drivable roads.
+    Pass 1 collects the node refs of ways passing the ALLOWED_HIGHWAYS filter,
+    pass 2 adds just those nodes (POI-tagged nodes still become POIs) and builds the edges.
+    Building outlines, land-use polygons and other geometry never enter graph.nodes.
+    """
+    print(f"Two-pass loading: {filepath}...")
+    start_time = time.perf_counter()
+
+    try:
+        # Pass 1: Collect node refs of drivable ways
+        road_node_ids = set()
+        for elem in _iter_osm_elements(filepath):
+            if elem.tag != 'way': continue
+            tags = {tag.get('k'): tag.get('v') for tag in elem.findall('tag')}
+            if _is_drivable(tags):
+                road_node_ids.update(nd.get('ref') for nd in elem.findall('nd'))
+
+        # Pass 2: Materialize referenced nodes, then the road segments
+        graph = Graph()
+        way_refs = {}
+        total_nodes = 0
+        for elem in _iter_osm_elements(filepath):
+            tags = {tag.get('k'): tag.get('v') for tag in elem.findall('tag')}
+            if elem.tag == 'node':
+                total_nodes += 1
+                node_id = elem.get('id')
+                if node_id in road_node_ids:
+                    _add_node(graph, node_id, elem.get('lat'), elem.get('lon'), tags)
+                else:
+                    _add_poi(graph, elem.get('lat'), elem.get('lon'), tags)
+            elif elem.tag == 'way':
+                nd_refs = [nd.get('ref') for nd in elem.findall('nd')]
+                if _add_way(graph, nd_refs, tags):
+                    way_refs[elem.get('id')] = nd_refs
+            elif elem.tag == 'relation':
+                _add_restriction(graph, way_refs, _members(elem), tags)
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+    del road_node_ids, way_refs
+
+    skipped = total_nodes - len(graph.nodes)
+    share = 100.0 * skipped / total_nodes if total_nodes else 0.0
+    elapsed = time.perf_counter() - start_time
+    print(f"Skipped {skipped} of {total_nodes} nodes ({share:.1f}%) not referenced by drivable roads in {elapsed:.2f}s.")
+
+    if len(graph.nodes) > 0:
+        keep_only_largest_component(graph)
+
+    return graph
+
+# --- Parallel way processing ---
+# Worker processes receive the node coordinates once (pool initializer) and turn
+# batches of ways into per-node edge lists plus street-index fragments.
+
+_worker_coords: dict[str, tuple[float, float]] = {}
+
+def _init_way_worker(coords: dict[str, tuple[float, float]]):
+    global _worker_coords
+    _worker_coords = coords
+
+def _process_way_batch(ways: list[tuple[list[str], str, str, bool]]) -> tuple[dict, dict]:
+    """
+    Same segment logic as _add_way, for a contiguous batch of drivable ways.
+    Returns (edges, street_index) fragments in way order so they can be appended as-is.
+    """
+    coords = _worker_coords
+    edges: dict[str, list[dict]] = {}
+    street_index: dict[str, list[str]] = {}
+
+    for nd_refs, road_type, name, is_oneway in ways:
+        for i in range(len(nd_refs) - 1):
+            u, v = nd_refs[i], nd_refs[i+1]
+            if u not in coords or v not in coords: continue
+
+            (u_lat, u_lon), (v_lat, v_lon) = coords[u], coords[v]
+            dist = haversine_distance(u_lat, u_lon, v_lat, v_lon)
+
+            edges.setdefault(u, []).append({'to': v, 'weight': dist, 'base_weight': dist,
+                                            'type': road_type, 'name': name})
+            if name and name != "Unknown Road":
+                street_index.setdefault(name.lower(), []).append(u)
+            if not is_oneway:
+                edges.setdefault(v, []).append({'to': u, 'weight': dist, 'base_weight': dist,
+                                                'type': road_type, 'name': name})
+    return edges, street_index
+
+def _merge_way_batch(graph: Graph, edges: dict, street_index: dict):
+    # Batches are merged in file order, so every adjacency list ends up in serial order
+    for u, edge_list in edges.items():
+        graph.edges[u].extend(edge_list)
+        for edge in edge_list:
+            graph.index_edge(u, edge)
+    for key, node_list in street_index.items():
+        graph.street_index[graph.intern_name(key)].extend(graph.intern_id(n) for n in node_list)
+
+def load_osm_data_parallel(filepath, workers: int | None = None, batch_size: int = 2000):
+    """
+    Streaming loader that shards way processing across a process pool.
+    Nodes are parsed in this process; drivable ways are sent to the workers in batches
+    while parsing continues. Produces exactly the same Graph as the serial loaders.
+    """
+    workers = workers or os.cpu_count() or 1
+    print(f"Parallel loading ({workers} workers): {filepath}...")
+    start_time = time.perf_counter()
+
+    graph = Graph()
+    pool = None
+    pending = []   # AsyncResults (or plain results when running serially), in file order
+    batch = []
+    way_refs = {}   # Drivable way -> node refs, for turn restrictions
+
+    def flush():
+        if not batch: return
+        if pool is not None:
+            pending.append(pool.apply_async(_process_way_batch, (list(batch),)))
+        else:
+            pending.append(_process_way_batch(list(batch)))
+        batch.clear()
+
+    try:
+        for elem in _iter_osm_elements(filepath):
+            tags = {tag.get('k'): tag.get('v') for tag in elem.findall('tag')}
+            if elem.tag == 'node':
+                _add_node(graph, elem.get('id'), elem.get('lat'), elem.get('lon'), tags)
+            elif elem.tag == 'way' and _is_drivable(tags):
+                if not pending and not batch:
+                    # First way: all nodes are known, hand the coordinates to the workers
+                    coords = {nid: (n.lat, n.lon) for nid, n in graph.nodes.items()}
+                    if workers > 1:
+                        pool = Pool(workers, initializer=_init_way_worker, initargs=(coords,))
+                    else:
+                        _init_way_worker(coords)
+
+                nd_refs = [nd.get('ref') for nd in elem.findall('nd')]
+                way_refs[elem.get('id')] = nd_refs
+                batch.append((nd_refs, tags['highway'], tags.get('name', 'Unknown Road'), tags.get('oneway') == 'yes'))
+                if len(batch) >= batch_size:
+                    flush()
+            elif elem.tag == 'relation':
+                _add_restriction(graph, way_refs, _members(elem), tags)
+        flush()
+
+        for result in pending:
+            edges, street_index = result.get() if pool is not None else result
+            _merge_way_batch(graph, edges, street_index)
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _init_way_worker({})
+    del way_refs
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Processed {len(graph.nodes)} nodes and {len(pending)} way batches in {elapsed:.2f}s.")
+
+    if len(graph.nodes) > 0:
+        keep_only_largest_component(graph)
+
+    return graph
+
+def load_osm_pbf(filepath, workers: int | None = None):
+    """
+    Loads a .osm.pbf extract. Blocks are decompressed and decoded in a process pool
+    (results arrive in file order) and then go through the same node/way logic as the XML loaders.
+    """
+    workers = workers or os.cpu_count() or 1
+    print(f"Parsing PBF ({workers} workers): {filepath}...")
+    start_time = time.perf_counter()
+
+    graph = Graph()
+    way_refs = {}
+    element_count = 0
+    pool = None
+
+    try:
+        blobs = iter_blobs(filepath)
+        blob_type, header = next(blobs)
+        if blob_type != 'OSMHeader':
+            raise ValueError("PBF file does not start with an OSMHeader block")
+        check_header_block(header)
+
+        data_blobs = (blob for blob_type, blob in blobs if blob_type == 'OSMData')
+        if workers > 1:
+            pool = Pool(workers)
+            blocks = pool.imap(decode_primitive_block, data_blobs)
+        else:
+            blocks = map(decode_primitive_block, data_blobs)
+
+        for nodes, ways, relations in blocks:
+            for node_id, lat, lon, tags in nodes:
+                _add_node(graph, node_id, lat, lon, tags)
+            for way_id, nd_refs, tags in ways:
+                if _add_way(graph, nd_refs, tags):
+                    way_refs[way_id] = nd_refs
+            for relation_id, members, tags in relations:
+                _add_restriction(graph, way_refs, members, tags)
+            element_count += len(nodes) + len(ways) + len(relations)
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    del way_refs
+
+    elapsed = time.perf_counter() - start_time
+    rate = element_count / elapsed if elapsed > 0 else 0.0
+    print(f"Decoded {element_count} elements in {elapsed:.2f}s ({rate:,.0f} elements/sec).")
+
+    if len(graph.nodes) > 0:
+        keep_only_largest_component(graph)
+
+    return graph
+
+def load_map(filepath):
+    """ Loads an OSM extract, choosing the PBF or XML loader from the file contents. """
+    try:
+        pbf = is_pbf_file(filepath)
+    except OSError as e:
+        print(f"Error: {e}")
+        return None
+
+    if pbf:
+        return load_osm_pbf(filepath)
+    return load_osm_data_streaming(filepath)
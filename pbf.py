@@ -0,0 +1,239 @@
+import lzma
+import struct
+import zlib
+
+# Minimal reader for the OpenStreetMap PBF format (https://wiki.openstreetmap.org/wiki/PBF_Format).
+# A file is a sequence of [int32 length][BlobHeader][Blob]; every Blob holds one
+# (usually zlib compressed) HeaderBlock or PrimitiveBlock. Protobuf messages are decoded by hand,
+# so no protobuf dependency is needed. Blocks are independent and can be decoded in parallel.
+
+SUPPORTED_FEATURES = {'OsmSchema-V0.6', 'DenseNodes', 'HistoricalInformation'}
+MEMBER_TYPES = ('node', 'way', 'relation')
+
+_NO_TAGS: dict = {}
+
+def is_pbf_file(filepath: str) -> bool:
+    """ Detects PBF from the file contents: the first BlobHeader must be of type 'OSMHeader'. """
+    with open(filepath, 'rb') as f:
+        head = f.read(64)
+    if len(head) < 5:
+        return False
+    header_len = struct.unpack('>I', head[:4])[0]
+    # BlobHeader field 1 (type) is a length-delimited string -> key byte 0x0A
+    return 0 < header_len < 64 * 1024 and head[4] == 0x0A and b'OSMHeader' in head[4:4 + header_len]
+
+# --- Protobuf wire format ---
+
+def _read_varint(buf, pos: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+def _iter_fields(buf):
+    """ Yields (field_number, value) for a protobuf message. Length-delimited values are memoryview slices. """
+    buf = memoryview(buf)
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        wire_type = key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire_type == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield key >> 3, value
+
+def _packed_varints(buf) -> list[int]:
+    values = []
+    pos, end = 0, len(buf)
+    while pos < end:
+        result = 0
+        shift = 0
+        while True:
+            b = buf[pos]
+            pos += 1
+            result |= (b & 0x7F) << shift
+            if b < 0x80: break
+            shift += 7
+        values.append(result)
+    return values
+
+def _zigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+def _int64(n: int) -> int:
+    # Negative int64 values are encoded as 10-byte two's complement varints
+    return n - (1 << 64) if n >= (1 << 63) else n
+
+def _delta_decode(values: list[int]) -> list[int]:
+    out = []
+    acc = 0
+    for v in values:
+        acc += _zigzag(v)
+        out.append(acc)
+    return out
+
+# --- File / blob level ---
+
+def iter_blobs(filepath: str):
+    """ Yields (blob_type, raw Blob bytes) for every block of the file, without decompressing. """
+    with open(filepath, 'rb') as f:
+        while True:
+            size_bytes = f.read(4)
+            if not size_bytes:
+                return
+            if len(size_bytes) < 4:
+                raise ValueError("Truncated PBF file")
+
+            header = f.read(struct.unpack('>I', size_bytes)[0])
+            blob_type, data_size = None, 0
+            for field, value in _iter_fields(header):
+                if field == 1: blob_type = bytes(value).decode('utf-8')
+                elif field == 3: data_size = value
+
+            blob = f.read(data_size)
+            if len(blob) < data_size:
+                raise ValueError("Truncated PBF file")
+            yield blob_type, blob
+
+def _decompress_blob(blob: bytes) -> bytes:
+    raw_size = None
+    for field, value in _iter_fields(blob):
+        if field == 1:
+            return bytes(value)
+        elif field == 2:
+            raw_size = value
+        elif field == 3:
+            return zlib.decompress(value)
+        elif field == 4:
+            return lzma.decompress(value)
+        elif field in (5, 6, 7):
+            raise ValueError("Unsupported PBF blob compression (bzip2/lz4/zstd)")
+    if raw_size == 0:
+        return b''
+    raise ValueError("PBF blob has no data")
+
+def check_header_block(blob: bytes):
+    """ Raises ValueError if the file requires features this reader does not implement. """
+    for field, value in _iter_fields(_decompress_blob(blob)):
+        if field == 4:
+            feature = bytes(value).decode('utf-8')
+            if feature not in SUPPORTED_FEATURES:
+                raise ValueError(f"Unsupported PBF feature: {feature}")
+
+# --- PrimitiveBlock ---
+
+def _tags(keys: list[int], vals: list[int], strings: list[str]) -> dict:
+    if not keys:
+        return _NO_TAGS
+    return {strings[k]: strings[v] for k, v in zip(keys, vals)}
+
+def decode_primitive_block(blob: bytes) -> tuple[list, list, list]:
+    """
+    Decodes one OSMData blob into plain Python tuples, in block order:
+        nodes:     (id, lat, lon, tags)
+        ways:      (id, [node refs], tags)
+        relations: (id, [(member type, ref, role)], tags)
+    IDs and refs are strings (as in the XML format), coordinates are degrees.
+    Top-level function so it can run in a worker process.
+    """
+    data = _decompress_blob(blob)
+
+    strings: list[str] = []
+    groups = []
+    granularity, lat_offset, lon_offset = 100, 0, 0
+    for field, value in _iter_fields(data):
+        if field == 1:
+            strings = [bytes(s).decode('utf-8') for f, s in _iter_fields(value) if f == 1]
+        elif field == 2:
+            groups.append(value)
+        elif field == 17:
+            granularity = value
+        elif field == 19:
+            lat_offset = _int64(value)
+        elif field == 20:
+            lon_offset = _int64(value)
+
+    # Integer nanodegrees divided once: gives the same float as parsing the XML decimal string
+    def to_degrees(offset, raw):
+        return (offset + granularity * raw) / 1e9
+
+    nodes, ways, relations = [], [], []
+    for group in groups:
+        for field, value in _iter_fields(group):
+            if field == 1:
+                nodes.append(_decode_node(value, strings, to_degrees, lat_offset, lon_offset))
+            elif field == 2:
+                _decode_dense_nodes(value, strings, to_degrees, lat_offset, lon_offset, nodes)
+            elif field == 3:
+                ways.append(_decode_way(value, strings))
+            elif field == 4:
+                relations.append(_decode_relation(value, strings))
+    return nodes, ways, relations
+
+def _decode_node(buf, strings, to_degrees, lat_offset, lon_offset):
+    node_id, lat, lon, keys, vals = 0, 0, 0, [], []
+    for field, value in _iter_fields(buf):
+        if field == 1: node_id = _zigzag(value)
+        elif field == 2: keys = _packed_varints(value)
+        elif field == 3: vals = _packed_varints(value)
+        elif field == 8: lat = _zigzag(value)
+        elif field == 9: lon = _zigzag(value)
+    return str(node_id), to_degrees(lat_offset, lat), to_degrees(lon_offset, lon), _tags(keys, vals, strings)
+
+def _decode_dense_nodes(buf, strings, to_degrees, lat_offset, lon_offset, out: list):
+    ids, lats, lons, keys_vals = [], [], [], []
+    for field, value in _iter_fields(buf):
+        if field == 1: ids = _delta_decode(_packed_varints(value))
+        elif field == 8: lats = _delta_decode(_packed_varints(value))
+        elif field == 9: lons = _delta_decode(_packed_varints(value))
+        elif field == 10: keys_vals = _packed_varints(value)
+
+    # keys_vals: k1 v1 k2 v2 0 | k1 v1 0 | 0 ... (one 0-terminated run per node, absent if no node has tags)
+    kv_pos = 0
+    for i, node_id in enumerate(ids):
+        tags = _NO_TAGS
+        if keys_vals:
+            if keys_vals[kv_pos] != 0:
+                tags = {}
+                while keys_vals[kv_pos] != 0:
+                    tags[strings[keys_vals[kv_pos]]] = strings[keys_vals[kv_pos + 1]]
+                    kv_pos += 2
+            kv_pos += 1
+        out.append((str(node_id), to_degrees(lat_offset, lats[i]), to_degrees(lon_offset, lons[i]), tags))
+
+def _decode_way(buf, strings):
+    way_id, keys, vals, refs = 0, [], [], []
+    for field, value in _iter_fields(buf):
+        if field == 1: way_id = _int64(value)
+        elif field == 2: keys = _packed_varints(value)
+        elif field == 3: vals = _packed_varints(value)
+        elif field == 8: refs = _delta_decode(_packed_varints(value))
+    return str(way_id), [str(r) for r in refs], _tags(keys, vals, strings)
+
+def _decode_relation(buf, strings):
+    rel_id, keys, vals, roles, memids, types = 0, [], [], [], [], []
+    for field, value in _iter_fields(buf):
+        if field == 1: rel_id = _int64(value)
+        elif field == 2: keys = _packed_varints(value)
+        elif field == 3: vals = _packed_varints(value)
+        elif field == 8: roles = _packed_varints(value)
+        elif field == 9: memids = _delta_decode(_packed_varints(value))
+        elif field == 10: types = _packed_varints(value)
+    members = [(MEMBER_TYPES[t], str(m), strings[r]) for t, m, r in zip(types, memids, roles)]
+    return str(rel_id), members, _tags(keys, vals, strings)
@@ -0,0 +1,120 @@
+import heapq
+import math
+from algorithms import _edge_cost
+from isochrone import nearest_node
+from models import Graph, POI
+from spatial import SpatialGrid
+from utils import haversine_distance
+
+# "Nearest shop along my route": POIs ranked by the detour they add to the active route.
+# POIs are snapped to their closest road node once (PoiIndex, attached as graph.poi_index) and grouped
+# by type. A query runs two bounded multi-source searches seeded with every route node, instead of
+# one A* per POI: forward, seeded with the route cost up to each node (cheapest start -> route -> POI),
+# and backward, seeded with the route cost from each node to the end (cheapest POI -> route -> end).
+# The detour of a POI is their sum minus the route cost, so leaving and rejoining points are chosen
+# together and the skipped part of the route is credited. Costs are a_star's traffic-aware edge costs
+# without turn penalties.
+
+class PoiIndex:
+    """
+    POIs snapped to the road network, by type.
+    by_type: type -> {node id -> [POI, ...]}; snap_distance: id(POI) -> metres from the POI to its node.
+    """
+    def __init__(self, graph: Graph, grid: SpatialGrid | None = None):
+        self.by_type: dict[str, dict[str, list[POI]]] = {}
+        self.snap_distance: dict[int, float] = {}
+        for poi in graph.pois:
+            node_id = nearest_node(graph, grid, poi.lat, poi.lon)
+            if node_id is None:
+                continue
+            node = graph.nodes[node_id]
+            self.by_type.setdefault(poi.type, {}).setdefault(node_id, []).append(poi)
+            self.snap_distance[id(poi)] = haversine_distance(poi.lat, poi.lon, node.lat, node.lon)
+
+    def types(self) -> list[str]:
+        """ POI types, most frequent first. """
+        counts = {t: sum(len(pois) for pois in nodes.values()) for t, nodes in self.by_type.items()}
+        return sorted(counts, key=lambda t: (-counts[t], t))
+
+class PoiMatch:
+    """ One ranked POI: detour cost, the road node it is snapped to, and where the detour leaves/rejoins the route. """
+    def __init__(self, poi: POI, node_id: str, detour: float, leave_index: int, rejoin_index: int):
+        self.poi = poi
+        self.node_id = node_id
+        self.detour = detour
+        self.leave_index = leave_index      # Position in the route path
+        self.rejoin_index = rejoin_index
+
+    def __repr__(self):
+        return f"PoiMatch({self.poi.name!r}, {self.poi.type}, +{self.detour:.0f})"
+
+def _route_search(graph: Graph, path: list[str], offsets: list[float], limit: float,
+                  backward: bool) -> dict[str, tuple[float, int]]:
+    """
+    Multi-source Dijkstra from all route nodes (into them if backward), path[i] starting at offsets[i]:
+    node -> (cost, route position of the winning seed). Nodes costing more than limit are not expanded.
+    """
+    best: dict[str, tuple[float, int]] = {}
+    for i, node_id in enumerate(path):
+        if offsets[i] < best.get(node_id, (float('infinity'),))[0]:
+            best[node_id] = (offsets[i], i)
+    pq = [(c, i, node_id) for node_id, (c, i) in best.items()]
+    heapq.heapify(pq)
+
+    while pq:
+        c, i, u = heapq.heappop(pq)
+        if c > best[u][0]: continue  # Lazy deletion
+        neighbours = graph.get_incoming(u) if backward else ((edge['to'], edge) for edge in graph.get_neighbors(u))
+        for v, edge in neighbours:
+            c_v = c + _edge_cost(edge)
+            if c_v <= limit and c_v < best.get(v, (float('infinity'),))[0]:
+                best[v] = (c_v, i)
+                heapq.heappush(pq, (c_v, i, v))
+    return best
+
+def pois_along_route(graph: Graph, path: list[str], poi_type: str, k: int = 5,
+                     max_detour: float = 3000.0) -> list[PoiMatch]:
+    """
+    The k POIs of poi_type with the smallest detour from path (at most max_detour).
+    Detour = min over leaving point i and rejoining point j of
+    route[0..i] + cost path[i] -> POI node + cost POI node -> path[j] + route[j..end] - whole route,
+    i.e. the extra cost of the trip (rejoining behind the leaving point pays for the repeated stretch).
+    Needs graph.poi_index (built here on first use, without a spatial grid).
+    """
+    if not path:
+        return []
+    if graph.poi_index is None:
+        graph.poi_index = PoiIndex(graph)
+    candidates = graph.poi_index.by_type.get(poi_type)
+    if not candidates:
+        return []
+
+    # Cumulative route cost. A blocked route edge counts at its length: the route is being replaced
+    # anyway, and an infinite offset would hide every detour around the block.
+    along = [0.0]
+    for u, v in zip(path, path[1:]):
+        edge = graph.get_edge(u, v)
+        cost = _edge_cost(edge) if edge is not None else float('infinity')
+        if not math.isfinite(cost):
+            cost = edge['base_weight'] if edge is not None else 0.0
+        along.append(along[-1] + cost)
+    total = along[-1]
+
+    # Both legs of a detour within max_detour cost at most total + max_detour including their offsets
+    # (detour = out + back - total). The bound is the same for every seed, so one label per node is enough.
+    limit = total + max_detour
+    to_poi = _route_search(graph, path, along, limit, backward=False)
+    from_poi = _route_search(graph, path, [total - a for a in along], limit, backward=True)
+
+    matches = []
+    for node_id, pois in candidates.items():
+        if node_id not in to_poi or node_id not in from_poi:
+            continue
+        (out_cost, leave), (back_cost, rejoin) = to_poi[node_id], from_poi[node_id]
+        detour = max(0.0, out_cost + back_cost - total)
+        if detour > max_detour:
+            continue
+        for poi in pois:
+            matches.append(PoiMatch(poi, node_id, detour, leave, rejoin))
+    matches.sort(key=lambda m: (m.detour, graph.poi_index.snap_distance.get(id(m.poi), 0.0)))
+    return matches[:k]
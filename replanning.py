@@ -0,0 +1,122 @@
+import heapq
+from algorithms import _edge_cost
+from models import Graph
+from utils import haversine_distance
+
+# Incremental replanning with D* Lite (Koenig & Likhachev 2002).
+# The search runs backwards from the goal and keeps its g/rhs tables between queries. When traffic
+# changes an edge, only the source node of that edge is re-evaluated, and the next query repairs
+# the distances that actually changed instead of searching the whole route again. Moving the start
+# (the car driving along the route) is handled by the key modifier km, without reordering the queue.
+#
+# Costs are a_star's traffic-aware edge costs (jams x5, blocked roads inf) without turn penalties,
+# which depend on the approach direction and do not fit a node-based incremental search.
+
+class DStarLite:
+    """
+    Shortest paths from a moving start to a fixed goal, repaired incrementally after edge changes.
+    Register edge_changed with TrafficSimulator.add_listener, call move_to when the start changes
+    and route() to get the current best path.
+    """
+    def __init__(self, graph: Graph, start_id: str, goal_id: str):
+        self.graph = graph
+        self.start = start_id
+        self.goal = goal_id
+        self.g: dict[str, float] = {}
+        self.rhs: dict[str, float] = {goal_id: 0.0}
+        self.km = 0.0
+        self.last_start = start_id
+        # Lazy-deletion heap: an entry (key, node) is current only if queued[node] == key
+        self.queue: list = []
+        self.queued: dict[str, tuple[float, float]] = {}
+        self.changed: set[str] = set()      # Sources of changed edges, re-evaluated on the next route()
+        self.expanded = 0                   # Total node expansions, for benchmarks
+
+        self._push(goal_id)
+
+    def _h(self, node_id: str) -> float:
+        """ Straight-line distance from the start to a node (admissible: no edge is shorter). """
+        a, b = self.graph.nodes[self.start], self.graph.nodes[node_id]
+        return haversine_distance(a.lat, a.lon, b.lat, b.lon)
+
+    def _key(self, node_id: str) -> tuple[float, float]:
+        m = min(self.g.get(node_id, float('infinity')), self.rhs.get(node_id, float('infinity')))
+        return (m + self._h(node_id) + self.km, m)
+
+    def _push(self, node_id: str):
+        key = self.queued[node_id] = self._key(node_id)
+        heapq.heappush(self.queue, (key, node_id))
+
+    def _update_node(self, node_id: str):
+        """ Recomputes rhs (one-step lookahead over the out-edges) and (re)queues the node if inconsistent. """
+        inf = float('infinity')
+        if node_id != self.goal:
+            g = self.g
+            self.rhs[node_id] = min((_edge_cost(edge) + g.get(edge['to'], inf)
+                                     for edge in self.graph.get_neighbors(node_id)), default=inf)
+        self.queued.pop(node_id, None)
+        if self.g.get(node_id, inf) != self.rhs.get(node_id, inf):
+            self._push(node_id)
+
+    def _compute(self):
+        inf = float('infinity')
+        g, rhs, queue, queued = self.g, self.rhs, self.queue, self.queued
+        while queue:
+            key, u = queue[0]
+            if queued.get(u) != key:
+                heapq.heappop(queue)  # Lazy deletion
+                continue
+            start_key = self._key(self.start)
+            if key >= start_key and rhs.get(self.start, inf) == g.get(self.start, inf):
+                break
+            heapq.heappop(queue)
+            new_key = self._key(u)
+            if key < new_key:
+                # Queued before km grew: reinsert with the current key
+                queued[u] = new_key
+                heapq.heappush(queue, (new_key, u))
+                continue
+            del queued[u]
+            self.expanded += 1
+            if g.get(u, inf) > rhs[u]:
+                g[u] = rhs[u]  # Overconsistent: settle
+                for p, _ in self.graph.get_incoming(u):
+                    self._update_node(p)
+            else:
+                g[u] = inf     # Underconsistent: the old distance got worse, re-derive it
+                self._update_node(u)
+                for p, _ in self.graph.get_incoming(u):
+                    self._update_node(p)
+
+    def edge_changed(self, edge):
+        """ TrafficSimulator listener: the cost of this edge changed. """
+        self.changed.add(self.graph.edge_source(edge))
+
+    def move_to(self, start_id: str):
+        """ Sets a new start (e.g. the next node of the car); the goal stays. """
+        self.start = start_id
+
+    def route(self) -> tuple[list[str], float]:
+        """ Best path from the current start to the goal and its cost ([] and inf if unreachable). """
+        if self.start != self.last_start:
+            # Keys of queued nodes were computed with the old start's heuristic
+            a, b = self.graph.nodes[self.last_start], self.graph.nodes[self.start]
+            self.km += haversine_distance(a.lat, a.lon, b.lat, b.lon)
+            self.last_start = self.start
+        for node_id in self.changed:
+            self._update_node(node_id)
+        self.changed.clear()
+        self._compute()
+
+        inf = float('infinity')
+        cost = self.g.get(self.start, inf)
+        if cost == inf:
+            return [], inf
+        # Follow the best successor (cost to it + its distance) down to the goal
+        path = [self.start]
+        node = self.start
+        while node != self.goal and len(path) <= len(self.graph.nodes):
+            best = min(self.graph.get_neighbors(node), key=lambda e: _edge_cost(e) + self.g.get(e['to'], inf))
+            node = best['to']
+            path.append(node)
+        return path, cost
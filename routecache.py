@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from algorithms import _edge_cost, edge_travel_time, MAX_SPEED
+from models import Graph
+from utils import haversine_distance
+
+# Route results keyed by (start, end, metric), where metric is the find_route algorithm name.
+# Traffic changes only evict what they can affect: a route that uses the changed edge (its cost
+# changed), or, when the edge got cheaper, a route that the edge's new cost could beat (straight-line
+# distance to the edge + edge cost + straight-line distance from it is below the cached cost).
+# The cache remembers the last cost it saw for every edge the simulator modified, so it can tell:
+# new or heavier jams and blocks only evict the routes driving through the edge.
+
+IMPROVEMENT_SCAN_LIMIT = 256    # Above this many entries, an edge getting cheaper flushes the cache instead
+
+class RouteCache:
+    """
+    LRU cache in front of algorithms.find_route (attach it as graph.route_cache).
+    Register it with a TrafficSimulator through attach(); counters: hits, misses,
+    evictions (LRU capacity), invalidations (traffic) and flushes (reset_all).
+    """
+    def __init__(self, graph: Graph, capacity: int = 1024):
+        self.graph = graph
+        self.capacity = capacity
+        self.entries: OrderedDict = OrderedDict()           # (start, end, metric) -> (path, cost)
+        self.by_edge: dict[tuple[str, str], set] = {}       # (u, v) -> keys of the routes using u->v
+        self.simulator = None
+        self.version = 0                                    # Traffic version the entries are valid for
+        self.known_costs: dict[tuple[str, str], tuple[float, float]] = {}  # (u, v) -> last (cost, time) seen
+        self.hits = self.misses = self.evictions = self.invalidations = self.flushes = 0
+
+    def attach(self, simulator):
+        """ Keeps the cache in sync with a TrafficSimulator. """
+        self.simulator = simulator
+        self.version = simulator.version
+        self._record_modified()
+        simulator.add_listener(self.edge_changed)
+        simulator.add_reset_listener(self.clear)
+
+    def _record_modified(self):
+        """ Current cost of every edge the simulator has modified (all others are at their base cost). """
+        self.known_costs.clear()
+        for a, b in self.simulator.affected_edges:
+            for u, v in ((a, b), (b, a)):
+                edge = self.graph.get_edge(u, v)
+                if edge is not None:
+                    self.known_costs[(u, v)] = (_edge_cost(edge), edge_travel_time(edge))
+
+    def get(self, start_id: str, end_id: str, metric: str) -> tuple[list[str], float] | None:
+        """ Cached (path, cost), or None. """
+        if self.simulator is not None and self.simulator.version != self.version:
+            # Traffic changed without notifying us (e.g. edits before attach): nothing is trustworthy
+            self.clear()
+            self._record_modified()
+            self.version = self.simulator.version
+        entry = self.entries.get((start_id, end_id, metric))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end((start_id, end_id, metric))
+        self.hits += 1
+        return list(entry[0]), entry[1]
+
+    def put(self, start_id: str, end_id: str, metric: str, path: list[str], cost: float):
+        key = (start_id, end_id, metric)
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (list(path), cost)
+        for u, v in zip(path, path[1:]):
+            self.by_edge.setdefault((u, v), set()).add(key)
+        while len(self.entries) > self.capacity:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        path, _ = self.entries.pop(key)
+        for u, v in zip(path, path[1:]):
+            keys = self.by_edge.get((u, v))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_edge[(u, v)]
+
+    def _lower_bound(self, key, u: str, v: str, edge_cost: float) -> float:
+        """ Cheapest conceivable cost of route `key` through the edge u->v. """
+        start_id, end_id, metric = key
+        nodes = self.graph.nodes
+        s, a, b, t = nodes[start_id], nodes[u], nodes[v], nodes[end_id]
+        straight = haversine_distance(s.lat, s.lon, a.lat, a.lon) + haversine_distance(b.lat, b.lon, t.lat, t.lon)
+        return edge_cost + (straight / MAX_SPEED if metric == 'time' else straight)
+
+    def edge_changed(self, edge):
+        """ TrafficSimulator listener: evicts the routes this edge change can affect. """
+        u, v = self.graph.edge_source(edge), edge['to']
+        cost, time = _edge_cost(edge), edge_travel_time(edge)
+        # Edges the simulator never touched were at their base cost, the cheapest they get
+        previous = self.known_costs.get((u, v))
+        self.known_costs[(u, v)] = (cost, time)
+        # (A jam applied again changes nothing)
+        stale = set(self.by_edge.get((u, v), ())) if previous != (cost, time) else set()
+        if previous is not None and (cost < previous[0] or time < previous[1]):
+            # Cheaper than before (reset, lighter jam): routes it could now improve
+            if len(self.entries) > IMPROVEMENT_SCAN_LIMIT:
+                self.clear()
+                stale = set()
+            for key, (_, cached_cost) in self.entries.items():
+                if key not in stale and self._lower_bound(key, u, v, time if key[2] == 'time' else cost) < cached_cost:
+                    stale.add(key)
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        if self.simulator is not None:
+            self.version = self.simulator.version
+
+    def clear(self):
+        """ Bulk flush (reset_all, or an edge getting cheaper while more than IMPROVEMENT_SCAN_LIMIT routes are cached). """
+        if self.entries:
+            self.flushes += 1
+        self.entries.clear()
+        self.by_edge.clear()
+
+    def counters(self) -> dict:
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions, 'invalidations': self.invalidations, 'flushes': self.flushes,
+                'size': len(self.entries), 'version': self.version}
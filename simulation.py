@@ -5,6 +5,25 @@ class TrafficSimulator:
         self.graph = graph
         # Track changed edges to allow resetting
         self.affected_edges = set() 
+        # Called with every edge whose weight/status changed (e.g. TravelTimes.edge_changed)
+        self.listeners = []
+        # Called once at the start of reset_all, before the per-edge notifications (e.g. RouteCache.clear)
+        self.reset_listeners = []
+        # Traffic version: bumped on every change of an edge's weight or status
+        self.version = 0
+
+    def add_listener(self, callback):
+        """ Registers callback(edge), called after each change of an edge's weight or status. """
+        self.listeners.append(callback)
+
+    def add_reset_listener(self, callback):
+        """ Registers callback(), called when reset_all starts restoring every modified road. """
+        self.reset_listeners.append(callback)
+
+    def _notify(self, edge):
+        self.version += 1
+        for callback in self.listeners:
+            callback(edge)
 
     def apply_jam(self, u, v, factor=5.0):
         """ Slows down traffic on the edge between u and v by a given factor. """
@@ -19,6 +38,8 @@ class TrafficSimulator:
     def reset_all(self):
         """ Resets all modified roads to their original state. """
         print("Resetting traffic...")
+        for callback in self.reset_listeners:
+            callback()
         for u, v in self.affected_edges:
             # Restore original weights
             self._reset_edge(u, v)
@@ -27,32 +48,20 @@ class TrafficSimulator:
 
     def _update_edge(self, u, v, factor_multiplier=1.0, is_blocked=False):
         """ Internal helper to update edge weight. """
-        if u in self.graph.edges:
-            for edge in self.graph.edges[u]:
-                if edge['to'] == v:
-                    if is_blocked:
-                        edge['weight'] = float('infinity')
-                        edge['status'] = 'blocked' # For visualization
-                    else:
-                        edge['weight'] = edge['base_weight'] * factor_multiplier
-                        edge['status'] = 'jammed'
-                    break
-        
-        # Update reverse direction if it exists (bidirectional graph)
-        if v in self.graph.edges:
-            for edge in self.graph.edges[v]:
-                if edge['to'] == u:
-                    if is_blocked:
-                        edge['weight'] = float('infinity')
-                        edge['status'] = 'blocked'
-                    else:
-                        edge['weight'] = edge['base_weight'] * factor_multiplier
-                        edge['status'] = 'jammed'
-                    break
+        # Both directions if the reverse exists (bidirectional graph)
+        for edge in (self.graph.get_edge(u, v), self.graph.get_edge(v, u)):
+            if edge is None: continue
+            if is_blocked:
+                edge['weight'] = float('infinity')
+                edge['status'] = 'blocked' # For visualization
+            else:
+                edge['weight'] = edge['base_weight'] * factor_multiplier
+                edge['status'] = 'jammed'
+            self._notify(edge)
 
     def _reset_edge(self, u, v):
-        if u in self.graph.edges:
-            for edge in self.graph.edges[u]:
-                if edge['to'] == v:
-                    edge['weight'] = edge['base_weight']
-                    edge.pop('status', None) # Remove status
\ No newline at end of file
+        edge = self.graph.get_edge(u, v)
+        if edge is not None:
+            edge['weight'] = edge['base_weight']
+            edge.pop('status', None) # Remove status
+            self._notify(edge)
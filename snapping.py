@@ -0,0 +1,237 @@
+import math
+from collections import ChainMap
+from algorithms import find_route, edge_travel_time
+from models import Graph, Node
+from spatial import SpatialGrid
+from traveltime import TravelTimes
+
+# Snapping arbitrary coordinates onto the road network.
+# snap_to_road projects a point onto the closest edge polyline, looking only at the spatial grid cells
+# around it (widening the search until the answer is certain). With a SnapGrid (cells sized for a few
+# edges each) its cost depends on the local road density, not on the map size.
+# VirtualGraph then routes from/to such mid-edge positions: each snap point becomes a temporary node
+# that splits its edge (both directions of a two-way road) into weighted pieces. The pieces live in
+# overlay dicts (ChainMaps combined with the graph's own tables), so the graph itself is never modified.
+
+EARTH_RADIUS = 6371000
+METERS_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+EDGES_PER_CELL = 2      # SnapGrid resolution target
+
+class SnapPoint:
+    """ Closest point on the road network: edge u->v, fraction of its length from u, position, distance (m) from the query. """
+    def __init__(self, u: str, v: str, fraction: float, lat: float, lon: float, distance: float):
+        self.u = u
+        self.v = v
+        self.fraction = fraction
+        self.lat = lat
+        self.lon = lon
+        self.distance = distance
+
+    def nearest_node(self) -> str:
+        """ Edge endpoint closest to the snap point (along the edge). """
+        return self.u if self.fraction <= 0.5 else self.v
+
+    def __repr__(self):
+        return f"SnapPoint({self.u}->{self.v} at {self.fraction:.2f}, {self.distance:.1f} m off)"
+
+def _polyline(graph: Graph, u: str, v: str, edge) -> list[tuple[float, float]]:
+    a, b = graph.nodes[u], graph.nodes[v]
+    return [(a.lat, a.lon), *edge.get('geometry', ()), (b.lat, b.lon)]
+
+def _lengths(points: list[tuple[float, float]]) -> list[float]:
+    """ Cumulative length (m) at every polyline point, in a local flat projection. """
+    cos_lat = math.cos(math.radians(points[0][0]))
+    cumulative = [0.0]
+    for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+        dx = (lon2 - lon1) * cos_lat * METERS_PER_DEGREE
+        dy = (lat2 - lat1) * METERS_PER_DEGREE
+        cumulative.append(cumulative[-1] + math.hypot(dx, dy))
+    return cumulative
+
+class SnapGrid(SpatialGrid):
+    """
+    SpatialGrid for snapping: about EDGES_PER_CELL roads per cell whatever the map size, and every road
+    listed in all cells its segments cross (SpatialGrid only uses the cells of its points, which misses
+    long segments once cells are small). One direction per two-way road.
+    """
+    def __init__(self, graph: Graph):
+        edge_count = sum(len(edges) for edges in graph.edges.values())
+        side = max(50, math.ceil(math.sqrt(edge_count / EDGES_PER_CELL)))  # At least the SpatialGrid default
+        super().__init__(graph, side, side)
+
+    def build(self):
+        print("Building snapping grid...")
+        count = 0
+        for u_id, edges in self.graph.edges.items():
+            for edge in edges:
+                v_id = edge['to']
+                if v_id < u_id and self.graph.get_edge(v_id, u_id) is not None: continue
+                points = _polyline(self.graph, u_id, v_id, edge)
+                cells = {}
+                for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+                    # Cells of the segment's bounding box
+                    r1, c1 = self._get_cell(min(lat1, lat2), min(lon1, lon2))
+                    r2, c2 = self._get_cell(max(lat1, lat2), max(lon1, lon2))
+                    for r in range(r1, r2 + 1):
+                        for c in range(c1, c2 + 1):
+                            cells[(r, c)] = None
+                key = (u_id, v_id)
+                for cell in cells:
+                    self.grid.setdefault(cell, []).append(key)
+                count += 1
+        print(f"Snapping grid {self.rows}x{self.cols} built with {count} roads.")
+
+def _project(graph: Graph, u: str, v: str, edge, lat: float, lon: float, cos_lat: float) -> SnapPoint:
+    """ Closest point to (lat, lon) on the polyline of edge u->v, in metres relative to the query point. """
+    points = _polyline(graph, u, v, edge)
+    total = 0.0
+    best = None
+    for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+        x1, y1 = (lon1 - lon) * cos_lat * METERS_PER_DEGREE, (lat1 - lat) * METERS_PER_DEGREE
+        x2, y2 = (lon2 - lon) * cos_lat * METERS_PER_DEGREE, (lat2 - lat) * METERS_PER_DEGREE
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        t = 0.0 if length == 0 else max(0.0, min(1.0, -(x1 * dx + y1 * dy) / (length * length)))
+        distance = math.hypot(x1 + t * dx, y1 + t * dy)
+        if best is None or distance < best[0]:
+            best = (distance, total + t * length, lat1 + t * (lat2 - lat1), lon1 + t * (lon2 - lon1))
+        total += length
+    distance, covered, p_lat, p_lon = best
+    return SnapPoint(u, v, covered / total if total > 0 else 0.0, p_lat, p_lon, distance)
+
+def snap_to_road(graph: Graph, grid: SpatialGrid, lat: float, lon: float) -> SnapPoint | None:
+    """
+    Projection of (lat, lon) onto the nearest edge (None if the graph has none).
+    Searches the grid cells within k cells of the point, doubling k until the best projection is
+    closer than the searched area's edge. Any SpatialGrid works; with a SnapGrid the result is exact
+    and the cost depends on the local road density, not on the map size.
+    """
+    cos_lat = math.cos(math.radians(lat))
+    cell_size = min(grid.lat_step * METERS_PER_DEGREE, grid.lon_step * cos_lat * METERS_PER_DEGREE)
+    best = None
+    seen = set()
+    k = 1
+    while True:
+        for u, v in grid.query_bbox(lat - k * grid.lat_step, lat + k * grid.lat_step,
+                                    lon - k * grid.lon_step, lon + k * grid.lon_step):
+            if (u, v) in seen or (v, u) in seen: continue  # Both directions of a road share the polyline
+            seen.add((u, v))
+            edge = graph.get_edge(u, v)
+            if edge is None: continue
+            snap = _project(graph, u, v, edge, lat, lon, cos_lat)
+            if best is None or snap.distance < best.distance:
+                best = snap
+        if (best is not None and best.distance <= k * cell_size) or k >= max(grid.rows, grid.cols):
+            return best
+        k *= 2
+
+class _VirtualTravelTimes(TravelTimes):
+    """ Travel times of a VirtualGraph: the graph's array plus the split edge pieces. """
+    def __init__(self, times, extra: dict[int, float]):
+        self.times = _TimesView(times, extra)
+
+class _TimesView:
+    def __init__(self, times, extra: dict[int, float]):
+        self.base = times
+        self.extra = extra
+
+    def __getitem__(self, edge_id: int) -> float:
+        value = self.extra.get(edge_id)
+        return self.base[edge_id] if value is None else value
+
+class VirtualGraph:
+    """
+    Read-only view of a graph with one temporary node per snap point ("snap:0", "snap:1", ...).
+    Supports what point-to-point search needs (nodes, get_neighbors, get_edge, get_incoming, travel_times).
+    """
+    def __init__(self, graph: Graph, snaps: list[SnapPoint]):
+        self.graph = graph
+        self.snap_ids = [f"snap:{i}" for i in range(len(snaps))]
+        virtual_nodes = {node_id: Node(node_id, s.lat, s.lon) for node_id, s in zip(self.snap_ids, snaps)}
+        self.nodes = ChainMap(graph.nodes, virtual_nodes)     # Real IDs first: most lookups hit them
+
+        # Overlay adjacency. Real nodes keep their own edges (the unsplit edge stays drivable end to end)
+        self.out_edges: dict[str, list] = {}
+        self.in_edges: dict[str, list] = {}         # Pieces entering each node, for get_incoming
+        self.lookup: dict[tuple[str, str], dict] = {}
+        self.sources: dict[int, str] = {}
+        self.next_id = len(graph.edge_list) if isinstance(graph, Graph) else len(graph.targets)
+        extra_times = {}
+
+        # Snap points per road (both directions share the fractions, measured from the smaller node ID)
+        roads: dict[tuple[str, str], list[tuple[float, str]]] = {}
+        for node_id, s in zip(self.snap_ids, snaps):
+            a, b = min(s.u, s.v), max(s.u, s.v)
+            roads.setdefault((a, b), []).append((s.fraction if s.u == a else 1.0 - s.fraction, node_id))
+
+        for (a, b), cuts in roads.items():
+            for x, y, forward in ((a, b, True), (b, a, False)):
+                edge = graph.get_edge(x, y)
+                if edge is None: continue
+                points = _polyline(graph, x, y, edge)
+                cumulative = _lengths(points)
+                total = cumulative[-1] or 1.0
+                stops = sorted((f if forward else 1.0 - f, node_id) for f, node_id in cuts)
+                stops = [(0.0, x)] + stops + [(1.0, y)]
+                for (f1, start), (f2, end) in zip(stops, stops[1:]):
+                    shape = [p for p, c in zip(points[1:-1], cumulative[1:-1]) if f1 * total < c < f2 * total]
+                    piece = self._add_piece(start, end, edge, f2 - f1, shape)
+                    if graph.travel_times is not None:
+                        extra_times[piece['id']] = edge_travel_time(piece)
+
+        self.edges = ChainMap(self.out_edges, graph.edges)
+        self.travel_times = _VirtualTravelTimes(graph.travel_times.times, extra_times) \
+            if graph.travel_times is not None else None
+        self.pois = graph.pois
+        self.restrictions = graph.restrictions
+        # Preprocessed tables do not know the virtual nodes
+        self.hierarchy = self.landmarks = self.turn_table = None
+        self.route_cache = self.poi_index = None
+
+    def _add_piece(self, start: str, end: str, edge, share: float, shape: list) -> dict:
+        """ Piece of `edge` covering `share` of its length, from start to end. """
+        # (share 0 happens for snaps on an endpoint; 0 * inf would be NaN on blocked roads, whose status counts anyway)
+        piece = {'to': end, 'weight': edge['weight'] * share if share > 0 else 0.0,
+                 'base_weight': edge['base_weight'] * share,
+                 'type': edge['type'], 'name': edge['name'], 'id': self.next_id}
+        if shape:
+            piece['geometry'] = shape
+        if edge.get('status'):
+            piece['status'] = edge['status']
+        self.next_id += 1
+        if start not in self.out_edges:
+            self.out_edges[start] = list(self.graph.get_neighbors(start)) if start in self.graph.nodes else []
+        self.out_edges[start].append(piece)
+        self.in_edges.setdefault(end, []).append((start, piece))
+        self.lookup.setdefault((start, end), piece)
+        self.sources[piece['id']] = start
+        return piece
+
+    def get_neighbors(self, node_id: str) -> list:
+        edges = self.out_edges.get(node_id)
+        return edges if edges is not None else self.graph.get_neighbors(node_id)
+
+    def get_edge(self, u: str, v: str):
+        return self.lookup.get((u, v)) or self.graph.get_edge(u, v)
+
+    def get_incoming(self, node_id: str) -> list:
+        incoming = self.in_edges.get(node_id, [])
+        if node_id in self.graph.nodes:
+            return list(self.graph.get_incoming(node_id)) + incoming
+        return incoming
+
+    def edge_source(self, edge) -> str:
+        return self.sources.get(edge['id']) or self.graph.edge_source(edge)
+
+def route_between(graph: Graph, start: SnapPoint, end: SnapPoint,
+                  algorithm: str = 'astar') -> tuple[list[str], float, VirtualGraph]:
+    """
+    Route from one snap point to another through temporary nodes "snap:0" (start) and "snap:1" (end).
+    Returns (path, cost, view); path may start/end with the virtual IDs, so resolve nodes through view.
+    Algorithms that need preprocessed tables (ch, alt, edge) fall back to A*.
+    """
+    view = VirtualGraph(graph, [start, end])
+    if algorithm in ('ch', 'alt', 'edge'):
+        algorithm = 'astar'
+    path, cost = find_route(view, view.snap_ids[0], view.snap_ids[1], algorithm)
+    return path, cost, view
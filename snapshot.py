@@ -0,0 +1,332 @@
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from compact import CompactGraph
+from models import Graph, POI, StringTable, TurnRestriction
+from parser import contract_degree2_chains
+from spatial import SpatialGrid
+
+# Binary snapshot of a processed Graph (after parsing and component pruning).
+# Layout: header | section directory | 8-byte aligned sections.
+# Numeric sections are raw native-endian arrays, read zero-copy from a memory map.
+# String tables are UTF-8 blobs joined by NUL (OSM XML cannot contain NUL characters).
+
+SNAPSHOT_MAGIC = b'RMSNAP\x00\x01'
+SNAPSHOT_VERSION = 3
+
+_HEADER = struct.Struct('<8sIB3xQqI')   # magic, version, little_endian, source size, source mtime_ns, section count
+_SECTION = struct.Struct('<16sc7xQQ')   # name, array typecode, offset, byte length
+
+def _source_fingerprint(source_path: str) -> tuple[int, int]:
+    """ (size, mtime_ns) of the source map file. Any rewrite of the file changes it. """
+    st = os.stat(source_path)
+    return st.st_size, st.st_mtime_ns
+
+def _string_table(strings: list[str]) -> bytes:
+    return '\0'.join(strings).encode('utf-8')
+
+def _read_string_table(blob) -> list[str]:
+    if len(blob) == 0: return []
+    return bytes(blob).decode('utf-8').split('\0')
+
+def save_snapshot(graph: Graph, path: str, source_path: str, grid: SpatialGrid | None = None):
+    """
+    Writes the graph (and optionally the spatial grid buckets) to a binary snapshot file.
+    The snapshot is bound to the current size/mtime of source_path.
+    """
+    start_time = time.perf_counter()
+
+    node_ids = list(graph.nodes.keys())
+    index = {nid: i for i, nid in enumerate(node_ids)}
+
+    # Coordinates
+    lats = array('d', (graph.nodes[nid].lat for nid in node_ids))
+    lons = array('d', (graph.nodes[nid].lon for nid in node_ids))
+
+    # Adjacency (CSR) with per-edge attributes
+    types, names = StringTable(), StringTable()
+
+    offsets = array('q', [0])
+    targets = array('i')
+    weights = array('d')
+    edge_types = array('H')
+    edge_names = array('i')
+    # Shape points of polyline edges (contracted chains), CSR per edge
+    geom_offsets = array('q', [0])
+    geom_lats, geom_lons = array('d'), array('d')
+    for nid in node_ids:
+        for edge in graph.edges.get(nid, []):
+            targets.append(index[edge['to']])
+            weights.append(edge['base_weight'])
+            edge_types.append(types.code(edge['type']))
+            edge_names.append(names.code(edge['name']))
+            for lat, lon in edge.get('geometry', ()):
+                geom_lats.append(lat)
+                geom_lons.append(lon)
+            geom_offsets.append(len(geom_lats))
+        offsets.append(len(targets))
+
+    # POIs
+    poi_lats = array('d', (p.lat for p in graph.pois))
+    poi_lons = array('d', (p.lon for p in graph.pois))
+    poi_types = array('i', (names.code(p.type) for p in graph.pois))
+    poi_names = array('i', (names.code(p.name) for p in graph.pois))
+
+    # Street index (name -> node list). Entries may point to pruned nodes, keep them as strings.
+    street_keys = list(graph.street_index.keys())
+    street_offsets = array('q', [0])
+    street_nodes = []
+    for key in street_keys:
+        street_nodes.extend(graph.street_index[key])
+        street_offsets.append(len(street_nodes))
+
+    # Turn restrictions as node index triples
+    restriction_nodes = array('i')
+    restriction_only = array('B')
+    for r in graph.restrictions:
+        restriction_nodes.extend((index[r.from_id], index[r.via_id], index[r.to_id]))
+        restriction_only.append(r.kind == 'only')
+
+    sections = {
+        'node_ids': ('B', _string_table(node_ids)),
+        'lat': lats, 'lon': lons,
+        'offsets': offsets, 'targets': targets, 'weights': weights,
+        'edge_types': edge_types, 'edge_names': edge_names,
+        'geom_offsets': geom_offsets, 'geom_lat': geom_lats, 'geom_lon': geom_lons,
+        'types': ('B', _string_table(types.strings)),
+        'names': ('B', _string_table(names.strings)),
+        'poi_lat': poi_lats, 'poi_lon': poi_lons,
+        'poi_types': poi_types, 'poi_names': poi_names,
+        'street_keys': ('B', _string_table(street_keys)),
+        'street_offsets': street_offsets,
+        'street_nodes': ('B', _string_table(street_nodes)),
+        'restr_nodes': restriction_nodes,
+        'restr_only': restriction_only,
+    }
+
+    if grid is not None:
+        cells = sorted(grid.grid.keys())
+        grid_offsets = array('q', [0])
+        grid_u, grid_v = array('i'), array('i')
+        for cell in cells:
+            for u_id, v_id in grid.grid[cell]:
+                grid_u.append(index[u_id])
+                grid_v.append(index[v_id])
+            grid_offsets.append(len(grid_u))
+        sections['grid_dims'] = array('q', [grid.rows, grid.cols])
+        sections['grid_cells'] = array('q', (r * grid.cols + c for r, c in cells))
+        sections['grid_offsets'] = grid_offsets
+        sections['grid_u'] = grid_u
+        sections['grid_v'] = grid_v
+
+    write_sections(path, sections, source_path)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Snapshot written to {path} ({os.path.getsize(path) / 1024:.0f} KB) in {elapsed:.2f}s.")
+
+def write_sections(path: str, sections: dict, source_path: str,
+                   magic: bytes = SNAPSHOT_MAGIC, version: int = SNAPSHOT_VERSION):
+    """
+    Writes named sections (arrays, or (typecode, bytes) pairs) in the snapshot container format,
+    bound to the current size/mtime of source_path. Also used for other per-map files (see ch.py).
+    """
+    source_size, source_mtime_ns = _source_fingerprint(source_path)
+    payloads = []
+    for name, data in sections.items():
+        if isinstance(data, array):
+            typecode, raw = data.typecode, data.tobytes()
+        else:
+            typecode, raw = data
+        payloads.append((name, typecode, raw))
+
+    offset = _HEADER.size + _SECTION.size * len(payloads)
+    directory = []
+    for name, typecode, raw in payloads:
+        offset += -offset % 8  # Align every section to 8 bytes
+        directory.append((name, typecode, offset, len(raw)))
+        offset += len(raw)
+
+    # Write to a temporary file first so a crash never leaves a half-written snapshot
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(magic, version, sys.byteorder == 'little',
+                             source_size, source_mtime_ns, len(payloads)))
+        for name, typecode, off, length in directory:
+            f.write(_SECTION.pack(name.encode('ascii'), typecode.encode('ascii'), off, length))
+        for (name, typecode, raw), (_, _, off, _) in zip(payloads, directory):
+            f.write(b'\0' * (off - f.tell()))
+            f.write(raw)
+    os.replace(tmp_path, path)
+
+def open_sections(path: str, source_path: str, magic: bytes = SNAPSHOT_MAGIC,
+                  version: int = SNAPSHOT_VERSION) -> tuple[mmap.mmap, dict] | None:
+    """
+    Maps a file written by write_sections and returns zero-copy views of its sections, or None if stale/invalid.
+    Release the views with close_sections.
+    """
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mm) < _HEADER.size:
+        mm.close()
+        return None
+
+    file_magic, file_version, little_endian, size, mtime_ns, count = _HEADER.unpack_from(mm, 0)
+    if (file_magic != magic or file_version != version
+            or bool(little_endian) != (sys.byteorder == 'little')
+            or (size, mtime_ns) != _source_fingerprint(source_path)):
+        mm.close()
+        return None
+
+    view = memoryview(mm)
+    sections = {}
+    for i in range(count):
+        name, typecode, off, length = _SECTION.unpack_from(mm, _HEADER.size + i * _SECTION.size)
+        raw = view[off:off + length]
+        typecode = typecode.decode('ascii')
+        sections[name.rstrip(b'\0').decode('ascii')] = raw if typecode == 'B' else raw.cast(typecode)
+    return mm, sections
+
+def close_sections(mm: mmap.mmap, sections: dict):
+    # Release the section views before unmapping
+    for section in sections.values():
+        section.release()
+    mm.close()
+
+def _copy_section(section) -> array:
+    """ Writable array copy of a mapped numeric section (one memcpy, no per-element objects). """
+    copy = array(section.format)
+    with section.cast('B') as raw:
+        copy.frombytes(raw)
+    return copy
+
+def _graph_from_sections(s: dict, node_ids: list[str], types: list[str], names: list[str]) -> Graph:
+    graph = Graph()
+    lats, lons = s['lat'], s['lon']
+    for i, nid in enumerate(node_ids):
+        graph.add_node(nid, lats[i], lons[i])
+
+    offsets, targets, weights = s['offsets'], s['targets'], s['weights']
+    edge_types, edge_names = s['edge_types'], s['edge_names']
+    geom_offsets, geom_lats, geom_lons = s['geom_offsets'], s['geom_lat'], s['geom_lon']
+    for i, u in enumerate(node_ids):
+        for k in range(offsets[i], offsets[i + 1]):
+            g0, g1 = geom_offsets[k], geom_offsets[k + 1]
+            geometry = list(zip(geom_lats[g0:g1], geom_lons[g0:g1])) if g1 > g0 else None
+            graph.add_edge(u, node_ids[targets[k]], weights[k], types[edge_types[k]], names[edge_names[k]],
+                           geometry)
+    return graph
+
+def _compact_from_sections(s: dict, node_ids: list[str], types: list[str], names: list[str]) -> CompactGraph:
+    """ CompactGraph straight from the CSR sections: the arrays are copied whole, no per-edge objects. """
+    cg = CompactGraph()
+    cg.node_ids = node_ids
+    cg.index = dict(zip(node_ids, range(len(node_ids))))
+    cg.lats, cg.lons = _copy_section(s['lat']), _copy_section(s['lon'])
+    cg.offsets, cg.targets = _copy_section(s['offsets']), _copy_section(s['targets'])
+    cg.weights, cg.base_weights = _copy_section(s['weights']), _copy_section(s['weights'])
+    cg.status = array('B', bytes(len(cg.targets)))
+    cg.type_codes, cg.name_codes = _copy_section(s['edge_types']), _copy_section(s['edge_names'])
+    cg.geom_offsets = _copy_section(s['geom_offsets'])
+    cg.geom_lats, cg.geom_lons = _copy_section(s['geom_lat']), _copy_section(s['geom_lon'])
+    cg.road_types, cg.names = types, names
+    return cg
+
+def load_snapshot(path: str, source_path: str, compact: bool = False) -> tuple[Graph, SpatialGrid | None] | None:
+    """
+    Loads a graph snapshot via memory-mapping.
+    Returns (graph, grid) - grid is None if the snapshot has no buckets -
+    or None if the snapshot is missing or no longer matches source_path.
+    With compact set, graph is a CompactGraph built directly from the mapped arrays (much faster than a Graph).
+    """
+    if not os.path.exists(path) or not os.path.exists(source_path):
+        return None
+
+    start_time = time.perf_counter()
+    try:
+        opened = open_sections(path, source_path)
+    except (OSError, ValueError, struct.error):
+        return None
+    if opened is None:
+        print(f"Snapshot {path} is stale, ignoring it.")
+        return None
+    mm, s = opened
+
+    try:
+        node_ids = _read_string_table(s['node_ids'])
+        types = _read_string_table(s['types'])
+        names = _read_string_table(s['names'])
+        build = _compact_from_sections if compact else _graph_from_sections
+        graph = build(s, node_ids, types, names)
+        # The string tables already hold one copy per string; only the dict Graph interns them again
+        intern_name, intern_id = (str, str) if compact else (graph.intern_name, graph.intern_id)
+
+        poi_lats, poi_lons = s['poi_lat'], s['poi_lon']
+        poi_types, poi_names = s['poi_types'], s['poi_names']
+        for i in range(len(poi_lats)):
+            graph.pois.append(POI(poi_lats[i], poi_lons[i], intern_name(names[poi_types[i]]),
+                                  intern_name(names[poi_names[i]])))
+
+        street_keys = _read_string_table(s['street_keys'])
+        street_nodes = _read_string_table(s['street_nodes'])
+        street_offsets = s['street_offsets']
+        for i, key in enumerate(street_keys):
+            graph.street_index[intern_name(key)] = [intern_id(n) for n in
+                                                          street_nodes[street_offsets[i]:street_offsets[i + 1]]]
+
+        restriction_nodes, restriction_only = s['restr_nodes'], s['restr_only']
+        for i, only in enumerate(restriction_only):
+            p, v, q = restriction_nodes[3 * i:3 * i + 3]
+            graph.restrictions.append(TurnRestriction(node_ids[p], node_ids[v], node_ids[q], 'only' if only else 'no'))
+
+        grid = None
+        if 'grid_dims' in s and node_ids:
+            rows, cols = s['grid_dims']
+            cells, grid_offsets = s['grid_cells'], s['grid_offsets']
+            grid_u, grid_v = s['grid_u'], s['grid_v']
+            buckets = {}
+            for i, key in enumerate(cells):
+                buckets[divmod(key, cols)] = [(node_ids[grid_u[k]], node_ids[grid_v[k]])
+                                              for k in range(grid_offsets[i], grid_offsets[i + 1])]
+            grid = SpatialGrid(graph, rows, cols, buckets=buckets)
+    finally:
+        close_sections(mm, s)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Loaded snapshot {path}: {len(graph.nodes)} nodes{' (compact)' if compact else ''} in {elapsed:.3f}s.")
+    return graph, grid
+
+def load_graph_cached(osm_path: str, loader, snapshot_path: str | None = None, with_grid: bool = True,
+                      simplify: bool = False, compact: bool = False):
+    """
+    Returns (graph, grid) for osm_path, from its snapshot if it is up to date.
+    Otherwise runs `loader` on the source file (plus contract_degree2_chains if simplify is set)
+    and (re)writes the snapshot. Simplified graphs use their own snapshot file.
+    With compact set, graph is a CompactGraph.
+    """
+    snapshot_path = snapshot_path or osm_path + ('.simplified.snap' if simplify else '.snap')
+
+    cached = load_snapshot(snapshot_path, osm_path, compact)
+    if cached is not None:
+        graph, grid = cached
+        if grid is None and with_grid:
+            grid = SpatialGrid(graph)
+        return graph, grid
+
+    graph = loader(osm_path)
+    if not graph or len(graph.nodes) < 2:
+        return graph, None
+    if simplify:
+        contract_degree2_chains(graph)
+
+    grid = SpatialGrid(graph) if with_grid else None
+    try:
+        save_snapshot(graph, snapshot_path, osm_path, grid)
+    except OSError as e:
+        print(f"Could not write snapshot: {e}")
+    if compact:
+        graph = CompactGraph.from_graph(graph)
+    return graph, grid
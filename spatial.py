@@ -7,7 +7,7 @@ class SpatialGrid:
     Maps geographic coordinates (lat, lon) to a grid of cells (buckets).
     Allows O(1) average time complexity for finding nearby edges.
     """
-    def __init__(self, graph: Graph, rows: int = 50, cols: int = 50):
+    def __init__(self, graph: Graph, rows: int = 50, cols: int = 50, buckets: dict | None = None):
         self.graph = graph
         self.rows = rows
         self.cols = cols
@@ -25,8 +25,11 @@ class SpatialGrid:
         self.lat_step = (self.max_lat - self.min_lat) / self.rows
         self.lon_step = (self.max_lon - self.min_lon) / self.cols
         
-        # Build the grid immediately
-        self.build()
+        # Build the grid immediately (unless pre-built buckets were given, e.g. from a snapshot)
+        if buckets is not None:
+            self.grid = buckets
+        else:
+            self.build()
 
     def _get_cell(self, lat, lon):
         r = int((lat - self.min_lat) / self.lat_step)
@@ -52,20 +55,19 @@ class SpatialGrid:
                 # We add the edge to the cells of both endpoints
                 # Technically, a long edge could span empty cells, but for city streets
                 # endpoint cells are usually sufficient coverage.
-                r1, c1 = self._get_cell(u.lat, u.lon)
-                r2, c2 = self._get_cell(v.lat, v.lon)
+                # Polyline edges (contracted chains) are also added to the cells of their shape points.
+                cells = [self._get_cell(u.lat, u.lon)]
+                for lat, lon in edge.get('geometry', ()):
+                    cells.append(self._get_cell(lat, lon))
+                cells.append(self._get_cell(v.lat, v.lon))
                 
-                self._add_to_cell(r1, c1, u_id, v_id)
-                if (r1, c1) != (r2, c2):
-                    self._add_to_cell(r2, c2, u_id, v_id)
+                # One (u, v) tuple per edge, shared by all of its cells
+                key = (u_id, v_id)
+                for cell in dict.fromkeys(cells):
+                    self.grid.setdefault(cell, []).append(key)
                 count += 1
         print(f"Spatial grid built with {count} edge references.")
 
-    def _add_to_cell(self, r, c, u, v):
-        if (r, c) not in self.grid:
-            self.grid[(r, c)] = []
-        self.grid[(r, c)].append((u, v))
-
     def query(self, lat: float, lon: float) -> list:
         """ Returns a list of candidate edges in the cell around specific lat, lon. """
         r, c = self._get_cell(lat, lon)
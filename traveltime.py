@@ -0,0 +1,31 @@
+from array import array
+from algorithms import edge_travel_time
+from models import Graph
+
+class TravelTimes:
+    """
+    Travel time (s) of every edge, indexed by edge id: the speed limit of the road type from
+    Theme.SPEED_LIMITS, jam speed on jammed roads, inf on blocked ones (algorithms.edge_travel_time).
+    Computed once for the whole graph; register edge_changed with TrafficSimulator.add_listener
+    to keep it in sync with the traffic state.
+    """
+    def __init__(self, graph: Graph):
+        edge_count = sum(len(edges) for edges in graph.edges.values())
+        self.times = array('d', [0.0]) * edge_count
+        for edges in graph.edges.values():
+            for edge in edges:
+                self.times[edge['id']] = edge_travel_time(edge)
+
+    def edge_changed(self, edge):
+        """ Recomputes one edge after its weight or status changed. """
+        self.times[edge['id']] = edge_travel_time(edge)
+
+    def path_time(self, graph: Graph, path: list[str]) -> float:
+        """ Total seconds along a node path (inf if it uses a blocked or missing edge). """
+        total = 0.0
+        for u, v in zip(path, path[1:]):
+            edge = graph.get_edge(u, v)
+            if edge is None:
+                return float('infinity')
+            total += self.times[edge['id']]
+        return total
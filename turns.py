@@ -0,0 +1,87 @@
+import time
+from array import array
+from algorithms import _turn_penalty
+from models import Graph
+
+# Turn cost tables for edge-based routing (see algorithms.a_star_edge_based).
+# Every edge e = u->v can continue into the out-edges of v. The cost of each of these turns
+# (a_star's sharp-turn penalty, or inf where an OSM turn restriction forbids it) is computed once
+# per graph; a query then looks it up instead of recomputing angles for every relaxation.
+
+_INF = float('infinity')
+
+class TurnTable:
+    """
+    Turn costs of one graph, keyed by edge id (Graph edge index / CompactGraph edge index).
+    The cost of turning from edge e into the j-th out-edge of its head node is costs[starts[e] + j];
+    heads[e] is the node id edge e ends at.
+    """
+    def __init__(self):
+        self.starts = array('l')
+        self.costs = array('d')
+        self.heads: list[str] = []
+
+    @property
+    def turn_count(self) -> int:
+        return len(self.costs)
+
+    @property
+    def forbidden_count(self) -> int:
+        return self.costs.count(_INF)
+
+def _forbidden_turns(graph: Graph) -> tuple[set, dict]:
+    """ graph.restrictions as (from, via, to) triples that are banned, and (from, via) -> allowed exits for 'only'. """
+    banned, only = set(), {}
+    for r in graph.restrictions:
+        if r.kind == 'only':
+            only.setdefault((r.from_id, r.via_id), set()).add(r.to_id)
+        else:
+            banned.add((r.from_id, r.via_id, r.to_id))
+    return banned, only
+
+def build_turn_table(graph: Graph) -> TurnTable:
+    """ Computes the turn cost of every (incoming edge, outgoing edge) pair at every node of graph. """
+    start_time = time.perf_counter()
+    table = TurnTable()
+    banned, only = _forbidden_turns(graph)
+
+    edge_count = sum(len(edges) for edges in graph.edges.values())
+    table.starts = array('l', [0]) * edge_count
+    table.heads = [None] * edge_count
+
+    for v_id in graph.nodes:
+        v_node = graph.nodes[v_id]
+        out_edges = graph.get_neighbors(v_id)
+        # Point each out-edge leaves v towards (first shape point of polyline edges)
+        exits = []
+        for edge in out_edges:
+            geometry = edge.get('geometry')
+            if geometry:
+                exits.append(geometry[0])
+            else:
+                w_node = graph.nodes[edge['to']]
+                exits.append((w_node.lat, w_node.lon))
+
+        for u_id, edge in graph.get_incoming(v_id):
+            e = edge['id']
+            table.starts[e] = len(table.costs)
+            table.heads[e] = v_id
+            geometry = edge.get('geometry')
+            if geometry:
+                entry_point = geometry[-1]
+            else:
+                u_node = graph.nodes[u_id]
+                entry_point = (u_node.lat, u_node.lon)
+
+            allowed = only.get((u_id, v_id))
+            for out_edge, exit_point in zip(out_edges, exits):
+                w_id = out_edge['to']
+                if (u_id, v_id, w_id) in banned or (allowed is not None and w_id not in allowed):
+                    table.costs.append(_INF)
+                else:
+                    table.costs.append(_turn_penalty(entry_point, v_node, exit_point))
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Turn table: {table.turn_count} turns ({table.forbidden_count} forbidden by "
+          f"{len(graph.restrictions)} restrictions) for {edge_count} edges in {elapsed:.2f}s.")
+    return table
@@ -44,6 +44,17 @@ def calculate_turn_dir(lat1: float, lon1: float, lat2: float, lon2: float, lat3:
     else:
         return "straight"
 
+def turn_angle(lat1: float, lon1: float, lat2: float, lon2: float, lat3: float, lon3: float) -> float:
+    """
+    Change of heading (degrees) at P2 when driving P1->P2->P3, in the same local projection
+    as calculate_turn_dir: 0 = straight on, positive = left, negative = right, +-180 = U-turn.
+    """
+    cos_lat = math.cos(math.radians((lat1 + lat2 + lat3) / 3))
+    heading_in = math.atan2(lat2 - lat1, (lon2 - lon1) * cos_lat)
+    heading_out = math.atan2(lat3 - lat2, (lon3 - lon2) * cos_lat)
+    change = math.degrees(heading_out - heading_in)
+    return (change + 180) % 360 - 180
+
 def rotate_point(x: float, y: float, cx: float, cy: float, angle_rad: float) -> tuple[float, float]:
     """ Rotates point (x,y) around center (cx,cy) by angle_rad. """
     cos_a = math.cos(angle_rad)
@@ -1,11 +1,19 @@
 import tkinter as tk
 import math
 from utils import calculate_turn_dir
-from algorithms import a_star, generate_instructions
+from algorithms import find_route, expand_path
+from maneuvers import build_maneuvers
 from simulation import TrafficSimulator
 from spatial import SpatialGrid
 from hud_renderer import HudRenderer
-from utils import calculate_turn_dir, rotate_point
+from isochrone import isochrone_from_point
+from alternatives import alternative_routes
+from replanning import DStarLite
+from poisearch import PoiIndex, pois_along_route
+from snapping import SnapGrid, snap_to_road, route_between
+from traveltime import TravelTimes
+from routecache import RouteCache
+from utils import calculate_turn_dir, rotate_point, haversine_distance
 
 # Road visualization styles
 from config import Theme
@@ -13,9 +21,24 @@ from config import Theme
 # Road visualization styles and Speed Limits are now in config.Theme
 
 class MapVisualizer:
-    def __init__(self, graph, width=1200, height=900):
+    def __init__(self, graph, width=1200, height=900, grid=None, routing_algorithm='astar', replanning=False):
         self.graph = graph
+        # Key of algorithms.ROUTING_ALGORITHMS used for route and live reroute queries
+        self.routing_algorithm = routing_algorithm
+        # Incremental replanning: routes to the current end node come from a D* Lite planner that
+        # keeps its search between queries and only repairs what traffic changes affect
+        self.replanning = replanning
+        self.replanner = None
         self.simulator = TrafficSimulator(graph)
+        # One per-edge time array for time routing, the ETA and instructions, updated on every jam/block
+        if graph.travel_times is None:
+            graph.travel_times = TravelTimes(graph)
+        self.simulator.add_listener(graph.travel_times.edge_changed)
+        self.simulator.add_listener(self._traffic_changed)
+        # Repeated start/end pairs skip the search; jams and blocks evict only the routes they affect
+        if graph.route_cache is None:
+            graph.route_cache = RouteCache(graph)
+        graph.route_cache.attach(self.simulator)
         
         self.width = width
         self.height = height
@@ -51,11 +74,26 @@ class MapVisualizer:
         self.mid_lat = (self.min_lat + self.max_lat) / 2
         self.mid_lon = (self.min_lon + self.max_lon) / 2
 
-        self.grid = SpatialGrid(graph)
+        self.grid = grid if grid is not None else SpatialGrid(graph)
+        # POIs snapped to road nodes, for "along my route" searches
+        if graph.poi_index is None:
+            graph.poi_index = PoiIndex(graph, self.grid)
         self.start_node = None
         self.end_node = None
+        # Clicked road points (snapping.SnapPoint); routes start and end there, mid-edge
+        self.snap_grid = SnapGrid(graph)
+        self.start_snap = None
+        self.end_snap = None
+        self.route_stubs = []       # Partial edges between the snap points and the route's end nodes
         self.click_state = 0 
         self.mode = "NAVIGATE" 
+        # Reachable area overlay (isochrone.Isochrone), set by clicks in ISOCHRONE mode
+        self.isochrone = None
+        self.isochrone_minutes = 5
+        # Other choices for the current route (alternatives.AlternativeRoute), when enabled in the sidebar
+        self.alternatives = []
+        # Ranked POIs with the smallest detour from the current route (poisearch.PoiMatch)
+        self.route_pois = []
         
         self.zoom = 1.0
         self.offset_x = 0
@@ -192,6 +230,8 @@ class MapVisualizer:
         self.btn_nav = self.create_styled_button(self.sidebar, "Navigate", "#00ccff", lambda: self.set_mode("NAVIGATE"))
         self.btn_jam = self.create_styled_button(self.sidebar, "Create Traffic Jam", "#ff8800", lambda: self.set_mode("JAM"))
         self.btn_block = self.create_styled_button(self.sidebar, "Block Road", "#ff3333", lambda: self.set_mode("BLOCK"))
+        self.btn_iso = self.create_styled_button(self.sidebar, f"Reachable in {self.isochrone_minutes} min", "#aa66ff",
+                                                 lambda: self.set_mode("ISOCHRONE"))
 
         # Spacer
         tk.Label(self.sidebar, bg="#2a2a2a").pack(pady=10)
@@ -237,7 +277,21 @@ class MapVisualizer:
                        bg="#2a2a2a", fg="#dddddd", selectcolor="#2a2a2a", activebackground="#2a2a2a", activeforeground="white",
                        font=("Segoe UI", 9), command=self.draw_map)
         chk.pack(anchor="w", padx=15, pady=5)
+
+        self.show_alternatives = tk.BooleanVar(value=False)
+        chk = tk.Checkbutton(self.sidebar, text="Show alternative routes", variable=self.show_alternatives,
+                       bg="#2a2a2a", fg="#dddddd", selectcolor="#2a2a2a", activebackground="#2a2a2a", activeforeground="white",
+                       font=("Segoe UI", 9), command=self.toggle_alternatives)
+        chk.pack(anchor="w", padx=15, pady=5)
                        
+        # POIs along the route: type selector + search
+        poi_types = self.graph.poi_index.types() or ["shop"]
+        self.poi_query_type = tk.StringVar(value=poi_types[0])
+        menu = tk.OptionMenu(self.sidebar, self.poi_query_type, *poi_types)
+        menu.config(bg="#444444", fg="white", activebackground="#555555", highlightthickness=0, font=("Segoe UI", 9))
+        menu.pack(fill=tk.X, padx=15, pady=(5, 0))
+        self.create_styled_button(self.sidebar, "Find Along Route", "#55aa55", self.find_pois_along_route)
+
         self.create_styled_button(self.sidebar, "Animate Movement", "#e39e54", self.start_animation)
         self.btn_pause = self.create_styled_button(self.sidebar, "⏸️ Pause", "#777777", self.toggle_pause)
 
@@ -262,11 +316,12 @@ class MapVisualizer:
 
     def set_mode(self, mode):
         self.mode = mode
-        colors = {"NAVIGATE": "#00ccff", "JAM": "#ff8800", "BLOCK": "#ff0000"}
+        colors = {"NAVIGATE": "#00ccff", "JAM": "#ff8800", "BLOCK": "#ff0000", "ISOCHRONE": "#aa66ff"}
         descriptions = {
             "NAVIGATE": "Left Click: Set Start/End",
             "JAM": "Left Click on road:\nSlow down traffic (x5)",
-            "BLOCK": "Left Click on road:\nBlock road completely"
+            "BLOCK": "Left Click on road:\nBlock road completely",
+            "ISOCHRONE": f"Left Click: Show the area\nreachable in {self.isochrone_minutes} min"
         }
         self.lbl_info.config(text=f"MODE: {mode}\n\n{descriptions[mode]}", fg=colors[mode])
 
@@ -329,7 +384,7 @@ class MapVisualizer:
         """ Renders the map, roads, and active overlays. Uses strict layering. """
         # 1. CLEAR: Wipe everything to prevent ghosting
         tags_to_clear = [
-            "map_bg", "map_fg", "route", "marker", "highlight", "poi",
+            "map_bg", "map_fg", "isochrone", "route", "route_poi", "marker", "highlight", "poi",
             "dashboard", "legend", "hud_speed", "hud_instr", "pulse_effect"
         ]
         for tag in tags_to_clear:
@@ -346,55 +401,58 @@ class MapVisualizer:
         
         # 3. DATA GATHERING
         for u_id, v_id in visible_edges:
-            if u_id not in self.graph.nodes: continue
-            edges = self.graph.edges.get(u_id, [])
+            if u_id not in self.graph.nodes or v_id not in self.graph.nodes: continue
+            edge = self.graph.get_edge(u_id, v_id)
+            if edge is None: continue
+            
+            # Deduplicate
+            pair = tuple(sorted((u_id, v_id)))
+            if pair in seen: continue
+            seen.add(pair)
+            
             u = self.graph.nodes[u_id]
+            v = self.graph.nodes[v_id]
             ux, uy = self.to_screen(u.lat, u.lon)
-
-            for edge in edges:
-                if edge['to'] != v_id: continue
-                v_id = edge['to']
-                if v_id not in self.graph.nodes: continue
-                
-                # Deduplicate
-                pair = tuple(sorted((u_id, v_id)))
-                if pair in seen: continue
-                seen.add(pair)
-                
-                v = self.graph.nodes[v_id]
-                vx, vy = self.to_screen(v.lat, v.lon)
-                
-                status = edge.get('status', None)
-                rtype = edge.get('type', 'unknown')
-                
-                if status == 'blocked': style = Theme.ROAD_STYLES['blocked']
-                elif status == 'jammed': style = Theme.ROAD_STYLES['jammed']
-                else: style = Theme.ROAD_STYLES.get(rtype, Theme.ROAD_STYLES['unknown'])
-                
-                is_oneway = True
-                if v_id in self.graph.edges:
-                    for e_back in self.graph.edges[v_id]:
-                        if e_back['to'] == u_id:
-                            is_oneway = False
-                            break
-                
-                all_edges.append((style['width'], style['color'], ux, uy, vx, vy, is_oneway))
+            vx, vy = self.to_screen(v.lat, v.lon)
+            
+            # Polyline edges (contracted chains) are drawn through their shape points
+            coords = [ux, uy]
+            for lat, lon in edge.get('geometry', ()):
+                coords.extend(self.to_screen(lat, lon))
+            coords.extend((vx, vy))
+            
+            status = edge.get('status', None)
+            rtype = edge.get('type', 'unknown')
+            
+            if status == 'blocked': style = Theme.ROAD_STYLES['blocked']
+            elif status == 'jammed': style = Theme.ROAD_STYLES['jammed']
+            else: style = Theme.ROAD_STYLES.get(rtype, Theme.ROAD_STYLES['unknown'])
+            
+            is_oneway = self.graph.get_reverse_edge(edge) is None
+            
+            all_edges.append((style['width'], style['color'], coords, is_oneway))
 
         # Sort by width (wider roads at bottom)
         all_edges.sort(key=lambda x: x[0])
         
         # 4. DRAWING (Pass 1: Outlines)
         outline_color = Theme.COLORS.get('road_outline', '#333333')
-        for w, c, ux, uy, vx, vy, is_oneway in all_edges:
-             self.canvas.create_line(ux, uy, vx, vy, fill=outline_color, width=w+2, capstyle=tk.ROUND, tags="map_bg")
+        for w, c, coords, is_oneway in all_edges:
+             self.canvas.create_line(coords, fill=outline_color, width=w+2, capstyle=tk.ROUND, tags="map_bg")
 
         # 4. DRAWING (Pass 2: Fills)
-        for w, c, ux, uy, vx, vy, is_oneway in all_edges:
-            self.canvas.create_line(ux, uy, vx, vy, fill=c, width=w, capstyle=tk.ROUND, tags="map_fg")
+        for w, c, coords, is_oneway in all_edges:
+            self.canvas.create_line(coords, fill=c, width=w, capstyle=tk.ROUND, tags="map_fg")
             if is_oneway and w > 2:
-                 mx, my = (ux+vx)/2, (uy+vy)/2
+                 # Marker on the middle segment of the polyline
+                 k = (len(coords) // 4) * 2
+                 mx, my = (coords[k-2]+coords[k])/2, (coords[k-1]+coords[k+1])/2
                  self.canvas.create_oval(mx-1, my-1, mx+1, my+1, fill="#000", tags="map_fg") 
 
+        # Reachable area overlay
+        if self.isochrone is not None:
+            self.draw_isochrone(self.isochrone)
+
         # 5. POIs & HUD
         if self.show_pois.get(): self.draw_pois()
 
@@ -409,13 +467,17 @@ class MapVisualizer:
 
         # 6. ACTIVE ROUTE & DASHBOARD
         if self.start_node and self.end_node and self.click_state == 2:
-            sx, sy = self.to_screen(self.graph.nodes[self.start_node].lat, self.graph.nodes[self.start_node].lon)
-            ex, ey = self.to_screen(self.graph.nodes[self.end_node].lat, self.graph.nodes[self.end_node].lon)
+            start = self.start_snap or self.graph.nodes[self.start_node]
+            end = self.end_snap or self.graph.nodes[self.end_node]
+            sx, sy = self.to_screen(start.lat, start.lon)
+            ex, ey = self.to_screen(end.lat, end.lon)
             self.canvas.create_oval(sx-6, sy-6, sx+6, sy+6, fill="#00ff00", outline="white", width=2, tags="marker")
             self.canvas.create_oval(ex-6, ey-6, ex+6, ey+6, fill="#ff0000", outline="white", width=2, tags="marker")
             
             if hasattr(self, 'current_route_path') and self.current_route_path:
+                self.draw_alternatives()
                 self.draw_route_line(self.current_route_path)
+                self.draw_route_pois()
                 
                 time_sec = self.calculate_time(self.current_route_path)
                 dist = getattr(self, 'current_route_dist', 0)
@@ -480,22 +542,71 @@ class MapVisualizer:
 
     def recalculate_route(self):
         """ Recalculates route with current traffic conditions. """
-        path, dist = a_star(self.graph, self.start_node, self.end_node)
+        self.route_stubs = []
+        if self.replanning or self.start_snap is None or self.end_snap is None:
+            path, dist = self.route_to_end(self.start_node)
+        else:
+            path, dist = self.route_from_snaps()
+        self.update_alternatives()
+        self.route_pois = []
         
         if path:
             self.current_route_path = path
             self.current_route_dist = dist
             self.draw_map()
-            # Generate instructions only if a path exists
-            self.current_instructions = generate_instructions(self.graph, path) 
+            # Generate instructions only if a path exists; the HUD reads the same maneuver list
+            self.current_maneuvers = build_maneuvers(self.graph, path)
+            self.current_instructions = self.current_maneuvers.instructions()
         else:
             # No path found (blocked)
             self.current_route_path = None
+            self.current_maneuvers = None
             self.current_instructions = ["Route blocked."]
             self.draw_map()
             # Explicitly write to HUD
             self.hud.draw_navigation("NO ROUTE (BLOCKED)")
 
+    def route_from_snaps(self):
+        """
+        Route between the clicked road points instead of their nearest intersections (snapping.route_between).
+        The part between intersections becomes the route path (animation, rerouting and POI search use it);
+        the partial edges at both ends are kept in route_stubs. Falls back to node routing when the points
+        are on the same piece of road.
+        """
+        path, cost, view = route_between(self.graph, self.start_snap, self.end_snap, self.routing_algorithm)
+        real = [node_id for node_id in path if node_id not in view.snap_ids]
+        if len(real) < 2:
+            return self.route_to_end(self.start_node)
+        self.start_node, self.end_node = real[0], real[-1]
+        self.route_stubs = [expand_path(view, path[:path.index(real[0]) + 1]),
+                            expand_path(view, path[path.index(real[-1]):])]
+        return real, cost
+
+    def route_to_end(self, start_id):
+        """ Route from start_id to the end node: from the incremental planner if enabled, else find_route. """
+        if not self.replanning:
+            return find_route(self.graph, start_id, self.end_node, self.routing_algorithm)
+        if self.replanner is None or self.replanner.goal != self.end_node:
+            self.replanner = DStarLite(self.graph, start_id, self.end_node)
+        self.replanner.move_to(start_id)
+        return self.replanner.route()
+
+    def _traffic_changed(self, edge):
+        # Simulator listener: the planner repairs its search lazily on the next route
+        if self.replanner is not None:
+            self.replanner.edge_changed(edge)
+
+    def update_alternatives(self):
+        """ Recomputes the alternative routes for the current start/end (empty when disabled). """
+        self.alternatives = []
+        if self.show_alternatives.get() and self.start_node and self.end_node and self.click_state == 2:
+            self.alternatives = alternative_routes(self.graph, self.start_node, self.end_node,
+                                                   max_routes=len(Theme.ALTERNATIVE_STYLES) + 1)
+
+    def toggle_alternatives(self):
+        self.update_alternatives()
+        self.draw_map()
+
     def export_route(self):
         if not hasattr(self, 'current_instructions') or not self.current_instructions:
             print("No route to export.")
@@ -511,12 +622,68 @@ class MapVisualizer:
         self.lbl_info.config(text=f"Saved to:\n{filename}", fg="#00ff00")
 
     def draw_route_line(self, path):
+        for points in [expand_path(self.graph, path)] + self.route_stubs:
+            if len(points) < 2: continue
+            coords = []
+            for lat, lon in points:
+                coords.extend(self.to_screen(lat, lon))
+            self.canvas.create_line(coords, fill="#00ff00", width=8, stipple="gray50", tags="route") 
+            self.canvas.create_line(coords, fill="#00ff00", width=4, tags="route")
+
+    def draw_alternatives(self):
+        """ Alternative routes other than the main one, dashed, each with its extra time over the main route. """
+        main_time = self.calculate_time(self.current_route_path)
+        others = [alt for alt in self.alternatives if alt.path != self.current_route_path]
+        for alt, style in zip(others, Theme.ALTERNATIVE_STYLES):
+            coords = []
+            for lat, lon in expand_path(self.graph, alt.path):
+                coords.extend(self.to_screen(lat, lon))
+            self.canvas.create_line(coords, fill=style['color'], width=4, dash=style['dash'], tags="route")
+
+            # Label at the middle node of the route
+            mid = self.graph.nodes[alt.path[len(alt.path) // 2]]
+            mx, my = self.to_screen(mid.lat, mid.lon)
+            extra = alt.time - main_time
+            label = f"{extra / 60:+.1f} min" if math.isfinite(extra) else f"{alt.time / 60:.1f} min"
+            self.canvas.create_text(mx, my - 12, text=label, fill=style['color'], font=("Segoe UI", 9, "bold"),
+                                    tags="route")
+
+    def find_pois_along_route(self):
+        """ Ranks the POIs of the selected type by detour from the current route and lists the best ones. """
+        path = getattr(self, 'current_route_path', None)
+        if not path or self.click_state != 2:
+            self.lbl_info.config(text="Set a route first.", fg="red")
+            return
+        poi_type = self.poi_query_type.get()
+        self.route_pois = pois_along_route(self.graph, path, poi_type)
+        if self.route_pois:
+            lines = [f"{i}. {m.poi.name} (+{int(m.detour)} m)" for i, m in enumerate(self.route_pois, 1)]
+            self.lbl_info.config(text=f"{poi_type.upper()} ALONG ROUTE\n\n" + "\n".join(lines), fg="#55aa55")
+        else:
+            self.lbl_info.config(text=f"No {poi_type} near the route.", fg="red")
+        self.draw_map()
+
+    def draw_route_pois(self):
+        """ Ranked POIs along the route: numbered markers, linked to the road node they are reached from. """
+        for rank, match in enumerate(self.route_pois, 1):
+            px, py = self.to_screen(match.poi.lat, match.poi.lon)
+            node = self.graph.nodes[match.node_id]
+            nx, ny = self.to_screen(node.lat, node.lon)
+            self.canvas.create_line(px, py, nx, ny, fill="#55aa55", dash=(2, 2), tags="route_poi")
+            self.canvas.create_oval(px-8, py-8, px+8, py+8, fill="#55aa55", outline="white", width=2, tags="route_poi")
+            self.canvas.create_text(px, py, text=str(rank), fill="white", font=("Segoe UI", 8, "bold"), tags="route_poi")
+
+    def draw_isochrone(self, iso):
+        """ Boundary polygon and origin of an isochrone, below the route and markers. """
         coords = []
-        for nid in path:
-            n = self.graph.nodes[nid]
-            coords.extend(self.to_screen(n.lat, n.lon))
-        self.canvas.create_line(coords, fill="#00ff00", width=8, stipple="gray50", tags="route") 
-        self.canvas.create_line(coords, fill="#00ff00", width=4, tags="route")
+        for lat, lon in iso.boundary:
+            coords.extend(self.to_screen(lat, lon))
+        if len(iso.boundary) >= 3:
+            self.canvas.create_polygon(coords, fill="#aa66ff", stipple="gray25", outline="#aa66ff", width=2,
+                                       tags="isochrone")
+        origin = self.graph.nodes[iso.origin]
+        ox, oy = self.to_screen(origin.lat, origin.lon)
+        self.canvas.create_oval(ox-5, oy-5, ox+5, oy+5, fill="#aa66ff", outline="white", width=2, tags="isochrone")
 
     def animate_click(self, x, y, radius=5, alpha=1.0):
         """ Creates a pulse animation at the click location. """
@@ -556,86 +723,47 @@ class MapVisualizer:
         for u_id, v_id in candidates:
             if u_id not in self.graph.nodes or v_id not in self.graph.nodes: continue
             
-            # Get edge object
-            # We need to find the actual edge object in the list
-            edge_obj = None
-            for e in self.graph.edges[u_id]:
-                if e['to'] == v_id:
-                    edge_obj = e
-                    break
-            if not edge_obj: continue
+            edge_obj = self.graph.get_edge(u_id, v_id)
+            if edge_obj is None: continue
 
             u = self.graph.nodes[u_id]
             v = self.graph.nodes[v_id]
             
-            ux, uy = self.to_screen(u.lat, u.lon)
-            vx, vy = self.to_screen(v.lat, v.lon)
-
-            # --- Distance Logic ---
-            dx, dy = vx - ux, vy - uy
-            if dx == 0 and dy == 0: continue
-            
-            t = ((ex - ux) * dx + (ey - uy) * dy) / (dx*dx + dy*dy)
-            t = max(0, min(1, t))
-            
-            nearest_x = ux + t * dx
-            nearest_y = uy + t * dy
-            
-            dist = math.hypot(ex - nearest_x, ey - nearest_y)
-            
-            if dist < min_dist:
-                min_dist = dist
-                best_edge = (u_id, v_id)
+            points = [self.to_screen(u.lat, u.lon)]
+            for lat, lon in edge_obj.get('geometry', ()):
+                points.append(self.to_screen(lat, lon))
+            points.append(self.to_screen(v.lat, v.lon))
+
+            # --- Distance Logic (per segment of the polyline) ---
+            for (ux, uy), (vx, vy) in zip(points, points[1:]):
+                dx, dy = vx - ux, vy - uy
+                if dx == 0 and dy == 0: continue
+                
+                t = ((ex - ux) * dx + (ey - uy) * dy) / (dx*dx + dy*dy)
+                t = max(0, min(1, t))
+                
+                nearest_x = ux + t * dx
+                nearest_y = uy + t * dy
+                
+                dist = math.hypot(ex - nearest_x, ey - nearest_y)
+                
+                if dist < min_dist:
+                    min_dist = dist
+                    best_edge = (u_id, v_id)
         
         return best_edge
 
-    def find_nearest_node(self, ex, ey):
-        best_node = None
-        min_dist = 30.0 
-        for node in self.graph.nodes.values():
-            nx, ny = self.to_screen(node.lat, node.lon)
-            dist = math.hypot(ex - nx, ey - ny)
-            if dist < min_dist:
-                min_dist = dist
-                best_node = node.id
-        return best_node
+    def snap_click(self, ex, ey):
+        """ Road point under a click: projection onto the nearest edge (snapping grid), None if more than 30 px away. """
+        lat, lon = self.screen_to_geo(ex, ey)
+        snap = snap_to_road(self.graph, self.snap_grid, lat, lon)
+        if snap is None: return None
+        sx, sy = self.to_screen(snap.lat, snap.lon)
+        return snap if math.hypot(ex - sx, ey - sy) < 30.0 else None
 
     def calculate_time(self, path):
-        total_seconds = 0
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i+1]
-            # Find edge
-            edge_found = False
-            for e in self.graph.get_neighbors(u):
-                if e['to'] == v:
-                    edge_found = True
-                    status = e.get('status', None)
-                    rtype = e.get('type', 'unknown')
-                    
-                    # Determine limit
-                    if status == 'jammed':
-                        limit = Theme.SPEED_LIMITS['jammed']
-                    elif status == 'blocked':
-                        # If blocked, time is infinite
-                        return float('inf')
-                    else:
-                        limit = Theme.SPEED_LIMITS.get(rtype, 30)
-                    
-                    # Protection against division by zero
-                    speed_ms = max(1, limit) / 3.6
-                    weight = e['weight']
-                    
-                    # If weight is infinite (blockage), time is infinite
-                    if math.isinf(weight):
-                        return float('inf')
-                        
-                    total_seconds += weight / speed_ms
-                    break
-            
-            if not edge_found:
-                return float('inf') # Path broken
-                
-        return total_seconds
+        # Speed limit of the road type (jam speed if jammed, infinite time if blocked), from the shared array
+        return self.graph.travel_times.path_time(self.graph, path)
     
     def draw_dashboard(self, distance, minutes, seconds):
         self.canvas.create_rectangle(20, 20, 250, 110, fill="#222222", outline="#444444", width=2, tags="dashboard")
@@ -648,29 +776,45 @@ class MapVisualizer:
     def handle_click(self, event):
         if self.mode == "NAVIGATE":
             # Routing Logic
-            node = self.find_nearest_node(event.x, event.y)
-            if not node: return
-            nx, ny = self.to_screen(self.graph.nodes[node].lat, self.graph.nodes[node].lon)
+            snap = self.snap_click(event.x, event.y)
+            if snap is None: return
+            node = snap.nearest_node()
+            nx, ny = self.to_screen(snap.lat, snap.lon)
 
             if self.click_state == 0:
                 self.start_node = node
+                self.start_snap = snap
                 self.canvas.delete("marker"); self.canvas.delete("route"); self.canvas.delete("dashboard")
                 self.canvas.create_oval(nx-6, ny-6, nx+6, ny+6, fill="#00ff00", outline="white", width=2, tags="marker")
                 self.click_state = 1
                 self.animate_click(event.x, event.y)
             elif self.click_state == 1:
                 self.end_node = node
+                self.end_snap = snap
                 self.click_state = 2
                 self.recalculate_route()
                 self.animate_click(event.x, event.y)
             elif self.click_state == 2:
                 self.start_node = node
                 self.end_node = None
+                self.start_snap, self.end_snap = snap, None
+                self.route_stubs = []
+                self.alternatives = []
+                self.route_pois = []
                 self.canvas.delete("marker"); self.canvas.delete("route"); self.canvas.delete("dashboard")
                 self.canvas.create_oval(nx-6, ny-6, nx+6, ny+6, fill="#00ff00", outline="white", width=2, tags="marker")
                 self.click_state = 1
                 self.animate_click(event.x, event.y)
         
+        elif self.mode == "ISOCHRONE":
+            lat, lon = self.screen_to_geo(event.x, event.y)
+            self.isochrone = isochrone_from_point(self.graph, self.grid, lat, lon, self.isochrone_minutes * 60)
+            if self.isochrone is not None:
+                self.lbl_info.config(text=f"MODE: ISOCHRONE\n\n{len(self.isochrone.times)} intersections "
+                                          f"reachable in {self.isochrone_minutes} min", fg="#aa66ff")
+            self.draw_map()
+            self.animate_click(event.x, event.y)
+
         elif self.mode in ["JAM", "BLOCK"]:
             # Simulation Logic
             edge = self.find_nearest_edge(event.x, event.y)
@@ -742,12 +886,8 @@ class MapVisualizer:
         if edge:
             u_id, v_id = edge
             # Find the edge object to get the name
-            name = "Unknown Road"
-            if u_id in self.graph.edges:
-                for e in self.graph.edges[u_id]:
-                    if e['to'] == v_id:
-                        name = e.get('name', 'Unknown Road')
-                        break
+            e = self.graph.get_edge(u_id, v_id)
+            name = e.get('name', 'Unknown Road') if e is not None else "Unknown Road"
             
             self.tooltip.config(text=name)
             self.tooltip.place(x=event.x + 15, y=event.y + 15)
@@ -780,21 +920,7 @@ class MapVisualizer:
             
         # Create a car object
         # LOGIC CHANGE: Now storing (Lat, Lon) tuples instead of Screen (x, y)
-        self.anim_path = []
-        path_nodes = self.current_route_path
-        
-        for i in range(len(path_nodes)-1):
-            u = self.graph.nodes[path_nodes[i]]
-            v = self.graph.nodes[path_nodes[i+1]]
-            
-            # No to_screen here! We interpolate raw coordinates.
-            steps = 10 
-            for s in range(steps):
-                t = s / steps
-                # Interpolate Latitude and Longitude
-                lat = u.lat + (v.lat - u.lat) * t
-                lon = u.lon + (v.lon - u.lon) * t
-                self.anim_path.append((lat, lon))
+        self.anim_path, self.anim_progress = self._build_anim_points(self.current_route_path)
                 
         self.anim_index = 0
         # Car creation moved to draw_car helper or animate_step logic
@@ -804,6 +930,32 @@ class MapVisualizer:
         
         self.animate_step()
         
+    def _build_anim_points(self, path_nodes: list[str], first_segment: int = 0):
+        """
+        Interpolates (lat, lon) animation points along a route, 10 per straight piece
+        (contracted edges contribute one piece per shape point).
+        Returns (points, progress) where progress[i] = (route segment index, fraction of that segment covered).
+        """
+        points, progress = [], []
+        steps = 10
+        
+        for i in range(len(path_nodes)-1):
+            # No to_screen here! We interpolate raw coordinates.
+            line = expand_path(self.graph, path_nodes[i:i+2])
+            pieces = [haversine_distance(a[0], a[1], b[0], b[1]) for a, b in zip(line, line[1:])]
+            total = sum(pieces) or 1.0
+            
+            covered = 0.0
+            for (lat1, lon1), (lat2, lon2), length in zip(line, line[1:], pieces):
+                for s in range(steps):
+                    t = s / steps
+                    # Interpolate Latitude and Longitude
+                    points.append((lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t))
+                    progress.append((first_segment + i, (covered + length * t) / total))
+                covered += length
+        
+        return points, progress
+
     def animate_step(self):
         """ Handles a single frame of the car animation, interpolating geographic coordinates. """
         if self.is_paused: return 
@@ -843,23 +995,19 @@ class MapVisualizer:
             path_nodes = self.current_route_path
             
             if total_steps > 0 and len(path_nodes) > 1:
-                segment_idx = int((self.anim_index / total_steps) * (len(path_nodes) - 1))
+                segment_idx = self.anim_progress[self.anim_index][0]
                 segment_idx = min(segment_idx, len(path_nodes) - 2)
                 
                 u, v = path_nodes[segment_idx], path_nodes[segment_idx+1]
                 
                 limit = 50
-                road_name = "Unknown Road"
-                if u in self.graph.edges:
-                    for e in self.graph.edges[u]:
-                        if e['to'] == v:
-                            rtype = e.get('type', 'unknown')
-                            status = e.get('status', None)
-                            road_name = e.get('name', 'Unknown Road')
-                            if status == 'jammed': limit = Theme.SPEED_LIMITS['jammed']
-                            elif status == 'blocked': limit = Theme.SPEED_LIMITS['blocked']
-                            else: limit = Theme.SPEED_LIMITS.get(rtype, 50)
-                            break
+                e = self.graph.get_edge(u, v)
+                if e is not None:
+                    rtype = e.get('type', 'unknown')
+                    status = e.get('status', None)
+                    if status == 'jammed': limit = Theme.SPEED_LIMITS['jammed']
+                    elif status == 'blocked': limit = Theme.SPEED_LIMITS['blocked']
+                    else: limit = Theme.SPEED_LIMITS.get(rtype, 50)
 
                 import random
                 current_speed = limit * (0.9 + 0.2 * random.random())
@@ -868,7 +1016,7 @@ class MapVisualizer:
                 self.canvas.delete("hud_speed")
                 self.hud.draw_speedometer(current_speed, limit)
                 
-                hud_text = self._update_navigation_hud(segment_idx, path_nodes, road_name)
+                hud_text = self._update_navigation_hud(segment_idx)
                 self.canvas.delete("hud_instr")
                 self.hud.draw_navigation(hud_text)
             
@@ -893,19 +1041,20 @@ class MapVisualizer:
          if total_steps == 0 or self.anim_index >= total_steps: return
 
          # 1. Identify where we are
-         current_seg_idx = self.anim_index // 10
+         current_seg_idx = self.anim_progress[self.anim_index][0]
          current_seg_idx = min(current_seg_idx, len(path_nodes) - 2)
          
          next_node_id = path_nodes[current_seg_idx + 1]
          
-         # 2. A* from next node to end
-         new_tail_path, new_dist = a_star(self.graph, next_node_id, self.end_node)
+         # 2. Route from next node to end (find_route, or the incremental planner)
+         new_tail_path, new_dist = self.route_to_end(next_node_id)
          
          # STOP LOGIC
          if not new_tail_path:
              print("Rerouting failed: Path blocked.")
              self.anim_running = False
              self.anim_path = self.anim_path[:self.anim_index] # Keep history so car stays put
+             self.anim_progress = self.anim_progress[:self.anim_index]
              self.hud.draw_navigation("ROUTE BLOCKED! NO PASSAGE.")
              self.draw_map()
              return
@@ -913,113 +1062,31 @@ class MapVisualizer:
          # 3. Splice paths
          final_path = path_nodes[:current_seg_idx+1] + new_tail_path
          self.current_route_path = final_path
+         self.alternatives = []  # They started from the original start node
+         self.route_pois = []
          
          # 4. Regenerate Animation Path (GEO COORDS)
-         points_to_keep_count = (current_seg_idx + 1) * 10
-         if points_to_keep_count > len(self.anim_path):
-             points_to_keep_count = len(self.anim_path)
+         points_to_keep_count = self.anim_index
+         while (points_to_keep_count < len(self.anim_path)
+                and self.anim_progress[points_to_keep_count][0] <= current_seg_idx):
+             points_to_keep_count += 1
              
-         kept_anim_path = self.anim_path[:points_to_keep_count]
-         
-         new_visual_points = []
-         for i in range(len(new_tail_path)-1):
-            u = self.graph.nodes[new_tail_path[i]]
-            v = self.graph.nodes[new_tail_path[i+1]]
-            
-            steps = 10 
-            for s in range(steps):
-                t = s / steps
-                # Interpolate Geo
-                lat = u.lat + (v.lat - u.lat) * t
-                lon = u.lon + (v.lon - u.lon) * t
-                new_visual_points.append((lat, lon))
+         new_visual_points, new_progress = self._build_anim_points(new_tail_path, current_seg_idx + 1)
          
-         self.anim_path = kept_anim_path + new_visual_points
+         self.anim_path = self.anim_path[:points_to_keep_count] + new_visual_points
+         self.anim_progress = self.anim_progress[:points_to_keep_count] + new_progress
          
          # 5. Update
-         self.current_instructions = generate_instructions(self.graph, final_path)
+         self.current_maneuvers = build_maneuvers(self.graph, final_path)
+         self.current_instructions = self.current_maneuvers.instructions()
          self.draw_map()
 
-    def _update_navigation_hud(self, segment_idx: int, path_nodes: list[str], current_road_name: str) -> str:
-        """ Calculates the instruction text for the HUD based on current position in path. """
-        hud_text = "Navigating..."
-        next_turn_dist = 0
-        next_street_name = "Destination"
-        found_turn = False
-        
-        u, v = path_nodes[segment_idx], path_nodes[segment_idx+1]
-
-        current_u, current_v = u, v
-        segment_weight = 0
-        if current_u in self.graph.edges:
-            for e in self.graph.edges[current_u]:
-                if e['to'] == current_v:
-                        segment_weight = e['weight']
-                        break
-        
-        # If current road is blocked, weight is inf
-        if math.isinf(segment_weight):
-             return "Route blocked ahead."
-
-        steps = 10 
-        local_step = self.anim_index % steps
-        t = local_step / steps
-        current_seg_dist_remaining = segment_weight * (1.0 - t)
-        
-        next_turn_dist += current_seg_dist_remaining
-        turn_direction = "straight"
-        
-        for i in range(segment_idx + 1, len(path_nodes) - 1):
-            u2, v2 = path_nodes[i], path_nodes[i+1]
-            
-            seg_name = "Unknown"
-            seg_len = 0
-            is_blocked = False
-            
-            if u2 in self.graph.edges:
-                for e in self.graph.edges[u2]:
-                    if e['to'] == v2:
-                        seg_name = e.get('name', 'Unknown')
-                        seg_len = e['weight']
-                        if math.isinf(seg_len): is_blocked = True
-                        break
-            
-            # --- SAFETY CHECK ---
-            if is_blocked:
-                return "Route blocked ahead."
-            # --------------------
-
-            if seg_name != current_road_name and seg_name != "Unknown Road" and seg_name != "Unknown":
-                next_street_name = seg_name
-                found_turn = True
-                if i > 0:
-                        p_prev = self.graph.nodes[path_nodes[i-1]]
-                        p_curr = self.graph.nodes[u2]
-                        p_next = self.graph.nodes[v2]
-                        turn_direction = calculate_turn_dir(p_prev.lat, p_prev.lon, 
-                                                            p_curr.lat, p_curr.lon, 
-                                                            p_next.lat, p_next.lon)
-                break
-            else:
-                next_turn_dist += seg_len
-        
-        # --- SAFETY CHECK ---
-        if math.isinf(next_turn_dist) or math.isnan(next_turn_dist):
-             return "Recalculating..."
-        # --------------------
-
-        if found_turn:
-                # "ravno", "lijevo", "desno" needs to be mapped if calculate_turn_dir returns Croatian
-                # BUT I already updated calculate_turn_dir in `utils.py` to return english.
-                
-                if turn_direction == "straight":
-                    hud_text = f"In {int(next_turn_dist)}m: Continue straight onto {next_street_name}"
-                else:
-                    hud_text = f"In {int(next_turn_dist)}m: Turn {turn_direction} onto {next_street_name}"
-        else:
-                hud_text = f"Go {int(next_turn_dist)}m to destination"
-        
-        return hud_text
+    def _update_navigation_hud(self, segment_idx: int) -> str:
+        """ Instruction text for the HUD at the car's position: binary search in the route's maneuver list. """
+        maneuvers = getattr(self, 'current_maneuvers', None)
+        if maneuvers is None or maneuvers.path is not self.current_route_path:
+            maneuvers = self.current_maneuvers = build_maneuvers(self.graph, self.current_route_path)
+        return maneuvers.hud_text(segment_idx, self.anim_progress[self.anim_index][1])
 
     def show(self):
         """ Starts the Tkinter event loop, displaying the map application. """
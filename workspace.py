@@ -0,0 +1,72 @@
+import threading
+import weakref
+from array import array
+from contextlib import contextmanager
+
+# Reusable A* search state. Allocating g/parent tables for every node of the map on each query
+# makes short queries (and every live reroute) cost O(N); a workspace is set up once per graph
+# and thread, and each query only pays for the nodes it touches.
+
+_INF = float('infinity')
+_MAX_GENERATION = 2 ** 32 - 1
+
+class SearchWorkspace:
+    """
+    Per-query state of A* for one graph.
+    Integer-indexed graphs (CompactGraph) use flat arrays whose entries only count if
+    stamp[i] == generation, so starting a query just bumps the generation.
+    Graphs keyed by node ID use sparse dicts of the touched nodes, cleared between queries.
+    The heap list is reused either way.
+    """
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.generation = 0
+        self.stamp = array('L', [0]) * size
+        self.g_score = array('d', [_INF]) * size
+        self.came_from = array('l', [-1]) * size
+        # Point each node was entered from (NaN = start node, no turn penalty)
+        self.approach_lat = array('d', [0.0]) * size
+        self.approach_lon = array('d', [0.0]) * size
+
+        self.g_by_id: dict = {}
+        self.came_from_by_id: dict = {}
+        self.approach_by_id: dict = {}
+
+        self.heap: list = []
+        self.in_use = False
+
+    def begin(self):
+        """ Invalidates the previous query's state. """
+        self.generation += 1
+        if self.generation > _MAX_GENERATION:
+            # Stamps would wrap around: clear them once every 4 billion queries
+            self.stamp = array('L', [0]) * self.size
+            self.generation = 1
+        self.heap.clear()
+        self.g_by_id.clear()
+        self.came_from_by_id.clear()
+        self.approach_by_id.clear()
+
+_local = threading.local()
+
+@contextmanager
+def search_workspace(graph, size: int = 0):
+    """
+    This thread's workspace for graph (with arrays for `size` node indices), ready for a new query.
+    Workspaces are pooled per thread and graph; a nested query gets a temporary one.
+    """
+    pool = getattr(_local, 'pool', None)
+    if pool is None:
+        pool = _local.pool = weakref.WeakKeyDictionary()
+    workspace = pool.get(graph)
+    if workspace is None or workspace.size != size:
+        workspace = pool[graph] = SearchWorkspace(size)
+    if workspace.in_use:
+        workspace = SearchWorkspace(size)
+
+    workspace.in_use = True
+    workspace.begin()
+    try:
+        yield workspace
+    finally:
+        workspace.in_use = False